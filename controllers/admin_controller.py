@@ -10,7 +10,7 @@ def admin_required(view_func):
     def wrapper(*args, **kwargs):
         if "user_id" not in session:
             return redirect(url_for("auth_bp.login"))
-        if session.get("user_tipo") != 2:  # 2 = administrador
+        if session.get("user_tipo") != 2 or not db.usuario_e_admin(session["user_id"]):  # 2 = administrador
             flash("Acesso permitido apenas para administradores.", "danger")
             return redirect(url_for("produtos_bp.index"))
         return view_func(*args, **kwargs)
@@ -1,14 +1,31 @@
-from flask import Blueprint, request, jsonify
+from functools import wraps
+
+from flask import Blueprint, Response, current_app, g, request, jsonify, stream_with_context
 from flask_jwt_extended import (
-    jwt_required,
     create_access_token,
+    create_refresh_token,
+    decode_token,
     get_jwt_identity,
     get_jwt,
+    get_unverified_jwt_headers,
+)
+from flask_jwt_extended.config import config as config_jwt
+from flask_jwt_extended.exceptions import (
+    InvalidHeaderError,
+    NoAuthorizationError,
+    RevokedTokenError,
+    WrongTokenError,
 )
 from flasgger import swag_from
 
-from models import db
-import bcrypt
+from models import db, db_async
+from models.repositorio import COLUNAS
+from models.respostas import MINIMO_COMPRESSAO, NIVEL_GZIP, QUALIDADE_BROTLI, comprimir
+from models.senhas import SenhasOcupadas
+import csv
+import inspect
+import io
+import json
 
 api_bp = Blueprint("api_bp", __name__)
 
@@ -19,9 +36,122 @@ def resposta_erro(mensagem, status=400):
     return jsonify({"erro": mensagem}), status
 
 
+def _token_do_cabecalho(cabecalho, nome, tipo):
+    """Token de "Authorization: Bearer <JWT>" (mesmas regras e mensagens do flask_jwt_extended)."""
+    if tipo and "," not in cabecalho:
+        # Caminho comum: "Bearer <JWT>", sem outros valores no cabeçalho
+        partes = cabecalho.split()
+        if len(partes) == 2 and partes[0] == tipo:
+            return partes[1]
+    cabecalho = cabecalho.strip().strip(",")
+    if not cabecalho:
+        raise NoAuthorizationError(f"Missing {nome} Header")
+    if not tipo:
+        partes = cabecalho.split()
+        if len(partes) != 1:
+            raise InvalidHeaderError(f"Bad {nome} header. Expected '{nome}: <JWT>'")
+        return partes[0]
+    valores = [v for v in cabecalho.split(",") if v.strip() and v.split()[0] == tipo]
+    if len(valores) != 1:
+        raise NoAuthorizationError(f"Missing '{tipo}' type in '{nome}' header. Expected '{nome}: {tipo} <JWT>'")
+    partes = valores[0].split()
+    if len(partes) != 2:
+        raise InvalidHeaderError(f"Bad {nome} header. Expected '{nome}: {tipo} <JWT>'")
+    return partes[1]
+
+
+def _verificar_token(requisicao, refresh):
+    # Cada acesso a request/g/current_app passa por um proxy do werkzeug: no
+    # caminho de toda requisição, o objeto e a configuração são lidos uma vez
+    config = current_app.config
+    nome = config["JWT_HEADER_NAME"]
+    token = _token_do_cabecalho(requisicao.headers.get(nome, ""), nome, config["JWT_HEADER_TYPE"])
+    verificado = db.cache_tokens.obter(token)
+    if verificado is None:
+        # Assinatura, exp/nbf e JSON: só na primeira vez que o worker vê o token
+        dados = decode_token(token)
+        cabecalho = get_unverified_jwt_headers(token)
+        db.cache_tokens.gravar(token, dados, cabecalho)
+    else:
+        dados, cabecalho = verificado
+
+    esperado = "refresh" if refresh else "access"
+    if dados.get("type") != esperado:
+        raise WrongTokenError(f"Only {esperado} tokens are allowed")
+    if db.token_revogado(dados["jti"]):
+        raise RevokedTokenError(cabecalho, dados)
+
+    # Onde get_jwt() e get_jwt_identity() procuram o token da requisição
+    contexto = g._get_current_object()
+    contexto._jwt_extended_jwt_user = {"loaded_user": None}
+    contexto._jwt_extended_jwt_header = cabecalho
+    contexto._jwt_extended_jwt = dados
+    contexto._jwt_extended_jwt_location = "headers"
+
+
+def token_obrigatorio(refresh=False):
+    """
+    Como @jwt_required(refresh=...), com as claims dos tokens já verificados
+    em cache (db.cache_tokens) e os tokens revogados conferidos em memória.
+    Os erros são as mesmas exceções do flask_jwt_extended (mesmas respostas 401/422).
+    """
+    def decorador(fn):
+        # Como current_app.ensure_sync(fn), sem inspecionar fn a cada requisição
+        assincrona = inspect.iscoroutinefunction(fn)
+
+        @wraps(fn)
+        def envolver(*args, **kwargs):
+            requisicao = request._get_current_object()
+            if requisicao.method not in config_jwt.exempt_methods:
+                _verificar_token(requisicao, refresh)
+            if assincrona:
+                return current_app.ensure_sync(fn)(*args, **kwargs)
+            return fn(*args, **kwargs)
+        return envolver
+    return decorador
+
+
+def cliente_tem_versao(etag):
+    """Se o If-None-Match da requisição já traz esta ETag (ver db.versao_tabelas e db.versao_conteudo)."""
+    return request.if_none_match.contains_weak(etag)
+
+
+def resposta_nao_modificada(etag):
+    resp = Response(status=304)
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
+
+
+def resposta_listagem(dados, etag):
+    """
+    200 com a ETag da versão lida antes dos dados: o cliente a devolve em
+    If-None-Match e recebe 304, sem corpo, enquanto nada mudar.
+    """
+    resp = jsonify(dados)
+    resp.set_etag(etag, weak=True)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp, 200
+
+
+@api_bp.after_request
+def comprimir_resposta(resp):
+    # Limites em app.config (ver app_api.py)
+    config = current_app.config
+    return comprimir(
+        resp,
+        request.accept_encodings,
+        minimo=config.get("COMPRESSAO_MINIMO", MINIMO_COMPRESSAO),
+        nivel_gzip=config.get("COMPRESSAO_NIVEL_GZIP", NIVEL_GZIP),
+        qualidade_brotli=config.get("COMPRESSAO_QUALIDADE_BROTLI", QUALIDADE_BROTLI),
+    )
+
+
 def require_admin():
+    # O token diz o tipo no login; o banco confirma que o usuário ainda
+    # existe e continua administrador (o diretório pode estar atrasado)
     claims = get_jwt()
-    return claims.get("tipo_usuario") == 2
+    return claims.get("tipo_usuario") == 2 and db.usuario_e_admin(get_jwt_identity())
 
 
 # ---------- AUTENTICAÇÃO ----------
@@ -55,6 +185,10 @@ def api_login():
         description: Usuário não encontrado ou senha inválida
         schema:
           $ref: '#/definitions/Erro'
+      503:
+        description: Muitos logins ao mesmo tempo; tente novamente
+        schema:
+          $ref: '#/definitions/Erro'
     """
     dados = request.get_json() or {}
     nome = dados.get("nome_usuario")
@@ -72,8 +206,11 @@ def api_login():
         return resposta_erro("Usuário não encontrado", 401)
 
     user = resp.data
-    hash_no_banco = user["senha_usuario"].encode("utf-8")
-    if not bcrypt.checkpw(senha.encode("utf-8"), hash_no_banco):
+    try:
+        senha_confere = db.verificar_senha(user, senha)
+    except SenhasOcupadas as e:
+        return resposta_erro(str(e), 503)
+    if not senha_confere:
         return resposta_erro("Credenciais inválidas", 401)
 
     identity = str(user["id"])
@@ -83,39 +220,212 @@ def api_login():
     }
 
     token = create_access_token(identity=identity, additional_claims=additional_claims)
+    refresh_token = create_refresh_token(identity=identity)
+    return jsonify({"access_token": token, "refresh_token": refresh_token}), 200
+
+
+@api_bp.route("/token/renovar", methods=["POST"])
+@token_obrigatorio(refresh=True)
+def api_renovar_token():
+    """
+    Gera um novo access_token a partir do refresh_token
+    O tipo do usuário vem do cadastro atual, não do login
+    ---
+    tags:
+      - Autenticação
+    security:
+      - Bearer: []
+    description: "Envie o refresh_token (não o access_token) no cabeçalho: Authorization: Bearer <refresh_token>"
+    responses:
+      200:
+        description: Novo access_token
+        schema:
+          $ref: '#/definitions/RenovarTokenResponse'
+      401:
+        description: Refresh token ausente, inválido, expirado ou revogado, ou usuário excluído
+        schema:
+          $ref: '#/definitions/Erro'
+      422:
+        description: Token enviado não é um refresh token
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    usuario = db.usuario_do_diretorio(get_jwt_identity())
+    if usuario is None:
+        return resposta_erro("Usuário não encontrado", 401)
+
+    token = create_access_token(
+        identity=str(usuario["id"]),
+        additional_claims={
+            "nome_usuario": usuario["nome_usuario"],
+            "tipo_usuario": usuario["tipo_usuario"],
+        },
+    )
     return jsonify({"access_token": token}), 200
 
 
+@api_bp.route("/logout", methods=["POST"])
+@token_obrigatorio()
+def api_logout():
+    """
+    Encerra a sessão revogando o access_token usado na requisição
+    Envie também o refresh_token no corpo para revogá-lo
+    ---
+    tags:
+      - Autenticação
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: false
+        schema:
+          $ref: '#/definitions/LogoutRequest'
+    responses:
+      200:
+        description: Tokens revogados até expirarem
+        schema:
+          $ref: '#/definitions/LogoutResponse'
+      400:
+        description: refresh_token inválido ou de outro usuário
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    dados = request.get_json(silent=True) or {}
+    revogar = [get_jwt()]
+
+    if dados.get("refresh_token"):
+        try:
+            claims_refresh = decode_token(dados["refresh_token"])
+        except Exception:
+            return resposta_erro("refresh_token inválido ou expirado", 400)
+        if claims_refresh.get("type") != "refresh" or claims_refresh.get("sub") != get_jwt_identity():
+            return resposta_erro("refresh_token inválido ou expirado", 400)
+        revogar.append(claims_refresh)
+
+    for claims in revogar:
+        db.revogar_token(claims["jti"], claims["exp"])
+    return jsonify({"mensagem": "Sessão encerrada"}), 200
+
+
 # ---------- PRODUTOS (CRUD + REGRA DE NEGÓCIO) ----------
 
+PARAMETROS_PAGINA_PRODUTOS = (
+    "limite", "cursor", "ordenar_por", "ordem", "id_categoria", "id_local", "id_fornecedor", "abaixo_minimo",
+)
+
+
 @api_bp.route("/produtos", methods=["GET"])
-@jwt_required()
-def api_listar_produtos():
+@token_obrigatorio()
+async def api_listar_produtos():
     """
-    Lista todos os produtos cadastrados
+    Lista os produtos cadastrados, paginados por cursor
+    Filtros e ordenação são aplicados no banco. Sem limite nem cursor, devolve
+    a primeira página. Com todos=true, devolve a lista inteira numa consulta
+    (sem o envelope itens/proximo_cursor), como antes da paginação
     ---
     tags:
       - Produtos
     security:
       - Bearer: []
+    parameters:
+      - in: query
+        name: limite
+        type: integer
+        description: Produtos por página (padrão 50, máximo 200)
+      - in: query
+        name: cursor
+        type: string
+        description: Valor de proximo_cursor devolvido pela página anterior
+      - in: query
+        name: ordenar_por
+        type: string
+        default: id
+        enum: [id, nome_produto, quantidade, estoque_minimo, estoque_maximo, custo_produto_Unit, valor_venda_Unit]
+      - in: query
+        name: ordem
+        type: string
+        default: asc
+        enum: [asc, desc]
+      - in: query
+        name: id_categoria
+        type: integer
+      - in: query
+        name: id_local
+        type: integer
+      - in: query
+        name: id_fornecedor
+        type: integer
+      - in: query
+        name: abaixo_minimo
+        type: boolean
+        description: Só produtos com quantidade abaixo do estoque mínimo
+      - in: query
+        name: todos
+        type: boolean
+        description: Lista inteira, sem paginação (clientes antigos); não aceita os outros parâmetros
     responses:
       200:
-        description: Lista de produtos retornada com sucesso
+        description: Página de produtos, ou lista de todos os produtos com todos=true
         schema:
-          type: array
-          items:
-            $ref: '#/definitions/Produto'
+          $ref: '#/definitions/ProdutoPagina'
+      304:
+        description: Nada mudou desde a ETag enviada em If-None-Match (sem corpo)
+      400:
+        description: Parâmetro de paginação, filtro ou ordenação inválido, ou combinado com todos=true
+        schema:
+          $ref: '#/definitions/Erro'
       401:
         description: Token JWT ausente ou inválido
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_produtos()
-    return jsonify(resp.data or []), 200
+    args = request.args
+    todos = args.get("todos", "").lower() in ("1", "true", "sim")
+    if todos and any(campo in args for campo in PARAMETROS_PAGINA_PRODUTOS):
+        return resposta_erro("todos=true não aceita limite, cursor, filtros nem ordenação", 400)
+
+    etag = await db_async.versao_tabelas("PRODUTOS")
+    if cliente_tem_versao(etag):
+        return resposta_nao_modificada(etag)
+
+    if todos:
+        # Lista inteira numa consulta, no formato de antes da paginação
+        resp = await db_async.listar_produtos()
+        return resposta_listagem(resp.data or [], etag)
+
+    ordem = args.get("ordem", "asc").lower()
+    if ordem not in ("asc", "desc"):
+        return resposta_erro("ordem deve ser 'asc' ou 'desc'", 400)
+
+    try:
+        consulta = {
+            campo: int(args[campo])
+            for campo in ("id_categoria", "id_local", "id_fornecedor")
+            if args.get(campo)
+        }
+        consulta.update(
+            ordenar_por=args.get("ordenar_por", "id"),
+            decrescente=ordem == "desc",
+            abaixo_minimo=args.get("abaixo_minimo", "").lower() in ("1", "true", "sim"),
+        )
+        produtos, proximo_cursor = await db_async.listar_produtos_paginado(
+            limite=int(args.get("limite", db.LIMITE_PADRAO_PAGINA)),
+            cursor=args.get("cursor") or None,
+            **consulta,
+        )
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+
+    return resposta_listagem({"itens": produtos, "proximo_cursor": proximo_cursor}, etag)
 
 
 @api_bp.route("/produtos", methods=["POST"])
-@jwt_required()
+@token_obrigatorio()
 def api_criar_produto():
     """
     Cria um novo produto com validações de estoque
@@ -184,8 +494,8 @@ def api_criar_produto():
 
 
 @api_bp.route("/produtos/<int:id_produto>", methods=["GET"])
-@jwt_required()
-def api_obter_produto(id_produto):
+@token_obrigatorio()
+async def api_obter_produto(id_produto):
     """
     Obtém um produto específico por ID
     ---
@@ -214,16 +524,14 @@ def api_obter_produto(id_produto):
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_produtos()
-    itens = resp.data or []
-    produto = next((p for p in itens if p["id"] == id_produto), None)
-    if not produto:
+    resp = await db_async.obter_produto_por_id(id_produto)
+    if not resp.data:
         return resposta_erro("Produto não encontrado", 404)
-    return jsonify(produto), 200
+    return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/produtos/<int:id_produto>", methods=["PUT"])
-@jwt_required()
+@token_obrigatorio()
 def api_atualizar_produto(id_produto):
     """
     Atualiza os dados de um produto existente
@@ -312,19 +620,14 @@ def api_atualizar_produto(id_produto):
     if not update:
         return resposta_erro("Nada para atualizar", 400)
 
-    resp = (
-        db.supabase.table("PRODUTOS")
-        .update(update)
-        .eq("id", id_produto)
-        .execute()
-    )
+    resp = db.atualizar_produto(id_produto, update)
     if not resp.data:
         return resposta_erro("Produto não encontrado", 404)
     return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/produtos/<int:id_produto>", methods=["DELETE"])
-@jwt_required()
+@token_obrigatorio()
 def api_deletar_produto(id_produto):
     """
     Deleta um produto
@@ -368,8 +671,8 @@ def api_deletar_produto(id_produto):
 # ---------- ENTRADA / SAÍDA (REGRA DE NEGÓCIO) ----------
 
 @api_bp.route("/produtos/<int:id_produto>/entrada", methods=["POST"])
-@jwt_required()
-def api_entrada_estoque(id_produto):
+@token_obrigatorio()
+async def api_entrada_estoque(id_produto):
     """
     Registra entrada de estoque (aumenta quantidade)
     Valida estoque máximo - não permite ultrapassar
@@ -419,15 +722,15 @@ def api_entrada_estoque(id_produto):
     id_usuario = int(get_jwt_identity())  # Pega ID do usuário do token JWT
 
     try:
-        db.entrada_estoque(id_produto, qtd, id_usuario)
+        await db_async.entrada_estoque(id_produto, qtd, id_usuario)
     except ValueError as e:
         return resposta_erro(str(e), 400)
     return jsonify({"mensagem": "Entrada registrada", "quantidade": qtd}), 200
 
 
 @api_bp.route("/produtos/<int:id_produto>/saida", methods=["POST"])
-@jwt_required()
-def api_saida_estoque(id_produto):
+@token_obrigatorio()
+async def api_saida_estoque(id_produto):
     """
     Registra saída de estoque (reduz quantidade)
     Valida estoque mínimo - não permite ficar abaixo do mínimo estabelecido
@@ -477,17 +780,745 @@ def api_saida_estoque(id_produto):
     id_usuario = int(get_jwt_identity())  # Pega ID do usuário do token JWT
 
     try:
-        db.saida_estoque(id_produto, qtd, id_usuario)
+        await db_async.saida_estoque(id_produto, qtd, id_usuario)
     except ValueError as e:
         return resposta_erro(str(e), 400)
     return jsonify({"mensagem": "Saída registrada", "quantidade": qtd}), 200
 
 
+@api_bp.route("/produtos/<int:id_produto>/quantidade", methods=["GET"])
+@token_obrigatorio()
+def api_quantidade_em(id_produto):
+    """
+    Quantidade de um produto numa data passada (auditoria)
+    Calculada a partir do saldo diário mais próximo e dos movimentos do dia
+    ---
+    tags:
+      - Estoque
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: id_produto
+        type: integer
+        required: true
+        description: ID do produto
+        example: 1
+      - in: query
+        name: data
+        type: string
+        required: true
+        description: AAAA-MM-DD (quantidade no fim do dia, UTC) ou data/hora ISO 8601 (sem fuso = UTC)
+        example: "2024-03-05"
+    responses:
+      200:
+        description: Quantidade na data informada
+        schema:
+          $ref: '#/definitions/QuantidadeEmData'
+      400:
+        description: Data ausente ou inválida
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      404:
+        description: Produto não encontrado
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    quando = request.args.get("data")
+    if not quando:
+        return resposta_erro("Informe a data (AAAA-MM-DD ou AAAA-MM-DDTHH:MM:SS)", 400)
+
+    if not db.obter_produto_por_id(id_produto).data:
+        return resposta_erro("Produto não encontrado", 404)
+
+    try:
+        resultado = db.quantidade_em(id_produto, quando)
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+    return jsonify(resultado), 200
+
+
+@api_bp.route("/movimentos/lote", methods=["POST"])
+@token_obrigatorio()
+def api_movimentar_lote():
+    """
+    Registra vários movimentos de estoque de uma vez (upload dos coletores)
+    Cada linha segue as mesmas regras de entrada/saída
+    ---
+    tags:
+      - Estoque
+    security:
+      - Bearer: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          $ref: '#/definitions/MovimentacaoLote'
+    responses:
+      200:
+        description: Lote processado (ver o resultado de cada linha)
+        schema:
+          $ref: '#/definitions/MovimentacaoLoteResponse'
+      400:
+        description: Lista de movimentos ausente, tudo_ou_nada que não é booleano, lote grande demais ou lote cancelado (tudo_ou_nada)
+        schema:
+          $ref: '#/definitions/MovimentacaoLoteResponse'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    dados = request.get_json() or {}
+    movimentos = dados.get("movimentos")
+    if not isinstance(movimentos, list) or not movimentos:
+        return resposta_erro("movimentos deve ser uma lista não vazia", 400)
+
+    tudo_ou_nada = dados.get("tudo_ou_nada", False)
+    if not isinstance(tudo_ou_nada, bool):
+        return resposta_erro("tudo_ou_nada deve ser true ou false", 400)
+    id_usuario = int(get_jwt_identity())  # Pega ID do usuário do token JWT
+
+    try:
+        resultados = db.movimentar_estoque_lote(movimentos, id_usuario, tudo_ou_nada)
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+
+    aplicados = sum(1 for r in resultados if r["sucesso"])
+    corpo = {
+        "aplicados": aplicados,
+        "falhas": len(resultados) - aplicados,
+        "resultados": resultados,
+    }
+    if tudo_ou_nada and aplicados < len(resultados):
+        corpo["erro"] = "Lote cancelado: nenhum movimento foi aplicado"
+        return jsonify(corpo), 400
+    return jsonify(corpo), 200
+
+
+# ---------- MOVIMENTOS (HISTÓRICO) ----------
+
+# Linhas por bloco enviado ao cliente na exportação
+LINHAS_POR_BLOCO = 500
+
+
+def filtros_movimentos():
+    """Filtros do histórico vindos da query string (ValueError se inválidos)."""
+    args = request.args
+    filtros = {
+        campo: int(args[campo])
+        for campo in ("id_produto", "id_usuario")
+        if args.get(campo)
+    }
+    filtros["tipo_movimento"] = args.get("tipo_movimento") or None
+    filtros["inicio"] = args.get("inicio") or None
+    filtros["fim"] = args.get("fim") or None
+    return filtros
+
+
+def blocos_csv(movimentos):
+    """Gera o CSV em blocos de LINHAS_POR_BLOCO linhas (com cabeçalho)."""
+    colunas = COLUNAS["MOVIMENTO_ESTOQUE"]
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for n, movimento in enumerate(movimentos, 1):
+        escritor.writerow([movimento[coluna] for coluna in colunas])
+        if n % LINHAS_POR_BLOCO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def blocos_ndjson(movimentos):
+    """Gera um objeto JSON por linha, em blocos de LINHAS_POR_BLOCO linhas."""
+    bloco = []
+    for movimento in movimentos:
+        bloco.append(json.dumps(movimento, ensure_ascii=False) + "\n")
+        if len(bloco) == LINHAS_POR_BLOCO:
+            yield "".join(bloco)
+            bloco = []
+    if bloco:
+        yield "".join(bloco)
+
+
+FORMATOS_EXPORTACAO = {
+    "csv": (blocos_csv, "text/csv"),
+    "ndjson": (blocos_ndjson, "application/x-ndjson"),
+}
+
+
+@api_bp.route("/movimentos", methods=["GET"])
+@token_obrigatorio()
+def api_listar_movimentos():
+    """
+    Histórico de movimentações de estoque, paginado por cursor
+    Do movimento mais antigo ao mais novo, inclusive meses já arquivados
+    ---
+    tags:
+      - Estoque
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: limite
+        type: integer
+        default: 50
+        description: Movimentos por página (máximo 200)
+      - in: query
+        name: cursor
+        type: string
+        description: Valor de proximo_cursor devolvido pela página anterior
+      - in: query
+        name: id_produto
+        type: integer
+      - in: query
+        name: id_usuario
+        type: integer
+      - in: query
+        name: tipo_movimento
+        type: string
+        enum: [ENTRADA, SAIDA]
+      - in: query
+        name: inicio
+        type: string
+        description: Data/hora inicial, inclusiva (AAAA-MM-DD ou ISO 8601; sem fuso = UTC)
+      - in: query
+        name: fim
+        type: string
+        description: Data/hora final, exclusiva (AAAA-MM-DD ou ISO 8601; sem fuso = UTC)
+    responses:
+      200:
+        description: Página de movimentos retornada com sucesso
+        schema:
+          $ref: '#/definitions/MovimentoPagina'
+      304:
+        description: Nada mudou desde a ETag enviada em If-None-Match (sem corpo)
+      400:
+        description: Filtro ou cursor inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    etag = db.versao_tabelas("MOVIMENTO_ESTOQUE")
+    if cliente_tem_versao(etag):
+        return resposta_nao_modificada(etag)
+
+    try:
+        movimentos, proximo_cursor = db.listar_movimentos_paginado(
+            limite=int(request.args.get("limite", db.LIMITE_PADRAO_PAGINA)),
+            cursor=request.args.get("cursor") or None,
+            **filtros_movimentos(),
+        )
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+
+    return resposta_listagem({"itens": movimentos, "proximo_cursor": proximo_cursor}, etag)
+
+
+@api_bp.route("/movimentos/exportar", methods=["GET"])
+@token_obrigatorio()
+def api_exportar_movimentos():
+    """
+    Exporta o histórico de movimentações (CSV ou NDJSON)
+    A resposta é enviada aos poucos, conforme o banco é lido; serve para
+    extrair meses ou anos de histórico (auditoria) sem limite de linhas
+    ---
+    tags:
+      - Estoque
+    security:
+      - Bearer: []
+    produces:
+      - text/csv
+      - application/x-ndjson
+    parameters:
+      - in: query
+        name: formato
+        type: string
+        default: csv
+        enum: [csv, ndjson]
+      - in: query
+        name: id_produto
+        type: integer
+      - in: query
+        name: id_usuario
+        type: integer
+      - in: query
+        name: tipo_movimento
+        type: string
+        enum: [ENTRADA, SAIDA]
+      - in: query
+        name: inicio
+        type: string
+        description: Data/hora inicial, inclusiva (AAAA-MM-DD ou ISO 8601; sem fuso = UTC)
+      - in: query
+        name: fim
+        type: string
+        description: Data/hora final, exclusiva (AAAA-MM-DD ou ISO 8601; sem fuso = UTC)
+    responses:
+      200:
+        description: Arquivo com os movimentos, em ordem de data
+      400:
+        description: Formato ou filtro inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+
+    formato = request.args.get("formato", "csv").lower()
+    if formato not in FORMATOS_EXPORTACAO:
+        return resposta_erro("formato deve ser 'csv' ou 'ndjson'", 400)
+
+    # Filtros validados antes de a resposta começar: depois do primeiro
+    # bloco enviado não há mais como devolver 400
+    try:
+        movimentos = db.historico_movimentos(**filtros_movimentos())
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+
+    gerar_blocos, mimetype = FORMATOS_EXPORTACAO[formato]
+    return Response(
+        stream_with_context(gerar_blocos(movimentos)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f'attachment; filename="movimentos.{formato}"'},
+    )
+
+
+# ---------- SINCRONIZAÇÃO ----------
+
+@api_bp.route("/sync", methods=["GET"])
+@token_obrigatorio()
+def api_sincronizar():
+    """
+    Produtos e movimentos alterados e produtos excluídos desde a última sincronização
+    Sem desde, devolve o catálogo inteiro; meses de movimentos já arquivados não entram
+    ---
+    tags:
+      - Sincronização
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: desde
+        type: string
+        description: Valor de desde devolvido pela sincronização anterior (também aceito como since)
+      - in: query
+        name: limite
+        type: integer
+        default: 500
+        description: Máximo de linhas de cada lista por resposta (até 2000)
+    responses:
+      200:
+        description: Alterações desde a versão enviada
+        schema:
+          $ref: '#/definitions/Sincronizacao'
+      400:
+        description: desde ou limite inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    try:
+        return jsonify(db.sincronizar(
+            desde=request.args.get("desde") or request.args.get("since") or None,
+            limite=request.args.get("limite", db.LIMITE_PADRAO_SINCRONIZACAO),
+        )), 200
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+
+
+# ---------- RELATÓRIOS ----------
+
+# Segmento da URL -> agrupamento de db.relatorio_estoque
+AGRUPAMENTOS_RELATORIO = {
+    "categorias": "categoria",
+    "locais": "local",
+    "fornecedores": "fornecedor",
+}
+
+
+@api_bp.route("/relatorios/estoque", methods=["GET"])
+@token_obrigatorio()
+def api_relatorio_estoque():
+    """
+    Valor do estoque e margem potencial do catálogo inteiro
+    Calculado a partir do resumo mantido a cada mudança de produto, sem percorrer os produtos
+    ---
+    tags:
+      - Relatórios
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Totais do estoque
+        schema:
+          $ref: '#/definitions/RelatorioEstoque'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.relatorio_estoque()), 200
+
+
+@api_bp.route("/relatorios/estoque/<agrupamento>", methods=["GET"])
+@token_obrigatorio()
+def api_relatorio_estoque_agrupado(agrupamento):
+    """
+    Valor do estoque e margem potencial por categoria, local ou fornecedor
+    Grupos do maior para o menor valor em estoque, mais o total
+    ---
+    tags:
+      - Relatórios
+    security:
+      - Bearer: []
+    parameters:
+      - in: path
+        name: agrupamento
+        type: string
+        required: true
+        enum: [categorias, locais, fornecedores]
+        example: categorias
+    responses:
+      200:
+        description: Totais de cada grupo
+        schema:
+          $ref: '#/definitions/RelatorioEstoqueAgrupado'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+      404:
+        description: Agrupamento desconhecido
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    if agrupamento not in AGRUPAMENTOS_RELATORIO:
+        return resposta_erro(
+            f"Relatório não encontrado. Use: {', '.join(AGRUPAMENTOS_RELATORIO)}", 404
+        )
+    return jsonify(db.relatorio_estoque(AGRUPAMENTOS_RELATORIO[agrupamento])), 200
+
+
+@api_bp.route("/reposicao", methods=["GET"])
+@token_obrigatorio()
+def api_reposicao():
+    """
+    Sugestão de compra por fornecedor, a partir do consumo diário de cada produto
+    Produtos no mínimo ou que chegam a ele dentro do horizonte, com a quantidade a pedir
+    ---
+    tags:
+      - Relatórios
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: horizonte
+        type: integer
+        default: 14
+        description: Dias à frente para considerar um produto perto do mínimo (0 a 365)
+      - in: query
+        name: cobertura
+        type: integer
+        default: 30
+        description: Dias de consumo acima do mínimo que a compra deve cobrir (0 a 365)
+    responses:
+      200:
+        description: Sugestões agrupadas por fornecedor
+        schema:
+          $ref: '#/definitions/Reposicao'
+      400:
+        description: horizonte ou cobertura inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    try:
+        return jsonify(db.sugestao_reposicao(
+            horizonte=request.args.get("horizonte", db.HORIZONTE_PADRAO),
+            cobertura=request.args.get("cobertura", db.COBERTURA_PADRAO),
+        )), 200
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+
+
+# ---------- ALERTAS ----------
+
+@api_bp.route("/alertas", methods=["GET"])
+@token_obrigatorio()
+def api_listar_alertas():
+    """
+    Produtos perto do estoque mínimo ou do máximo
+    Lista mantida pelo banco a cada movimento; a resposta não percorre o catálogo
+    ---
+    tags:
+      - Estoque
+    security:
+      - Bearer: []
+    parameters:
+      - in: query
+        name: tipo
+        type: string
+        enum: [MINIMO, MAXIMO]
+        description: Só um tipo de alerta (até 120% do mínimo ou a partir de 80% do máximo)
+    responses:
+      200:
+        description: Produtos em alerta, dos mais antigos aos mais recentes
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/AlertaEstoque'
+      304:
+        description: Nada mudou desde a ETag enviada em If-None-Match (sem corpo)
+      400:
+        description: tipo inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    # ALERTA_ESTOQUE só muda junto com PRODUTOS (gatilho em createdb.sql)
+    etag = db.versao_tabelas("PRODUTOS")
+    if cliente_tem_versao(etag):
+        return resposta_nao_modificada(etag)
+
+    try:
+        resp = db.listar_alertas(request.args.get("tipo"))
+    except ValueError as e:
+        return resposta_erro(str(e), 400)
+    return resposta_listagem(resp.data or [], etag)
+
+
+# ---------- MONITORAMENTO ----------
+
+@api_bp.route("/cache/estatisticas", methods=["GET"])
+@token_obrigatorio()
+def api_estatisticas_cache():
+    """
+    Estatísticas do cache das tabelas auxiliares (categorias, locais e fornecedores)
+    Contadores do worker que atendeu a requisição
+    ---
+    tags:
+      - Monitoramento
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Contadores do cache
+        schema:
+          $ref: '#/definitions/EstatisticasCache'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.estatisticas_cache()), 200
+
+
+@api_bp.route("/pool/estatisticas", methods=["GET"])
+@token_obrigatorio()
+def api_estatisticas_pool():
+    """
+    Estatísticas do pool de conexões HTTP com o Supabase
+    Métricas do worker que atendeu a requisição
+    ---
+    tags:
+      - Monitoramento
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Conexões em uso/ociosas e tempo de espera por uma conexão
+        schema:
+          $ref: '#/definitions/EstatisticasPool'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.metricas_pool()), 200
+
+
+@api_bp.route("/alertas/estatisticas", methods=["GET"])
+@token_obrigatorio()
+def api_estatisticas_alertas():
+    """
+    Estatísticas da entrega de alertas de estoque
+    Contadores do worker que atendeu a requisição
+    ---
+    tags:
+      - Monitoramento
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Alertas publicados, enviados, repetidos (suprimidos), descartados e falhas de envio
+        schema:
+          $ref: '#/definitions/EstatisticasAlertas'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.estatisticas_alertas()), 200
+
+
+@api_bp.route("/tarefas/estatisticas", methods=["GET"])
+@token_obrigatorio()
+def api_estatisticas_tarefas():
+    """
+    Estatísticas da fila de tarefas em segundo plano
+    Profundidade e atraso da fila (compartilhada) e contadores do worker que atendeu a requisição
+    ---
+    tags:
+      - Monitoramento
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Tarefas por estado e por tipo, atraso da mais antiga e contadores (objeto vazio sem a fila configurada)
+        schema:
+          $ref: '#/definitions/EstatisticasTarefas'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.estatisticas_tarefas()), 200
+
+
+@api_bp.route("/tokens/estatisticas", methods=["GET"])
+@token_obrigatorio()
+def api_estatisticas_tokens():
+    """
+    Estatísticas do cache de tokens verificados e da lista de revogados
+    Contadores do worker que atendeu a requisição
+    ---
+    tags:
+      - Monitoramento
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Tamanho e acertos do cache de tokens; revogados em memória e releituras da tabela
+        schema:
+          $ref: '#/definitions/EstatisticasTokens'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.estatisticas_tokens()), 200
+
+
+@api_bp.route("/senhas/estatisticas", methods=["GET"])
+@token_obrigatorio()
+def api_estatisticas_senhas():
+    """
+    Estatísticas da verificação de senhas (bcrypt)
+    Contadores do worker que atendeu a requisição
+    ---
+    tags:
+      - Monitoramento
+    security:
+      - Bearer: []
+    responses:
+      200:
+        description: Custo configurado, limite do pool, fila e verificações, recusas e hashes refeitos
+        schema:
+          $ref: '#/definitions/EstatisticasSenhas'
+      401:
+        description: Token JWT ausente ou inválido
+        schema:
+          $ref: '#/definitions/Erro'
+      403:
+        description: Usuário não é administrador
+        schema:
+          $ref: '#/definitions/Erro'
+    """
+    if not require_admin():
+        return resposta_erro("Acesso restrito a administradores", 403)
+    return jsonify(db.estatisticas_senhas()), 200
+
+
 # ---------- CATEGORIAS / LOCAIS / FORNECEDORES (ADMIN) ----------
 
 @api_bp.route("/categorias", methods=["GET"])
-@jwt_required()
-def api_listar_categorias():
+@token_obrigatorio()
+async def api_listar_categorias():
     """
     Lista todas as categorias
     ---
@@ -502,17 +1533,23 @@ def api_listar_categorias():
           type: array
           items:
             $ref: '#/definitions/Categoria'
+      304:
+        description: Nada mudou desde a ETag enviada em If-None-Match (sem corpo)
       401:
         description: Token JWT ausente ou inválido
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_categorias()
-    return jsonify(resp.data or []), 200
+    # Sem versão no banco: a ETag é o resumo guardado com a lista no cache
+    resp = await db_async.listar_categorias()
+    etag = resp.versao
+    if cliente_tem_versao(etag):
+        return resposta_nao_modificada(etag)
+    return resposta_listagem(resp.data or [], etag)
 
 
 @api_bp.route("/categorias", methods=["POST"])
-@jwt_required()
+@token_obrigatorio()
 def api_criar_categoria():
     """
     Cria uma nova categoria (apenas administradores)
@@ -564,8 +1601,8 @@ def api_criar_categoria():
 
 
 @api_bp.route("/categorias/<int:id_categoria>", methods=["GET"])
-@jwt_required()
-def api_obter_categoria(id_categoria):
+@token_obrigatorio()
+async def api_obter_categoria(id_categoria):
     """
     Obtém uma categoria específica por ID
     ---
@@ -594,16 +1631,14 @@ def api_obter_categoria(id_categoria):
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_categorias()
-    categorias = resp.data or []
-    categoria = next((c for c in categorias if c["id"] == id_categoria), None)
-    if not categoria:
+    resp = await db_async.obter_categoria_por_id(id_categoria)
+    if not resp.data:
         return resposta_erro("Categoria não encontrada", 404)
-    return jsonify(categoria), 200
+    return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/categorias/<int:id_categoria>", methods=["PUT"])
-@jwt_required()
+@token_obrigatorio()
 def api_atualizar_categoria(id_categoria):
     """
     Atualiza uma categoria (apenas administradores)
@@ -660,19 +1695,14 @@ def api_atualizar_categoria(id_categoria):
     if not nome:
         return resposta_erro("nome_categoria é obrigatório", 400)
 
-    resp = (
-        db.supabase.table("CATEGORIA")
-        .update({"nome_categoria": nome})
-        .eq("id", id_categoria)
-        .execute()
-    )
+    resp = db.atualizar_categoria(id_categoria, nome)
     if not resp.data:
         return resposta_erro("Categoria não encontrada", 404)
     return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/categorias/<int:id_categoria>", methods=["DELETE"])
-@jwt_required()
+@token_obrigatorio()
 def api_deletar_categoria(id_categoria):
     """
     Deleta uma categoria (apenas administradores)
@@ -724,8 +1754,8 @@ def api_deletar_categoria(id_categoria):
 # ---------- LOCAIS DE ESTOQUE ----------
 
 @api_bp.route("/locais", methods=["GET"])
-@jwt_required()
-def api_listar_locais():
+@token_obrigatorio()
+async def api_listar_locais():
     """
     Lista todos os locais de estoque
     ---
@@ -740,17 +1770,23 @@ def api_listar_locais():
           type: array
           items:
             $ref: '#/definitions/LocalEstoque'
+      304:
+        description: Nada mudou desde a ETag enviada em If-None-Match (sem corpo)
       401:
         description: Token JWT ausente ou inválido
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_locais_estoque()
-    return jsonify(resp.data or []), 200
+    # Sem versão no banco: a ETag é o resumo guardado com a lista no cache
+    resp = await db_async.listar_locais_estoque()
+    etag = resp.versao
+    if cliente_tem_versao(etag):
+        return resposta_nao_modificada(etag)
+    return resposta_listagem(resp.data or [], etag)
 
 
 @api_bp.route("/locais", methods=["POST"])
-@jwt_required()
+@token_obrigatorio()
 def api_criar_local():
     """
     Cria um novo local de estoque (apenas administradores)
@@ -802,8 +1838,8 @@ def api_criar_local():
 
 
 @api_bp.route("/locais/<int:id_local>", methods=["GET"])
-@jwt_required()
-def api_obter_local(id_local):
+@token_obrigatorio()
+async def api_obter_local(id_local):
     """
     Obtém um local específico por ID
     ---
@@ -832,16 +1868,14 @@ def api_obter_local(id_local):
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_locais_estoque()
-    locais = resp.data or []
-    local = next((l for l in locais if l["id"] == id_local), None)
-    if not local:
+    resp = await db_async.obter_local_por_id(id_local)
+    if not resp.data:
         return resposta_erro("Local não encontrado", 404)
-    return jsonify(local), 200
+    return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/locais/<int:id_local>", methods=["PUT"])
-@jwt_required()
+@token_obrigatorio()
 def api_atualizar_local(id_local):
     """
     Atualiza um local de estoque (apenas administradores)
@@ -898,19 +1932,14 @@ def api_atualizar_local(id_local):
     if not nome:
         return resposta_erro("nome_local é obrigatório", 400)
 
-    resp = (
-        db.supabase.table("LOCAL_ESTOQUE")
-        .update({"nome_local": nome})
-        .eq("id", id_local)
-        .execute()
-    )
+    resp = db.atualizar_local_estoque(id_local, nome)
     if not resp.data:
         return resposta_erro("Local não encontrado", 404)
     return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/locais/<int:id_local>", methods=["DELETE"])
-@jwt_required()
+@token_obrigatorio()
 def api_deletar_local(id_local):
     """
     Deleta um local de estoque (apenas administradores)
@@ -962,8 +1991,8 @@ def api_deletar_local(id_local):
 # ---------- FORNECEDORES ----------
 
 @api_bp.route("/fornecedores", methods=["GET"])
-@jwt_required()
-def api_listar_fornecedores():
+@token_obrigatorio()
+async def api_listar_fornecedores():
     """
     Lista todos os fornecedores
     ---
@@ -978,17 +2007,23 @@ def api_listar_fornecedores():
           type: array
           items:
             $ref: '#/definitions/Fornecedor'
+      304:
+        description: Nada mudou desde a ETag enviada em If-None-Match (sem corpo)
       401:
         description: Token JWT ausente ou inválido
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_fornecedores()
-    return jsonify(resp.data or []), 200
+    # Sem versão no banco: a ETag é o resumo guardado com a lista no cache
+    resp = await db_async.listar_fornecedores()
+    etag = resp.versao
+    if cliente_tem_versao(etag):
+        return resposta_nao_modificada(etag)
+    return resposta_listagem(resp.data or [], etag)
 
 
 @api_bp.route("/fornecedores", methods=["POST"])
-@jwt_required()
+@token_obrigatorio()
 def api_criar_fornecedor():
     """
     Cria um novo fornecedor (apenas administradores)
@@ -1040,8 +2075,8 @@ def api_criar_fornecedor():
 
 
 @api_bp.route("/fornecedores/<int:id_fornecedor>", methods=["GET"])
-@jwt_required()
-def api_obter_fornecedor(id_fornecedor):
+@token_obrigatorio()
+async def api_obter_fornecedor(id_fornecedor):
     """
     Obtém um fornecedor específico por ID
     ---
@@ -1070,16 +2105,14 @@ def api_obter_fornecedor(id_fornecedor):
         schema:
           $ref: '#/definitions/Erro'
     """
-    resp = db.listar_fornecedores()
-    fornecedores = resp.data or []
-    fornecedor = next((f for f in fornecedores if f["id"] == id_fornecedor), None)
-    if not fornecedor:
+    resp = await db_async.obter_fornecedor_por_id(id_fornecedor)
+    if not resp.data:
         return resposta_erro("Fornecedor não encontrado", 404)
-    return jsonify(fornecedor), 200
+    return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/fornecedores/<int:id_fornecedor>", methods=["PUT"])
-@jwt_required()
+@token_obrigatorio()
 def api_atualizar_fornecedor(id_fornecedor):
     """
     Atualiza um fornecedor (apenas administradores)
@@ -1136,19 +2169,14 @@ def api_atualizar_fornecedor(id_fornecedor):
     if not nome:
         return resposta_erro("nome_fornecedor é obrigatório", 400)
 
-    resp = (
-        db.supabase.table("FORNECEDOR")
-        .update({"nome_fornecedor": nome})
-        .eq("id", id_fornecedor)
-        .execute()
-    )
+    resp = db.atualizar_fornecedor(id_fornecedor, nome)
     if not resp.data:
         return resposta_erro("Fornecedor não encontrado", 404)
     return jsonify(resp.data[0]), 200
 
 
 @api_bp.route("/fornecedores/<int:id_fornecedor>", methods=["DELETE"])
-@jwt_required()
+@token_obrigatorio()
 def api_deletar_fornecedor(id_fornecedor):
     """
     Deleta um fornecedor (apenas administradores)
@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
-import bcrypt
 from models import db
+from models.senhas import SenhasOcupadas
 
 auth_bp = Blueprint("auth_bp", __name__)
 
@@ -20,10 +20,13 @@ def login():
             return redirect(url_for("auth_bp.login"))
 
         user = resp.data
-        hash_no_banco = user["senha_usuario"].encode("utf-8")
-        senha_bytes = senha.encode("utf-8")
+        try:
+            senha_confere = db.verificar_senha(user, senha)
+        except SenhasOcupadas as e:
+            flash(str(e), "warning")
+            return redirect(url_for("auth_bp.login"))
 
-        if bcrypt.checkpw(senha_bytes, hash_no_banco):
+        if senha_confere:
             session["user_id"] = user["id"]
             session["user_name"] = user["nome_usuario"]
             session["user_tipo"] = user["tipo_usuario"]
@@ -34,8 +37,7 @@ def login():
             return redirect(url_for("auth_bp.login"))
 
     try:
-        resp_usuarios = db.listar_usuarios()
-        usuarios = resp_usuarios.data or []
+        usuarios = db.listar_usuarios_diretorio()
     except Exception:
         usuarios = []
     
@@ -49,14 +51,18 @@ def register():
         senha = request.form["senha"]
 
         try:
-            resp = db.buscar_usuario_por_nome(nome)
-            if resp and resp.data:
+            if db.usuario_existe(nome):
                 flash("Usuário já existe", "warning")
                 return redirect(url_for("auth_bp.register"))
         except Exception:
             pass
 
-        db.inserir_usuario(nome, tipo, senha)
+        try:
+            db.inserir_usuario(nome, tipo, senha)
+        except (SenhasOcupadas, ValueError) as e:
+            # ValueError: o nome já existe (o diretório pode não saber ainda)
+            flash(str(e), "warning")
+            return redirect(url_for("auth_bp.register"))
         flash("Usuário cadastrado com sucesso! Faça login.", "success")
         return redirect(url_for("auth_bp.login"))
 
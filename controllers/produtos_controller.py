@@ -1,6 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session
 from functools import wraps
-from models import db
+from models import db, db_async
 
 produtos_bp = Blueprint("produtos_bp", __name__)
 
@@ -75,26 +75,11 @@ def produtos():
         except Exception as e:
             flash(f"❌ Erro: {str(e)}", "danger")
 
-    # GET: buscar dados
-    resp_produtos = db.listar_produtos()
-    resp_locais = db.listar_locais_estoque()
-    resp_fornecedores = db.listar_fornecedores()
-    resp_categorias = db.listar_categorias()
-
-    produtos = resp_produtos.data or []
-    locais = resp_locais.data or []
-    fornecedores = resp_fornecedores.data or []
-    categorias = resp_categorias.data or []
-
-    # Dicionários para mostrar nomes
-    locais_dict = {l["id"]: l["nome_local"] for l in locais}
-    fornecedores_dict = {f["id"]: f["nome_fornecedor"] for f in fornecedores}
-    categorias_dict = {c["id"]: c["nome_categoria"] for c in categorias}
-
-    for p in produtos:
-        p["local_nome"] = locais_dict.get(p["id_local"], "N/A")
-        p["fornecedor_nome"] = fornecedores_dict.get(p["id_fornecedor"], "N/A")
-        p["categoria_nome"] = categorias_dict.get(p["id_categoria"], "N/A")
+    # GET: produtos já vêm com os nomes; listas auxiliares do cache.
+    # As quatro leituras rodam em paralelo no laço assíncrono.
+    produtos, locais, fornecedores, categorias = db_async.executar(
+        db_async.carregar_pagina_produtos()
+    )
 
     return render_template(
         "produtos.html",
@@ -24,20 +24,732 @@ create table if not exists public."FORNECEDOR" (
 create table if not exists public."PRODUTOS" (
   id bigint generated by default as identity primary key,
   nome_produto text not null,
-  custo_produto_Unit numeric(10,2) not null,
-  valor_venda_Unit numeric(10,2) not null,
+  "custo_produto_Unit" numeric(10,2) not null,
+  "valor_venda_Unit" numeric(10,2) not null,
   id_local bigint not null references public."LOCAL_ESTOQUE"(id),
   id_categoria bigint not null references public."CATEGORIA"(id),
   id_fornecedor bigint not null references public."FORNECEDOR"(id),
   quantidade integer not null default 0,
-  estoque_minimo integer not null default 0
+  estoque_minimo integer not null default 0,
+  estoque_maximo integer not null default 999999,
+  -- Sincronização (GET /api/sync): gravados pelo gatilho produtos_versao
+  versao bigint not null default 0,
+  atualizado_em timestamp with time zone default now() not null
 );
 
+-- No Postgres esta tabela passa a ser particionada por mês com
+-- migrations/0003_movimento_particionado.sql (python scripts/migrar.py)
 CREATE TABLE IF NOT EXISTS public."MOVIMENTO_ESTOQUE" (
   id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
   id_produto BIGINT NOT NULL REFERENCES public."PRODUTOS"(id),
   id_usuario BIGINT NOT NULL REFERENCES public."USUARIOS"(id),
   tipo_movimento VARCHAR(10) NOT NULL CHECK (tipo_movimento IN ('ENTRADA', 'SAIDA')),
   quantidade INTEGER NOT NULL CHECK (quantidade > 0),
-  data_movimento TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
-);
\ No newline at end of file
+  data_movimento TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL,
+  -- Sincronização (GET /api/sync): gravada pelo gatilho movimento_estoque_versao
+  versao BIGINT NOT NULL DEFAULT 0
+);
+
+-- Saldo de cada produto no fim de cada dia (UTC) em que a quantidade mudou,
+-- gravado pelo gatilho produtos_saldo_diario (abaixo). A quantidade numa data
+-- passada sai do saldo mais próximo, sem repassar o histórico inteiro.
+CREATE TABLE IF NOT EXISTS public."SALDO_DIARIO" (
+  id_produto BIGINT NOT NULL REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  dia DATE NOT NULL,
+  quantidade INTEGER NOT NULL,
+  PRIMARY KEY (id_produto, dia)
+);
+
+-- Resumo do estoque por (categoria, local, fornecedor): produtos, quantidade
+-- e valor de custo/venda do que está em estoque. Os relatórios
+-- (GET /api/relatorios/*) somam estas poucas linhas em vez de percorrer
+-- PRODUTOS. Sem chaves estrangeiras: um grupo que fica sem produtos sai do
+-- resumo na consolidação (consolidar_resumo_estoque, abaixo).
+CREATE TABLE IF NOT EXISTS public."RESUMO_ESTOQUE" (
+  id_categoria BIGINT NOT NULL,
+  id_local BIGINT NOT NULL,
+  id_fornecedor BIGINT NOT NULL,
+  produtos INTEGER NOT NULL DEFAULT 0,
+  quantidade BIGINT NOT NULL DEFAULT 0,
+  valor_custo NUMERIC NOT NULL DEFAULT 0,
+  valor_venda NUMERIC NOT NULL DEFAULT 0,
+  abaixo_minimo INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (id_categoria, id_local, id_fornecedor)
+);
+
+-- Diferenças ainda não somadas a RESUMO_ESTOQUE, gravadas pelo gatilho
+-- produtos_resumo_estoque. Cada mudança em PRODUTOS só acrescenta uma linha
+-- aqui: movimentos concorrentes (e lotes que passam por vários grupos em
+-- ordens diferentes) não disputam a trava de uma mesma linha do resumo.
+CREATE TABLE IF NOT EXISTS public."RESUMO_ESTOQUE_PENDENTE" (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  id_categoria BIGINT NOT NULL,
+  id_local BIGINT NOT NULL,
+  id_fornecedor BIGINT NOT NULL,
+  produtos INTEGER NOT NULL,
+  quantidade BIGINT NOT NULL,
+  valor_custo NUMERIC NOT NULL,
+  valor_venda NUMERIC NOT NULL,
+  abaixo_minimo INTEGER NOT NULL
+);
+
+-- Produtos em alerta: quantidade até 120% do estoque_minimo (MINIMO) ou a
+-- partir de 80% do estoque_maximo (MAXIMO), desde quando estão nessa
+-- situação. Mantida pelo gatilho produtos_alerta_estoque (abaixo): listar os
+-- alertas (GET /api/alertas) lê só estas linhas, não o catálogo inteiro.
+CREATE TABLE IF NOT EXISTS public."ALERTA_ESTOQUE" (
+  id_produto BIGINT PRIMARY KEY REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  tipo_alerta VARCHAR(10) NOT NULL CHECK (tipo_alerta IN ('MINIMO', 'MAXIMO')),
+  quantidade INTEGER NOT NULL,
+  limite INTEGER NOT NULL,
+  desde TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Consumo diário de cada produto: média móvel exponencial (EWMA) das saídas
+-- por dia, base das sugestões de reposição (GET /api/reposicao). Calculada
+-- por atualizar_consumo (abaixo) para o catálogo inteiro de uma vez, só com
+-- os dias fechados desde CONSUMO_MARCA.calculado_ate.
+CREATE TABLE IF NOT EXISTS public."CONSUMO_PRODUTO" (
+  id_produto BIGINT PRIMARY KEY REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  consumo_diario DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+-- Último dia (UTC) já somado em CONSUMO_PRODUTO; uma única linha
+CREATE TABLE IF NOT EXISTS public."CONSUMO_MARCA" (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  calculado_ate DATE NOT NULL
+);
+
+-- Tokens JWT revogados (logout) ainda não expirados. Cada worker da API
+-- guarda a lista em memória e relê só as revogações recentes
+-- (models/tokens.py); as expiradas são apagadas a cada nova revogação.
+CREATE TABLE IF NOT EXISTS public."TOKENS_REVOGADOS" (
+  jti VARCHAR(64) PRIMARY KEY,
+  expira_em TIMESTAMP WITH TIME ZONE NOT NULL,
+  revogado_em TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Produtos excluídos, para a sincronização avisar os aplicativos (uma
+-- linha por produto, gravada pelo gatilho produtos_exclusao_versao).
+CREATE TABLE IF NOT EXISTS public."PRODUTOS_EXCLUIDOS" (
+  id_produto BIGINT PRIMARY KEY,
+  versao BIGINT NOT NULL,
+  excluido_em TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Ajustes da reconciliação (scripts/reconciliar_estoque.py --corrigir): a
+-- diferença entre PRODUTOS.quantidade e o razão de movimentos, fora de
+-- MOVIMENTO_ESTOQUE. A quantidade não muda; um ajuste não é entrada nem
+-- saída, então não entra no consumo (atualizar_consumo) nem na quantidade
+-- num instante (db.quantidade_em), que já vê a quantidade pelo saldo diário.
+CREATE TABLE IF NOT EXISTS public."AJUSTE_ESTOQUE" (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  id_produto BIGINT NOT NULL REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  id_usuario BIGINT NOT NULL REFERENCES public."USUARIOS"(id),
+  diferenca INTEGER NOT NULL CHECK (diferenca <> 0),
+  data_ajuste TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+-- Índices dos caminhos quentes (bancos já existentes: migrations/0002_indices.sql)
+-- Login e cadastro buscam o usuário pelo nome; o INCLUDE permite responder
+-- só com o índice (index-only scan).
+create unique index if not exists usuarios_nome_usuario_key
+  on public."USUARIOS" (nome_usuario) include (id, tipo_usuario, senha_usuario);
+
+-- Chaves estrangeiras: o Postgres não indexa o lado que referencia, e cada
+-- DELETE em CATEGORIA/LOCAL_ESTOQUE/FORNECEDOR/PRODUTOS/USUARIOS procura
+-- as linhas que ainda o referenciam.
+create index if not exists produtos_id_local_idx on public."PRODUTOS" (id_local);
+create index if not exists produtos_id_categoria_idx on public."PRODUTOS" (id_categoria);
+create index if not exists produtos_id_fornecedor_idx on public."PRODUTOS" (id_fornecedor);
+create index if not exists movimento_estoque_id_usuario_idx on public."MOVIMENTO_ESTOQUE" (id_usuario);
+create index if not exists ajuste_estoque_id_produto_idx on public."AJUSTE_ESTOQUE" (id_produto);
+
+-- Histórico de um produto por período (e a verificação da FK para PRODUTOS)
+create index if not exists movimento_estoque_produto_data_idx
+  on public."MOVIMENTO_ESTOQUE" (id_produto, data_movimento);
+
+-- Sincronização dos aplicativos: o que mudou a partir de uma versão
+create index if not exists produtos_versao_idx on public."PRODUTOS" (versao, id);
+create index if not exists movimento_estoque_versao_idx on public."MOVIMENTO_ESTOQUE" (versao, id);
+create index if not exists produtos_excluidos_versao_idx
+  on public."PRODUTOS_EXCLUIDOS" (versao, id_produto);
+
+-- Sincronização da lista de tokens revogados (só as mais recentes)
+create index if not exists tokens_revogados_revogado_em_idx
+  on public."TOKENS_REVOGADOS" (revogado_em);
+
+-- Movimentação atômica de estoque (entrada/saída).
+-- Trava a linha do produto, valida mínimo/máximo, atualiza a quantidade e
+-- registra o movimento numa única transação: uma única chamada via RPC e
+-- nenhuma atualização perdida entre movimentos concorrentes.
+CREATE OR REPLACE FUNCTION public.movimentar_estoque(
+  p_id_produto BIGINT,
+  p_tipo_movimento VARCHAR,
+  p_quantidade INTEGER,
+  p_id_usuario BIGINT DEFAULT NULL
+) RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_produto public."PRODUTOS"%ROWTYPE;
+  v_nova_quantidade INTEGER;
+BEGIN
+  IF p_tipo_movimento NOT IN ('ENTRADA', 'SAIDA') THEN
+    RAISE EXCEPTION 'Tipo de movimento inválido: %', p_tipo_movimento;
+  END IF;
+
+  IF p_quantidade IS NULL OR p_quantidade <= 0 THEN
+    IF p_tipo_movimento = 'ENTRADA' THEN
+      RAISE EXCEPTION 'Quantidade de entrada deve ser maior que zero';
+    END IF;
+    RAISE EXCEPTION 'Quantidade de saída deve ser maior que zero';
+  END IF;
+
+  SELECT * INTO v_produto
+  FROM public."PRODUTOS"
+  WHERE id = p_id_produto
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'Produto não encontrado';
+  END IF;
+
+  IF p_tipo_movimento = 'ENTRADA' THEN
+    v_nova_quantidade := v_produto.quantidade + p_quantidade;
+
+    IF v_nova_quantidade > v_produto.estoque_maximo THEN
+      RAISE EXCEPTION 'Entrada negada! Estoque máximo do produto ''%'' é %. Estoque atual: %. Tentativa de entrada: %. Estoque resultante seria: %.',
+        v_produto.nome_produto, v_produto.estoque_maximo, v_produto.quantidade,
+        p_quantidade, v_nova_quantidade;
+    END IF;
+  ELSE
+    IF v_produto.quantidade < p_quantidade THEN
+      RAISE EXCEPTION 'Estoque insuficiente! Produto ''%'' tem apenas % unidades. Tentativa de saída: %.',
+        v_produto.nome_produto, v_produto.quantidade, p_quantidade;
+    END IF;
+
+    v_nova_quantidade := v_produto.quantidade - p_quantidade;
+
+    IF v_nova_quantidade < v_produto.estoque_minimo THEN
+      RAISE EXCEPTION 'Saída negada! Estoque mínimo do produto ''%'' é %. Estoque atual: %. Tentativa de saída: %. Estoque resultante seria: %.',
+        v_produto.nome_produto, v_produto.estoque_minimo, v_produto.quantidade,
+        p_quantidade, v_nova_quantidade;
+    END IF;
+  END IF;
+
+  UPDATE public."PRODUTOS"
+  SET quantidade = v_nova_quantidade
+  WHERE id = p_id_produto;
+
+  IF p_id_usuario IS NOT NULL THEN
+    INSERT INTO public."MOVIMENTO_ESTOQUE" (id_produto, id_usuario, tipo_movimento, quantidade)
+    VALUES (p_id_produto, p_id_usuario, p_tipo_movimento, p_quantidade);
+  END IF;
+
+  RETURN json_build_object(
+    'id', v_produto.id,
+    'nome_produto', v_produto.nome_produto,
+    'quantidade', v_nova_quantidade,
+    'estoque_minimo', v_produto.estoque_minimo,
+    'estoque_maximo', v_produto.estoque_maximo
+  );
+END;
+$$;
+
+
+-- Movimentação em lote (uploads dos coletores).
+-- Recebe um array JSON de {id_produto, tipo_movimento, quantidade}, trava de
+-- uma vez todos os produtos envolvidos (sempre na mesma ordem, evitando
+-- deadlock entre lotes concorrentes) e aplica cada linha com
+-- movimentar_estoque. Retorna o resultado de cada linha. Com
+-- p_tudo_ou_nada, qualquer falha desfaz o lote inteiro.
+CREATE OR REPLACE FUNCTION public.movimentar_estoque_lote(
+  p_movimentos JSONB,
+  p_id_usuario BIGINT DEFAULT NULL,
+  p_tudo_ou_nada BOOLEAN DEFAULT FALSE
+) RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_linha RECORD;
+  v_produto JSON;
+  v_resultados JSONB := '[]'::JSONB;
+  v_falhas INTEGER := 0;
+BEGIN
+  PERFORM 1
+  FROM public."PRODUTOS"
+  WHERE id IN (
+    SELECT DISTINCT (m->>'id_produto')::BIGINT
+    FROM jsonb_array_elements(p_movimentos) AS m
+  )
+  ORDER BY id
+  FOR UPDATE;
+
+  BEGIN
+    FOR v_linha IN
+      SELECT m.valor, m.linha - 1 AS linha
+      FROM jsonb_array_elements(p_movimentos) WITH ORDINALITY AS m(valor, linha)
+    LOOP
+      BEGIN
+        v_produto := public.movimentar_estoque(
+          (v_linha.valor->>'id_produto')::BIGINT,
+          v_linha.valor->>'tipo_movimento',
+          (v_linha.valor->>'quantidade')::INTEGER,
+          p_id_usuario
+        );
+        v_resultados := v_resultados || jsonb_build_array(jsonb_build_object(
+          'linha', v_linha.linha,
+          'sucesso', TRUE,
+          'produto', v_produto::JSONB
+        ));
+      EXCEPTION WHEN OTHERS THEN
+        -- Regras de negócio (raise_exception) e erros do banco numa linha
+        -- (chave estrangeira, CHECK, valor fora da faixa) só recusam a linha
+        v_falhas := v_falhas + 1;
+        v_resultados := v_resultados || jsonb_build_array(jsonb_build_object(
+          'linha', v_linha.linha,
+          'sucesso', FALSE,
+          'erro', SQLERRM,
+          'codigo', SQLSTATE
+        ));
+      END;
+    END LOOP;
+
+    IF p_tudo_ou_nada AND v_falhas > 0 THEN
+      RAISE EXCEPTION 'Lote cancelado' USING ERRCODE = 'ES001';
+    END IF;
+  EXCEPTION WHEN SQLSTATE 'ES001' THEN
+    -- Tudo ou nada: as alterações do bloco foram desfeitas; as linhas que
+    -- tinham sido aplicadas passam a constar como não aplicadas.
+    SELECT jsonb_agg(
+      CASE WHEN (r->>'sucesso')::BOOLEAN
+        THEN jsonb_build_object(
+          'linha', r->'linha',
+          'sucesso', FALSE,
+          'erro', 'Lote cancelado: outra linha do lote falhou'
+        )
+        ELSE r
+      END
+      ORDER BY (r->>'linha')::INTEGER
+    )
+    INTO v_resultados
+    FROM jsonb_array_elements(v_resultados) AS r;
+  END;
+
+  RETURN v_resultados::JSON;
+END;
+$$;
+
+
+-- Campo calculado do PostgREST para o filtro "abaixo do mínimo"
+-- (GET /PRODUTOS?abaixo_minimo=is.true), já que o PostgREST não compara
+-- duas colunas entre si.
+CREATE OR REPLACE FUNCTION public.abaixo_minimo(public."PRODUTOS")
+RETURNS BOOLEAN
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT $1.quantidade < $1.estoque_minimo;
+$$;
+
+
+-- Saldo diário: a cada produto criado e a cada mudança de quantidade
+-- (movimentar_estoque, lotes, edição do cadastro) grava o saldo do dia,
+-- na mesma transação da mudança. Bancos já existentes:
+-- migrations/0004_saldo_diario.sql.
+CREATE OR REPLACE FUNCTION public.registrar_saldo_diario()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' AND NEW.quantidade = OLD.quantidade THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public."SALDO_DIARIO" (id_produto, dia, quantidade)
+  VALUES (NEW.id, (now() AT TIME ZONE 'UTC')::DATE, NEW.quantidade)
+  ON CONFLICT (id_produto, dia) DO UPDATE SET quantidade = EXCLUDED.quantidade;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_saldo_diario ON public."PRODUTOS";
+CREATE TRIGGER produtos_saldo_diario
+  AFTER INSERT OR UPDATE OF quantidade ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_saldo_diario();
+
+
+-- Resumo do estoque: a cada produto criado, editado, excluído ou
+-- movimentado (movimentar_estoque, lotes), grava em RESUMO_ESTOQUE_PENDENTE
+-- a diferença que a mudança causa no grupo do produto (duas linhas se ele
+-- trocou de categoria, local ou fornecedor). Bancos já existentes:
+-- migrations/0005_resumo_estoque.sql.
+CREATE OR REPLACE FUNCTION public.registrar_resumo_estoque()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public."RESUMO_ESTOQUE_PENDENTE" (
+    id_categoria, id_local, id_fornecedor,
+    produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+  )
+  SELECT id_categoria, id_local, id_fornecedor,
+    SUM(produtos), SUM(quantidade), SUM(valor_custo), SUM(valor_venda), SUM(abaixo_minimo)
+  FROM (
+    SELECT OLD.id_categoria, OLD.id_local, OLD.id_fornecedor,
+      -1 AS produtos,
+      -OLD.quantidade AS quantidade,
+      -(OLD.quantidade * OLD."custo_produto_Unit") AS valor_custo,
+      -(OLD.quantidade * OLD."valor_venda_Unit") AS valor_venda,
+      -(OLD.quantidade < OLD.estoque_minimo)::INTEGER AS abaixo_minimo
+    WHERE TG_OP <> 'INSERT'
+    UNION ALL
+    SELECT NEW.id_categoria, NEW.id_local, NEW.id_fornecedor,
+      1,
+      NEW.quantidade,
+      NEW.quantidade * NEW."custo_produto_Unit",
+      NEW.quantidade * NEW."valor_venda_Unit",
+      (NEW.quantidade < NEW.estoque_minimo)::INTEGER
+    WHERE TG_OP <> 'DELETE'
+  ) AS diferenca (id_categoria, id_local, id_fornecedor,
+                  produtos, quantidade, valor_custo, valor_venda, abaixo_minimo)
+  GROUP BY id_categoria, id_local, id_fornecedor;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_resumo_estoque ON public."PRODUTOS";
+CREATE TRIGGER produtos_resumo_estoque
+  AFTER INSERT OR DELETE OR UPDATE OF
+    quantidade, "custo_produto_Unit", "valor_venda_Unit", estoque_minimo,
+    id_categoria, id_local, id_fornecedor
+  ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_resumo_estoque();
+
+
+-- Soma as diferenças pendentes ao resumo e as apaga, numa só transação.
+-- Um consolidador por vez (trava consultiva); quem não consegue a trava
+-- devolve -1 sem esperar, e a leitura soma o resumo com as pendentes.
+CREATE OR REPLACE FUNCTION public.consolidar_resumo_estoque()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_grupos INTEGER;
+BEGIN
+  IF NOT pg_try_advisory_xact_lock(7301005) THEN
+    RETURN -1;
+  END IF;
+
+  WITH pendentes AS (
+    DELETE FROM public."RESUMO_ESTOQUE_PENDENTE" RETURNING *
+  )
+  INSERT INTO public."RESUMO_ESTOQUE" AS r (
+    id_categoria, id_local, id_fornecedor,
+    produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+  )
+  SELECT id_categoria, id_local, id_fornecedor,
+    SUM(produtos), SUM(quantidade), SUM(valor_custo), SUM(valor_venda), SUM(abaixo_minimo)
+  FROM pendentes
+  GROUP BY id_categoria, id_local, id_fornecedor
+  ON CONFLICT (id_categoria, id_local, id_fornecedor) DO UPDATE SET
+    produtos = r.produtos + EXCLUDED.produtos,
+    quantidade = r.quantidade + EXCLUDED.quantidade,
+    valor_custo = r.valor_custo + EXCLUDED.valor_custo,
+    valor_venda = r.valor_venda + EXCLUDED.valor_venda,
+    abaixo_minimo = r.abaixo_minimo + EXCLUDED.abaixo_minimo;
+  GET DIAGNOSTICS v_grupos = ROW_COUNT;
+
+  -- Grupo sem produtos: todas as somas voltaram a zero
+  DELETE FROM public."RESUMO_ESTOQUE" WHERE produtos = 0;
+  RETURN v_grupos;
+END;
+$$;
+
+
+-- Relatório do estoque: consolida o resumo e devolve as somas no total
+-- (p_agrupar_por NULL) ou por 'categoria', 'local' ou 'fornecedor', como um
+-- array JSON de {grupo, produtos, quantidade, valor_custo, valor_venda,
+-- abaixo_minimo}. Chamada via RPC (POST), já que grava na consolidação.
+CREATE OR REPLACE FUNCTION public.resumo_estoque(p_agrupar_por TEXT DEFAULT NULL)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_grupos JSON;
+BEGIN
+  IF p_agrupar_por IS NOT NULL AND p_agrupar_por NOT IN ('categoria', 'local', 'fornecedor') THEN
+    RAISE EXCEPTION 'Agrupamento inválido: %', p_agrupar_por;
+  END IF;
+
+  PERFORM public.consolidar_resumo_estoque();
+
+  SELECT COALESCE(json_agg(g ORDER BY g.grupo), '[]'::JSON)
+  INTO v_grupos
+  FROM (
+    SELECT
+      CASE p_agrupar_por
+        WHEN 'categoria' THEN id_categoria
+        WHEN 'local' THEN id_local
+        WHEN 'fornecedor' THEN id_fornecedor
+      END AS grupo,
+      SUM(produtos)::BIGINT AS produtos,
+      SUM(quantidade)::BIGINT AS quantidade,
+      SUM(valor_custo) AS valor_custo,
+      SUM(valor_venda) AS valor_venda,
+      SUM(abaixo_minimo)::BIGINT AS abaixo_minimo
+    FROM (
+      SELECT id_categoria, id_local, id_fornecedor,
+        produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+      FROM public."RESUMO_ESTOQUE"
+      UNION ALL
+      SELECT id_categoria, id_local, id_fornecedor,
+        produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+      FROM public."RESUMO_ESTOQUE_PENDENTE"
+    ) AS r
+    GROUP BY 1
+    HAVING SUM(produtos) <> 0
+  ) AS g;
+
+  RETURN v_grupos;
+END;
+$$;
+
+
+-- Alertas de estoque: a cada produto criado e a cada mudança de quantidade
+-- ou de limites, inclui, atualiza ou remove o produto de ALERTA_ESTOQUE.
+-- A mesma regra de db.perto_do_minimo/perto_do_maximo, em inteiros (120%
+-- e 80% sem arredondamento; BIGINT porque quantidade * 5 passa do INTEGER).
+-- Bancos já existentes: migrations/0006_alerta_estoque.sql e 0011.
+CREATE OR REPLACE FUNCTION public.registrar_alerta_estoque()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_tipo VARCHAR(10);
+BEGIN
+  v_tipo := CASE
+    WHEN NEW.quantidade::BIGINT * 5 <= NEW.estoque_minimo::BIGINT * 6 THEN 'MINIMO'
+    WHEN NEW.quantidade::BIGINT * 5 >= NEW.estoque_maximo::BIGINT * 4 THEN 'MAXIMO'
+  END;
+
+  IF v_tipo IS NULL THEN
+    -- Só apaga se o produto estava em alerta (evita um DELETE por movimento)
+    IF TG_OP = 'UPDATE' AND (
+      OLD.quantidade::BIGINT * 5 <= OLD.estoque_minimo::BIGINT * 6
+      OR OLD.quantidade::BIGINT * 5 >= OLD.estoque_maximo::BIGINT * 4
+    ) THEN
+      DELETE FROM public."ALERTA_ESTOQUE" WHERE id_produto = NEW.id;
+    END IF;
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public."ALERTA_ESTOQUE" AS a (id_produto, tipo_alerta, quantidade, limite)
+  VALUES (
+    NEW.id,
+    v_tipo,
+    NEW.quantidade,
+    CASE v_tipo WHEN 'MINIMO' THEN NEW.estoque_minimo ELSE NEW.estoque_maximo END
+  )
+  ON CONFLICT (id_produto) DO UPDATE SET
+    tipo_alerta = EXCLUDED.tipo_alerta,
+    quantidade = EXCLUDED.quantidade,
+    limite = EXCLUDED.limite,
+    desde = CASE WHEN a.tipo_alerta = EXCLUDED.tipo_alerta THEN a.desde ELSE EXCLUDED.desde END;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_alerta_estoque ON public."PRODUTOS";
+CREATE TRIGGER produtos_alerta_estoque
+  AFTER INSERT OR UPDATE OF quantidade, estoque_minimo, estoque_maximo ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_alerta_estoque();
+
+
+-- Soma ao consumo diário (EWMA, alfa 0.1: os últimos ~20 dias pesam mais)
+-- os dias fechados desde a marca até ontem, para todos os produtos num só
+-- comando. De m (na marca) a n dias depois, com s(d) as saídas do dia d:
+--   m' = m * (1 - alfa)^n + alfa * soma(s(d) * (1 - alfa)^(ontem - d))
+-- Sem marca, começa 90 dias atrás. Um cálculo por vez (trava consultiva);
+-- devolve os dias somados, 0 se já estava em dia e -1 se outro está rodando.
+CREATE OR REPLACE FUNCTION public.atualizar_consumo()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_alfa CONSTANT DOUBLE PRECISION := 0.1;
+  v_ate DATE := (now() AT TIME ZONE 'UTC')::DATE - 1;
+  v_marca DATE;
+BEGIN
+  IF NOT pg_try_advisory_xact_lock(7301006) THEN
+    RETURN -1;
+  END IF;
+
+  SELECT calculado_ate INTO v_marca FROM public."CONSUMO_MARCA";
+  v_marca := COALESCE(v_marca, v_ate - 90);
+  IF v_marca >= v_ate THEN
+    RETURN 0;
+  END IF;
+
+  WITH saidas AS (
+    SELECT id_produto,
+      SUM(quantidade * power(1 - v_alfa, v_ate - (data_movimento AT TIME ZONE 'UTC')::DATE)) AS peso
+    FROM public."MOVIMENTO_ESTOQUE"
+    WHERE tipo_movimento = 'SAIDA'
+      AND data_movimento >= (v_marca + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+      AND data_movimento < (v_ate + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+    GROUP BY id_produto
+  )
+  INSERT INTO public."CONSUMO_PRODUTO" (id_produto, consumo_diario)
+  SELECT p.id,
+    COALESCE(c.consumo_diario, 0) * power(1 - v_alfa, v_ate - v_marca) + v_alfa * COALESCE(s.peso, 0)
+  FROM public."PRODUTOS" p
+  LEFT JOIN public."CONSUMO_PRODUTO" c ON c.id_produto = p.id
+  LEFT JOIN saidas s ON s.id_produto = p.id
+  WHERE c.id_produto IS NOT NULL OR s.id_produto IS NOT NULL
+  ON CONFLICT (id_produto) DO UPDATE SET consumo_diario = EXCLUDED.consumo_diario;
+
+  INSERT INTO public."CONSUMO_MARCA" (id, calculado_ate) VALUES (TRUE, v_ate)
+  ON CONFLICT (id) DO UPDATE SET calculado_ate = EXCLUDED.calculado_ate;
+  RETURN v_ate - v_marca;
+END;
+$$;
+
+
+-- Produtos a repor: atualiza o consumo e devolve {calculado_ate, produtos}
+-- com os produtos que já estão no mínimo ou chegam a ele em até
+-- p_horizonte dias no consumo atual. As quantidades sugeridas são
+-- calculadas na aplicação (db.sugestao_reposicao). Chamada via RPC (POST),
+-- já que grava no cálculo do consumo.
+CREATE OR REPLACE FUNCTION public.reposicao(p_horizonte INTEGER DEFAULT 14)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_resultado JSON;
+BEGIN
+  IF p_horizonte IS NULL OR p_horizonte < 0 THEN
+    RAISE EXCEPTION 'Horizonte inválido: %', p_horizonte;
+  END IF;
+
+  PERFORM public.atualizar_consumo();
+
+  SELECT json_build_object(
+    'calculado_ate', (SELECT calculado_ate FROM public."CONSUMO_MARCA"),
+    'produtos', COALESCE(json_agg(r ORDER BY r.id_produto), '[]'::JSON)
+  )
+  INTO v_resultado
+  FROM (
+    SELECT p.id AS id_produto, p.nome_produto, p.id_fornecedor, p.quantidade,
+      p.estoque_minimo, p.estoque_maximo, p."custo_produto_Unit",
+      COALESCE(c.consumo_diario, 0) AS consumo_diario
+    FROM public."PRODUTOS" p
+    LEFT JOIN public."CONSUMO_PRODUTO" c ON c.id_produto = p.id
+    WHERE p.quantidade <= p.estoque_minimo
+      OR p.quantidade - p.estoque_minimo <= c.consumo_diario * p_horizonte
+  ) r;
+  RETURN v_resultado;
+END;
+$$;
+
+
+-- Versões da sincronização (GET /api/sync). Cada produto gravado e cada
+-- movimento novo recebe em `versao` o id da transação que o gravou, e cada
+-- produto excluído deixa uma linha em PRODUTOS_EXCLUIDOS, em todos os
+-- caminhos de escrita (API, funções do banco, SQL direto). As transações não
+-- terminam na ordem dos ids: quem sincroniza guarda versao_sincronizacao()
+-- (lida antes dos dados) e na vez seguinte pede versao >= ela, que cobre
+-- as transações que ainda estavam em andamento. Bancos já existentes:
+-- migrations/0009_sincronizacao.sql.
+CREATE OR REPLACE FUNCTION public.marcar_versao()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.versao := pg_current_xact_id()::TEXT::BIGINT;
+  IF TG_TABLE_NAME = 'PRODUTOS' THEN
+    NEW.atualizado_em := now();
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.registrar_produto_excluido()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public."PRODUTOS_EXCLUIDOS" (id_produto, versao)
+  VALUES (OLD.id, pg_current_xact_id()::TEXT::BIGINT)
+  ON CONFLICT (id_produto) DO UPDATE SET versao = EXCLUDED.versao, excluido_em = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_versao ON public."PRODUTOS";
+CREATE TRIGGER produtos_versao
+  BEFORE INSERT OR UPDATE ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.marcar_versao();
+
+DROP TRIGGER IF EXISTS produtos_exclusao_versao ON public."PRODUTOS";
+CREATE TRIGGER produtos_exclusao_versao
+  AFTER DELETE ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_produto_excluido();
+
+DROP TRIGGER IF EXISTS movimento_estoque_versao ON public."MOVIMENTO_ESTOQUE";
+CREATE TRIGGER movimento_estoque_versao
+  BEFORE INSERT ON public."MOVIMENTO_ESTOQUE"
+  FOR EACH ROW EXECUTE FUNCTION public.marcar_versao();
+
+-- Menor versão que ainda pode aparecer: a da transação mais antiga em
+-- andamento (ou a próxima, se não há nenhuma)
+CREATE OR REPLACE FUNCTION public.versao_sincronizacao()
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT;
+$$;
+
+-- Versão de PRODUTOS (com os excluídos) ou de MOVIMENTO_ESTOQUE, usada como
+-- ETag das listagens da API (db.versao_tabelas): a maior versao gravada e as
+-- transações ainda em andamento com id menor, cujo fim muda o texto mesmo
+-- sem mudar o máximo. Como as versões vêm dos gatilhos acima, muda com
+-- qualquer escrita (API, scripts, migrações, SQL direto). Bancos já
+-- existentes: migrations/0012_versao_tabela.sql.
+-- Contrapartida: o snapshot não diz que tabela cada transação escreve, então
+-- entram no texto todas as transações em andamento com id menor, de qualquer
+-- tabela (ex.: TOKENS_REVOGADOS, RESUMO_ESTOQUE_PENDENTE). Quando uma delas
+-- termina, a ETag muda sem que a tabela tenha mudado, e o cliente recebe um
+-- 200 com a mesma lista em vez de um 304. É o preço de não perder a
+-- transação lenta da própria tabela: nunca um 304 errado, às vezes um 200 a
+-- mais.
+CREATE OR REPLACE FUNCTION public.versao_tabela(p_tabela TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_maxima BIGINT;
+  v_em_andamento TEXT;
+BEGIN
+  IF p_tabela = 'PRODUTOS' THEN
+    v_maxima := greatest(
+      (SELECT max(versao) FROM public."PRODUTOS"),
+      (SELECT max(versao) FROM public."PRODUTOS_EXCLUIDOS")
+    );
+  ELSIF p_tabela = 'MOVIMENTO_ESTOQUE' THEN
+    v_maxima := (SELECT max(versao) FROM public."MOVIMENTO_ESTOQUE");
+  ELSE
+    RAISE EXCEPTION 'Tabela sem versão: %', p_tabela;
+  END IF;
+  v_maxima := coalesce(v_maxima, 0);
+
+  SELECT string_agg(x::TEXT, ',' ORDER BY x::TEXT::BIGINT) INTO v_em_andamento
+  FROM pg_snapshot_xip(pg_current_snapshot()) AS x
+  WHERE x::TEXT::BIGINT < v_maxima;
+
+  RETURN v_maxima::TEXT || coalesce(':' || v_em_andamento, '');
+END;
+$$;
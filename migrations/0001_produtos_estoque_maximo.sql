@@ -0,0 +1,29 @@
+-- PRODUTOS: coluna estoque_maximo e nomes das colunas de preço.
+--
+-- Bancos criados com versões antigas do createdb.sql não têm estoque_maximo
+-- (que inserir_produto e movimentar_estoque usam) e, como os nomes de preço
+-- não estavam entre aspas, o Postgres os criou em minúsculas
+-- (custo_produto_unit), diferente do que o app lê e grava.
+
+ALTER TABLE public."PRODUTOS"
+  ADD COLUMN IF NOT EXISTS estoque_maximo INTEGER NOT NULL DEFAULT 999999;
+
+DO $$
+BEGIN
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = 'PRODUTOS'
+      AND column_name = 'custo_produto_unit'
+  ) THEN
+    ALTER TABLE public."PRODUTOS" RENAME COLUMN custo_produto_unit TO "custo_produto_Unit";
+  END IF;
+
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+    WHERE table_schema = 'public' AND table_name = 'PRODUTOS'
+      AND column_name = 'valor_venda_unit'
+  ) THEN
+    ALTER TABLE public."PRODUTOS" RENAME COLUMN valor_venda_unit TO "valor_venda_Unit";
+  END IF;
+END;
+$$;
@@ -0,0 +1,42 @@
+-- Índices dos caminhos quentes (os mesmos de createdb.sql).
+--
+-- Em tabelas grandes, crie os índices antes com CREATE INDEX CONCURRENTLY
+-- (mesmos nomes) para não travar escritas; os IF NOT EXISTS abaixo passam
+-- a não fazer nada.
+
+-- O índice único falha se já houver nomes repetidos: aponte quais são.
+DO $$
+DECLARE
+  v_repetidos TEXT;
+BEGIN
+  SELECT string_agg(nome_usuario, ', ')
+  INTO v_repetidos
+  FROM (
+    SELECT nome_usuario FROM public."USUARIOS"
+    GROUP BY nome_usuario HAVING count(*) > 1
+  ) AS r;
+
+  IF v_repetidos IS NOT NULL THEN
+    RAISE EXCEPTION 'Usuários com nome repetido, resolva antes de migrar: %', v_repetidos;
+  END IF;
+END;
+$$;
+
+-- buscar_usuario_por_nome (login e cadastro), só com o índice
+CREATE UNIQUE INDEX IF NOT EXISTS usuarios_nome_usuario_key
+  ON public."USUARIOS" (nome_usuario) INCLUDE (id, tipo_usuario, senha_usuario);
+
+-- Verificação das chaves estrangeiras nos DELETE de CATEGORIA,
+-- LOCAL_ESTOQUE, FORNECEDOR e USUARIOS
+CREATE INDEX IF NOT EXISTS produtos_id_local_idx ON public."PRODUTOS" (id_local);
+CREATE INDEX IF NOT EXISTS produtos_id_categoria_idx ON public."PRODUTOS" (id_categoria);
+CREATE INDEX IF NOT EXISTS produtos_id_fornecedor_idx ON public."PRODUTOS" (id_fornecedor);
+CREATE INDEX IF NOT EXISTS movimento_estoque_id_usuario_idx ON public."MOVIMENTO_ESTOQUE" (id_usuario);
+
+-- Histórico de um produto por período e FK de MOVIMENTO_ESTOQUE para PRODUTOS
+CREATE INDEX IF NOT EXISTS movimento_estoque_produto_data_idx
+  ON public."MOVIMENTO_ESTOQUE" (id_produto, data_movimento);
+
+ANALYZE public."USUARIOS";
+ANALYZE public."PRODUTOS";
+ANALYZE public."MOVIMENTO_ESTOQUE";
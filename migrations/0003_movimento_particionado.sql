@@ -0,0 +1,206 @@
+-- MOVIMENTO_ESTOQUE particionada por mês de data_movimento.
+--
+-- Cada mês (UTC) fica numa partição própria, MOVIMENTO_ESTOQUE_AAAA_MM:
+-- inserções e consultas do histórico recente só tocam as partições e
+-- índices dos meses envolvidos, e meses antigos podem ser arquivados e
+-- removidos inteiros (scripts/manutencao_movimentos.py) sem DELETE em massa.
+--
+-- garantir_particoes_movimento() cria as partições do mês atual e dos
+-- próximos; rode-a diariamente (scripts/manutencao_movimentos.py ou, no
+-- Supabase, com pg_cron:
+--   SELECT cron.schedule('particoes-movimento', '0 3 * * *',
+--                        'SELECT public.garantir_particoes_movimento(3)');
+-- ). Se ainda assim chegar um movimento de um mês sem partição, ele vai para
+-- MOVIMENTO_ESTOQUE_padrao e é transferido quando a partição do mês for criada.
+--
+-- A chave primária passa a ser (id, data_movimento), exigência do Postgres
+-- para tabelas particionadas; o id continua único (sequência própria).
+-- As demais colunas, CHECKs, chaves estrangeiras, índices e gatilhos são os
+-- da tabela atual, lidos do catálogo: num banco criado com o createdb.sql
+-- atual, a coluna versao e o gatilho movimento_estoque_versao (0009) vêm
+-- junto, com os valores de versao preservados.
+--
+-- Janela de manutenção: scripts/migrar.py roda cada migração numa
+-- transação só, e esta mantém MOVIMENTO_ESTOQUE bloqueada (ACCESS
+-- EXCLUSIVE) da primeira linha ao COMMIT: movimentos e leituras do
+-- histórico esperam a cópia inteira. Copiar em lotes não encurta o bloqueio
+-- dentro de uma transação, e fora dela deixaria os movimentos gravados
+-- durante a cópia para trás. Conte com uns 17 s por milhão de movimentos
+-- (medido num Postgres 16 local: 10 milhões, 1,4 GB com os índices, em
+-- 2 min 50 s) e pare a API ou rode fora do horário de uso. Se outra
+-- transação estiver usando a tabela, a migração desiste depois de
+-- lock_timeout (10 s) em vez de enfileirar todas as requisições atrás dela;
+-- basta rodá-la de novo.
+
+SET LOCAL lock_timeout = '10s';
+LOCK TABLE public."MOVIMENTO_ESTOQUE" IN ACCESS EXCLUSIVE MODE;
+SET LOCAL lock_timeout = 0;
+
+ALTER TABLE public."MOVIMENTO_ESTOQUE" RENAME TO "MOVIMENTO_ESTOQUE_nao_particionada";
+ALTER INDEX IF EXISTS public."MOVIMENTO_ESTOQUE_pkey" RENAME TO "MOVIMENTO_ESTOQUE_nao_particionada_pkey";
+
+-- Índices e gatilhos da tabela atual, refeitos na particionada depois da
+-- cópia (mais rápido que manter os índices linha a linha, e os gatilhos,
+-- como o que grava versao, não reescrevem as linhas copiadas)
+CREATE TEMP TABLE movimento_objetos ON COMMIT DROP AS
+SELECT 'indice' AS tipo, c.relname AS nome, pg_get_indexdef(i.indexrelid) AS definicao
+FROM pg_index i
+JOIN pg_class c ON c.oid = i.indexrelid
+WHERE i.indrelid = 'public."MOVIMENTO_ESTOQUE_nao_particionada"'::regclass
+  AND NOT i.indisprimary
+UNION ALL
+SELECT 'gatilho', t.tgname, pg_get_triggerdef(t.oid)
+FROM pg_trigger t
+WHERE t.tgrelid = 'public."MOVIMENTO_ESTOQUE_nao_particionada"'::regclass
+  AND NOT t.tgisinternal;
+
+-- Libera os nomes dos índices para a tabela nova
+DO $$
+DECLARE
+  v_indice RECORD;
+BEGIN
+  FOR v_indice IN SELECT nome FROM movimento_objetos WHERE tipo = 'indice' LOOP
+    EXECUTE format('DROP INDEX public.%I', v_indice.nome);
+  END LOOP;
+END;
+$$;
+
+CREATE SEQUENCE public.movimento_estoque_id_seq;
+
+-- Todas as colunas (tipos, NOT NULL, defaults e CHECKs) da tabela atual; o
+-- id deixa de ser IDENTITY e passa a usar a sequência acima
+CREATE TABLE public."MOVIMENTO_ESTOQUE" (
+  LIKE public."MOVIMENTO_ESTOQUE_nao_particionada"
+    INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING GENERATED INCLUDING COMMENTS,
+  CONSTRAINT "MOVIMENTO_ESTOQUE_pkey" PRIMARY KEY (id, data_movimento)
+) PARTITION BY RANGE (data_movimento);
+
+ALTER TABLE public."MOVIMENTO_ESTOQUE"
+  ALTER COLUMN id SET DEFAULT nextval('public.movimento_estoque_id_seq');
+ALTER SEQUENCE public.movimento_estoque_id_seq OWNED BY public."MOVIMENTO_ESTOQUE".id;
+
+-- Chaves estrangeiras (LIKE não as copia)
+DO $$
+DECLARE
+  v_fk RECORD;
+BEGIN
+  FOR v_fk IN
+    SELECT conname, pg_get_constraintdef(oid) AS definicao
+    FROM pg_constraint
+    WHERE conrelid = 'public."MOVIMENTO_ESTOQUE_nao_particionada"'::regclass AND contype = 'f'
+  LOOP
+    EXECUTE format('ALTER TABLE public."MOVIMENTO_ESTOQUE" ADD CONSTRAINT %I %s',
+                   v_fk.conname, v_fk.definicao);
+  END LOOP;
+END;
+$$;
+
+CREATE TABLE public."MOVIMENTO_ESTOQUE_padrao"
+  PARTITION OF public."MOVIMENTO_ESTOQUE" DEFAULT;
+
+
+-- Cria (se não existir) a partição do mês de p_mes e devolve o nome dela.
+CREATE OR REPLACE FUNCTION public.criar_particao_movimento(p_mes DATE)
+RETURNS TEXT
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_inicio DATE := date_trunc('month', p_mes)::DATE;
+  v_nome TEXT := 'MOVIMENTO_ESTOQUE_' || to_char(p_mes, 'YYYY_MM');
+  v_de TIMESTAMPTZ := v_inicio::TIMESTAMP AT TIME ZONE 'UTC';
+  v_ate TIMESTAMPTZ := (v_inicio + INTERVAL '1 month')::TIMESTAMP AT TIME ZONE 'UTC';
+BEGIN
+  -- Duas chamadas ao mesmo tempo não tentam criar a mesma partição
+  PERFORM pg_advisory_xact_lock(hashtext('particoes_movimento_estoque'));
+
+  IF to_regclass(format('public.%I', v_nome)) IS NOT NULL THEN
+    RETURN v_nome;
+  END IF;
+
+  EXECUTE format(
+    'CREATE TABLE public.%I (LIKE public."MOVIMENTO_ESTOQUE" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)',
+    v_nome
+  );
+
+  -- Movimentos desse mês que caíram na partição padrão passam para a nova
+  EXECUTE format(
+    'WITH movidos AS ('
+    '  DELETE FROM public."MOVIMENTO_ESTOQUE_padrao"'
+    '  WHERE data_movimento >= $1 AND data_movimento < $2'
+    '  RETURNING *'
+    ') INSERT INTO public.%I SELECT * FROM movidos',
+    v_nome
+  ) USING v_de, v_ate;
+
+  EXECUTE format(
+    'ALTER TABLE public."MOVIMENTO_ESTOQUE" ATTACH PARTITION public.%I FOR VALUES FROM (%L) TO (%L)',
+    v_nome, v_de, v_ate
+  );
+
+  RETURN v_nome;
+END;
+$$;
+
+
+-- Garante as partições do mês atual e dos p_meses_a_frente seguintes.
+CREATE OR REPLACE FUNCTION public.garantir_particoes_movimento(p_meses_a_frente INTEGER DEFAULT 3)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_mes DATE := date_trunc('month', now() AT TIME ZONE 'UTC')::DATE;
+BEGIN
+  FOR i IN 0..p_meses_a_frente LOOP
+    PERFORM public.criar_particao_movimento((v_mes + i * INTERVAL '1 month')::DATE);
+  END LOOP;
+  RETURN p_meses_a_frente + 1;
+END;
+$$;
+
+
+-- Partições dos meses que já têm movimentos, cópia dos dados e sequência
+SELECT public.criar_particao_movimento(mes)
+FROM (
+  SELECT DISTINCT date_trunc('month', data_movimento AT TIME ZONE 'UTC')::DATE AS mes
+  FROM public."MOVIMENTO_ESTOQUE_nao_particionada"
+) AS meses;
+
+SELECT public.garantir_particoes_movimento(3);
+
+-- As colunas estão na mesma ordem (LIKE)
+INSERT INTO public."MOVIMENTO_ESTOQUE"
+SELECT * FROM public."MOVIMENTO_ESTOQUE_nao_particionada";
+
+SELECT setval(
+  'public.movimento_estoque_id_seq',
+  COALESCE((SELECT max(id) FROM public."MOVIMENTO_ESTOQUE"), 0) + 1,
+  false
+);
+
+DROP TABLE public."MOVIMENTO_ESTOQUE_nao_particionada";
+
+-- Índices e gatilhos de volta, agora na particionada (e nas partições)
+DO $$
+DECLARE
+  v_objeto RECORD;
+BEGIN
+  FOR v_objeto IN SELECT tipo, definicao FROM movimento_objetos ORDER BY tipo DESC LOOP
+    EXECUTE regexp_replace(
+      v_objeto.definicao,
+      ' ON (ONLY )?\S+ ',
+      ' ON public."MOVIMENTO_ESTOQUE" '
+    );
+  END LOOP;
+END;
+$$;
+
+-- Os índices que a API usa, caso o banco ainda não os tivesse (0002)
+CREATE INDEX IF NOT EXISTS movimento_estoque_produto_data_idx
+  ON public."MOVIMENTO_ESTOQUE" (id_produto, data_movimento);
+CREATE INDEX IF NOT EXISTS movimento_estoque_id_usuario_idx
+  ON public."MOVIMENTO_ESTOQUE" (id_usuario);
+
+ANALYZE public."MOVIMENTO_ESTOQUE";
+
+-- O PostgREST (Supabase) passa a enxergar a nova tabela
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,68 @@
+-- SALDO_DIARIO: saldo de cada produto no fim de cada dia (UTC).
+--
+-- Cria a tabela e o gatilho de createdb.sql e preenche o passado a partir
+-- de MOVIMENTO_ESTOQUE, de trás para frente: o saldo no fim do dia D é a
+-- quantidade atual menos os movimentos posteriores a D. Movimentos feitos
+-- sem usuário (que não entram em MOVIMENTO_ESTOQUE) e meses já arquivados
+-- ficam de fora dessa reconstrução; a partir daqui o gatilho grava todas
+-- as mudanças de quantidade.
+
+CREATE TABLE IF NOT EXISTS public."SALDO_DIARIO" (
+  id_produto BIGINT NOT NULL REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  dia DATE NOT NULL,
+  quantidade INTEGER NOT NULL,
+  PRIMARY KEY (id_produto, dia)
+);
+
+CREATE OR REPLACE FUNCTION public.registrar_saldo_diario()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  IF TG_OP = 'UPDATE' AND NEW.quantidade = OLD.quantidade THEN
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public."SALDO_DIARIO" (id_produto, dia, quantidade)
+  VALUES (NEW.id, (now() AT TIME ZONE 'UTC')::DATE, NEW.quantidade)
+  ON CONFLICT (id_produto, dia) DO UPDATE SET quantidade = EXCLUDED.quantidade;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_saldo_diario ON public."PRODUTOS";
+CREATE TRIGGER produtos_saldo_diario
+  AFTER INSERT OR UPDATE OF quantidade ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_saldo_diario();
+
+INSERT INTO public."SALDO_DIARIO" (id_produto, dia, quantidade)
+SELECT p.id, d.dia, p.quantidade - COALESCE(d.depois, 0)
+FROM (
+  SELECT
+    id_produto,
+    dia,
+    SUM(saldo_do_dia) OVER (
+      PARTITION BY id_produto ORDER BY dia DESC
+      ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+    ) AS depois
+  FROM (
+    SELECT
+      id_produto,
+      (data_movimento AT TIME ZONE 'UTC')::DATE AS dia,
+      SUM(CASE WHEN tipo_movimento = 'ENTRADA' THEN quantidade ELSE -quantidade END) AS saldo_do_dia
+    FROM public."MOVIMENTO_ESTOQUE"
+    GROUP BY 1, 2
+  ) AS por_dia
+) AS d
+JOIN public."PRODUTOS" p ON p.id = d.id_produto
+ON CONFLICT (id_produto, dia) DO NOTHING;
+
+-- Hoje: a quantidade atual de todos os produtos (inclusive os sem movimento)
+INSERT INTO public."SALDO_DIARIO" (id_produto, dia, quantidade)
+SELECT id, (now() AT TIME ZONE 'UTC')::DATE, quantidade
+FROM public."PRODUTOS"
+ON CONFLICT (id_produto, dia) DO UPDATE SET quantidade = EXCLUDED.quantidade;
+
+ANALYZE public."SALDO_DIARIO";
+
+NOTIFY pgrst, 'reload schema';
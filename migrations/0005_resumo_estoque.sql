@@ -0,0 +1,187 @@
+-- RESUMO_ESTOQUE: produtos, quantidade e valor de custo/venda em estoque por
+-- (categoria, local, fornecedor), base dos relatórios (GET /api/relatorios/*).
+--
+-- Cria as tabelas, o gatilho e as funções de createdb.sql e recalcula o
+-- resumo a partir de PRODUTOS. PRODUTOS fica travada contra escritas até o
+-- fim da migração, então nenhuma mudança escapa do recálculo nem entra
+-- duas vezes; rodar de novo só recalcula o mesmo resumo.
+
+CREATE TABLE IF NOT EXISTS public."RESUMO_ESTOQUE" (
+  id_categoria BIGINT NOT NULL,
+  id_local BIGINT NOT NULL,
+  id_fornecedor BIGINT NOT NULL,
+  produtos INTEGER NOT NULL DEFAULT 0,
+  quantidade BIGINT NOT NULL DEFAULT 0,
+  valor_custo NUMERIC NOT NULL DEFAULT 0,
+  valor_venda NUMERIC NOT NULL DEFAULT 0,
+  abaixo_minimo INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (id_categoria, id_local, id_fornecedor)
+);
+
+CREATE TABLE IF NOT EXISTS public."RESUMO_ESTOQUE_PENDENTE" (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  id_categoria BIGINT NOT NULL,
+  id_local BIGINT NOT NULL,
+  id_fornecedor BIGINT NOT NULL,
+  produtos INTEGER NOT NULL,
+  quantidade BIGINT NOT NULL,
+  valor_custo NUMERIC NOT NULL,
+  valor_venda NUMERIC NOT NULL,
+  abaixo_minimo INTEGER NOT NULL
+);
+
+-- Resumo do estoque: a cada produto criado, editado, excluído ou
+-- movimentado (movimentar_estoque, lotes), grava em RESUMO_ESTOQUE_PENDENTE
+-- a diferença que a mudança causa no grupo do produto (duas linhas se ele
+-- trocou de categoria, local ou fornecedor).
+CREATE OR REPLACE FUNCTION public.registrar_resumo_estoque()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public."RESUMO_ESTOQUE_PENDENTE" (
+    id_categoria, id_local, id_fornecedor,
+    produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+  )
+  SELECT id_categoria, id_local, id_fornecedor,
+    SUM(produtos), SUM(quantidade), SUM(valor_custo), SUM(valor_venda), SUM(abaixo_minimo)
+  FROM (
+    SELECT OLD.id_categoria, OLD.id_local, OLD.id_fornecedor,
+      -1 AS produtos,
+      -OLD.quantidade AS quantidade,
+      -(OLD.quantidade * OLD."custo_produto_Unit") AS valor_custo,
+      -(OLD.quantidade * OLD."valor_venda_Unit") AS valor_venda,
+      -(OLD.quantidade < OLD.estoque_minimo)::INTEGER AS abaixo_minimo
+    WHERE TG_OP <> 'INSERT'
+    UNION ALL
+    SELECT NEW.id_categoria, NEW.id_local, NEW.id_fornecedor,
+      1,
+      NEW.quantidade,
+      NEW.quantidade * NEW."custo_produto_Unit",
+      NEW.quantidade * NEW."valor_venda_Unit",
+      (NEW.quantidade < NEW.estoque_minimo)::INTEGER
+    WHERE TG_OP <> 'DELETE'
+  ) AS diferenca (id_categoria, id_local, id_fornecedor,
+                  produtos, quantidade, valor_custo, valor_venda, abaixo_minimo)
+  GROUP BY id_categoria, id_local, id_fornecedor;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_resumo_estoque ON public."PRODUTOS";
+CREATE TRIGGER produtos_resumo_estoque
+  AFTER INSERT OR DELETE OR UPDATE OF
+    quantidade, "custo_produto_Unit", "valor_venda_Unit", estoque_minimo,
+    id_categoria, id_local, id_fornecedor
+  ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_resumo_estoque();
+
+
+-- Soma as diferenças pendentes ao resumo e as apaga, numa só transação.
+-- Um consolidador por vez (trava consultiva); quem não consegue a trava
+-- devolve -1 sem esperar, e a leitura soma o resumo com as pendentes.
+CREATE OR REPLACE FUNCTION public.consolidar_resumo_estoque()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_grupos INTEGER;
+BEGIN
+  IF NOT pg_try_advisory_xact_lock(7301005) THEN
+    RETURN -1;
+  END IF;
+
+  WITH pendentes AS (
+    DELETE FROM public."RESUMO_ESTOQUE_PENDENTE" RETURNING *
+  )
+  INSERT INTO public."RESUMO_ESTOQUE" AS r (
+    id_categoria, id_local, id_fornecedor,
+    produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+  )
+  SELECT id_categoria, id_local, id_fornecedor,
+    SUM(produtos), SUM(quantidade), SUM(valor_custo), SUM(valor_venda), SUM(abaixo_minimo)
+  FROM pendentes
+  GROUP BY id_categoria, id_local, id_fornecedor
+  ON CONFLICT (id_categoria, id_local, id_fornecedor) DO UPDATE SET
+    produtos = r.produtos + EXCLUDED.produtos,
+    quantidade = r.quantidade + EXCLUDED.quantidade,
+    valor_custo = r.valor_custo + EXCLUDED.valor_custo,
+    valor_venda = r.valor_venda + EXCLUDED.valor_venda,
+    abaixo_minimo = r.abaixo_minimo + EXCLUDED.abaixo_minimo;
+  GET DIAGNOSTICS v_grupos = ROW_COUNT;
+
+  -- Grupo sem produtos: todas as somas voltaram a zero
+  DELETE FROM public."RESUMO_ESTOQUE" WHERE produtos = 0;
+  RETURN v_grupos;
+END;
+$$;
+
+
+-- Relatório do estoque: consolida o resumo e devolve as somas no total
+-- (p_agrupar_por NULL) ou por 'categoria', 'local' ou 'fornecedor', como um
+-- array JSON de {grupo, produtos, quantidade, valor_custo, valor_venda,
+-- abaixo_minimo}. Chamada via RPC (POST), já que grava na consolidação.
+CREATE OR REPLACE FUNCTION public.resumo_estoque(p_agrupar_por TEXT DEFAULT NULL)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_grupos JSON;
+BEGIN
+  IF p_agrupar_por IS NOT NULL AND p_agrupar_por NOT IN ('categoria', 'local', 'fornecedor') THEN
+    RAISE EXCEPTION 'Agrupamento inválido: %', p_agrupar_por;
+  END IF;
+
+  PERFORM public.consolidar_resumo_estoque();
+
+  SELECT COALESCE(json_agg(g ORDER BY g.grupo), '[]'::JSON)
+  INTO v_grupos
+  FROM (
+    SELECT
+      CASE p_agrupar_por
+        WHEN 'categoria' THEN id_categoria
+        WHEN 'local' THEN id_local
+        WHEN 'fornecedor' THEN id_fornecedor
+      END AS grupo,
+      SUM(produtos)::BIGINT AS produtos,
+      SUM(quantidade)::BIGINT AS quantidade,
+      SUM(valor_custo) AS valor_custo,
+      SUM(valor_venda) AS valor_venda,
+      SUM(abaixo_minimo)::BIGINT AS abaixo_minimo
+    FROM (
+      SELECT id_categoria, id_local, id_fornecedor,
+        produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+      FROM public."RESUMO_ESTOQUE"
+      UNION ALL
+      SELECT id_categoria, id_local, id_fornecedor,
+        produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+      FROM public."RESUMO_ESTOQUE_PENDENTE"
+    ) AS r
+    GROUP BY 1
+    HAVING SUM(produtos) <> 0
+  ) AS g;
+
+  RETURN v_grupos;
+END;
+$$;
+
+LOCK TABLE public."PRODUTOS" IN SHARE MODE;
+
+TRUNCATE public."RESUMO_ESTOQUE", public."RESUMO_ESTOQUE_PENDENTE";
+
+INSERT INTO public."RESUMO_ESTOQUE" (
+  id_categoria, id_local, id_fornecedor,
+  produtos, quantidade, valor_custo, valor_venda, abaixo_minimo
+)
+SELECT id_categoria, id_local, id_fornecedor,
+  COUNT(*),
+  SUM(quantidade),
+  SUM(quantidade * "custo_produto_Unit"),
+  SUM(quantidade * "valor_venda_Unit"),
+  COUNT(*) FILTER (WHERE quantidade < estoque_minimo)
+FROM public."PRODUTOS"
+GROUP BY id_categoria, id_local, id_fornecedor;
+
+ANALYZE public."RESUMO_ESTOQUE";
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,79 @@
+-- ALERTA_ESTOQUE: produtos perto do estoque mínimo ou do máximo, base de
+-- GET /api/alertas.
+--
+-- Cria a tabela e o gatilho de createdb.sql e recalcula a lista a partir de
+-- PRODUTOS, travada contra escritas até o fim da migração. Produtos que já
+-- estavam em alerta ficam com "desde" igual ao momento da migração.
+
+CREATE TABLE IF NOT EXISTS public."ALERTA_ESTOQUE" (
+  id_produto BIGINT PRIMARY KEY REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  tipo_alerta VARCHAR(10) NOT NULL CHECK (tipo_alerta IN ('MINIMO', 'MAXIMO')),
+  quantidade INTEGER NOT NULL,
+  limite INTEGER NOT NULL,
+  desde TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION public.registrar_alerta_estoque()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_tipo VARCHAR(10);
+BEGIN
+  v_tipo := CASE
+    WHEN NEW.quantidade::BIGINT * 5 <= NEW.estoque_minimo::BIGINT * 6 THEN 'MINIMO'
+    WHEN NEW.quantidade::BIGINT * 5 >= NEW.estoque_maximo::BIGINT * 4 THEN 'MAXIMO'
+  END;
+
+  IF v_tipo IS NULL THEN
+    -- Só apaga se o produto estava em alerta (evita um DELETE por movimento)
+    IF TG_OP = 'UPDATE' AND (
+      OLD.quantidade::BIGINT * 5 <= OLD.estoque_minimo::BIGINT * 6
+      OR OLD.quantidade::BIGINT * 5 >= OLD.estoque_maximo::BIGINT * 4
+    ) THEN
+      DELETE FROM public."ALERTA_ESTOQUE" WHERE id_produto = NEW.id;
+    END IF;
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public."ALERTA_ESTOQUE" AS a (id_produto, tipo_alerta, quantidade, limite)
+  VALUES (
+    NEW.id,
+    v_tipo,
+    NEW.quantidade,
+    CASE v_tipo WHEN 'MINIMO' THEN NEW.estoque_minimo ELSE NEW.estoque_maximo END
+  )
+  ON CONFLICT (id_produto) DO UPDATE SET
+    tipo_alerta = EXCLUDED.tipo_alerta,
+    quantidade = EXCLUDED.quantidade,
+    limite = EXCLUDED.limite,
+    desde = CASE WHEN a.tipo_alerta = EXCLUDED.tipo_alerta THEN a.desde ELSE EXCLUDED.desde END;
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_alerta_estoque ON public."PRODUTOS";
+CREATE TRIGGER produtos_alerta_estoque
+  AFTER INSERT OR UPDATE OF quantidade, estoque_minimo, estoque_maximo ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_alerta_estoque();
+
+LOCK TABLE public."PRODUTOS" IN SHARE MODE;
+
+DELETE FROM public."ALERTA_ESTOQUE";
+
+INSERT INTO public."ALERTA_ESTOQUE" (id_produto, tipo_alerta, quantidade, limite)
+SELECT id, tipo_alerta, quantidade,
+  CASE tipo_alerta WHEN 'MINIMO' THEN estoque_minimo ELSE estoque_maximo END
+FROM (
+  SELECT id, quantidade, estoque_minimo, estoque_maximo,
+    CASE
+      WHEN quantidade::BIGINT * 5 <= estoque_minimo::BIGINT * 6 THEN 'MINIMO'
+      WHEN quantidade::BIGINT * 5 >= estoque_maximo::BIGINT * 4 THEN 'MAXIMO'
+    END AS tipo_alerta
+  FROM public."PRODUTOS"
+) AS p
+WHERE tipo_alerta IS NOT NULL;
+
+ANALYZE public."ALERTA_ESTOQUE";
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,109 @@
+-- CONSUMO_PRODUTO: consumo diário (EWMA das saídas) de cada produto, base
+-- das sugestões de reposição (GET /api/reposicao).
+--
+-- Cria as tabelas e as funções de createdb.sql. Não recalcula nada aqui: a
+-- primeira chamada de reposicao() soma os últimos 90 dias de saídas, e as
+-- seguintes só os dias fechados desde então.
+
+-- Consumo diário de cada produto: média móvel exponencial (EWMA) das saídas
+-- por dia, base das sugestões de reposição (GET /api/reposicao). Calculada
+-- por atualizar_consumo (abaixo) para o catálogo inteiro de uma vez, só com
+-- os dias fechados desde CONSUMO_MARCA.calculado_ate.
+CREATE TABLE IF NOT EXISTS public."CONSUMO_PRODUTO" (
+  id_produto BIGINT PRIMARY KEY REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  consumo_diario DOUBLE PRECISION NOT NULL DEFAULT 0
+);
+
+-- Último dia (UTC) já somado em CONSUMO_PRODUTO; uma única linha
+CREATE TABLE IF NOT EXISTS public."CONSUMO_MARCA" (
+  id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  calculado_ate DATE NOT NULL
+);
+
+-- Soma ao consumo diário (EWMA, alfa 0.1: os últimos ~20 dias pesam mais)
+-- os dias fechados desde a marca até ontem, para todos os produtos num só
+-- comando. De m (na marca) a n dias depois, com s(d) as saídas do dia d:
+--   m' = m * (1 - alfa)^n + alfa * soma(s(d) * (1 - alfa)^(ontem - d))
+-- Sem marca, começa 90 dias atrás. Um cálculo por vez (trava consultiva);
+-- devolve os dias somados, 0 se já estava em dia e -1 se outro está rodando.
+CREATE OR REPLACE FUNCTION public.atualizar_consumo()
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_alfa CONSTANT DOUBLE PRECISION := 0.1;
+  v_ate DATE := (now() AT TIME ZONE 'UTC')::DATE - 1;
+  v_marca DATE;
+BEGIN
+  IF NOT pg_try_advisory_xact_lock(7301006) THEN
+    RETURN -1;
+  END IF;
+
+  SELECT calculado_ate INTO v_marca FROM public."CONSUMO_MARCA";
+  v_marca := COALESCE(v_marca, v_ate - 90);
+  IF v_marca >= v_ate THEN
+    RETURN 0;
+  END IF;
+
+  WITH saidas AS (
+    SELECT id_produto,
+      SUM(quantidade * power(1 - v_alfa, v_ate - (data_movimento AT TIME ZONE 'UTC')::DATE)) AS peso
+    FROM public."MOVIMENTO_ESTOQUE"
+    WHERE tipo_movimento = 'SAIDA'
+      AND data_movimento >= (v_marca + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+      AND data_movimento < (v_ate + 1)::TIMESTAMP AT TIME ZONE 'UTC'
+    GROUP BY id_produto
+  )
+  INSERT INTO public."CONSUMO_PRODUTO" (id_produto, consumo_diario)
+  SELECT p.id,
+    COALESCE(c.consumo_diario, 0) * power(1 - v_alfa, v_ate - v_marca) + v_alfa * COALESCE(s.peso, 0)
+  FROM public."PRODUTOS" p
+  LEFT JOIN public."CONSUMO_PRODUTO" c ON c.id_produto = p.id
+  LEFT JOIN saidas s ON s.id_produto = p.id
+  WHERE c.id_produto IS NOT NULL OR s.id_produto IS NOT NULL
+  ON CONFLICT (id_produto) DO UPDATE SET consumo_diario = EXCLUDED.consumo_diario;
+
+  INSERT INTO public."CONSUMO_MARCA" (id, calculado_ate) VALUES (TRUE, v_ate)
+  ON CONFLICT (id) DO UPDATE SET calculado_ate = EXCLUDED.calculado_ate;
+  RETURN v_ate - v_marca;
+END;
+$$;
+
+
+-- Produtos a repor: atualiza o consumo e devolve {calculado_ate, produtos}
+-- com os produtos que já estão no mínimo ou chegam a ele em até
+-- p_horizonte dias no consumo atual. As quantidades sugeridas são
+-- calculadas na aplicação (db.sugestao_reposicao). Chamada via RPC (POST),
+-- já que grava no cálculo do consumo.
+CREATE OR REPLACE FUNCTION public.reposicao(p_horizonte INTEGER DEFAULT 14)
+RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_resultado JSON;
+BEGIN
+  IF p_horizonte IS NULL OR p_horizonte < 0 THEN
+    RAISE EXCEPTION 'Horizonte inválido: %', p_horizonte;
+  END IF;
+
+  PERFORM public.atualizar_consumo();
+
+  SELECT json_build_object(
+    'calculado_ate', (SELECT calculado_ate FROM public."CONSUMO_MARCA"),
+    'produtos', COALESCE(json_agg(r ORDER BY r.id_produto), '[]'::JSON)
+  )
+  INTO v_resultado
+  FROM (
+    SELECT p.id AS id_produto, p.nome_produto, p.id_fornecedor, p.quantidade,
+      p.estoque_minimo, p.estoque_maximo, p."custo_produto_Unit",
+      COALESCE(c.consumo_diario, 0) AS consumo_diario
+    FROM public."PRODUTOS" p
+    LEFT JOIN public."CONSUMO_PRODUTO" c ON c.id_produto = p.id
+    WHERE p.quantidade <= p.estoque_minimo
+      OR p.quantidade - p.estoque_minimo <= c.consumo_diario * p_horizonte
+  ) r;
+  RETURN v_resultado;
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
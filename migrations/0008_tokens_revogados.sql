@@ -0,0 +1,13 @@
+-- TOKENS_REVOGADOS: tokens JWT revogados por POST /api/logout, lidos por
+-- cada worker da API para recusar o token até ele expirar.
+
+CREATE TABLE IF NOT EXISTS public."TOKENS_REVOGADOS" (
+  jti VARCHAR(64) PRIMARY KEY,
+  expira_em TIMESTAMP WITH TIME ZONE NOT NULL,
+  revogado_em TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS tokens_revogados_revogado_em_idx
+  ON public."TOKENS_REVOGADOS" (revogado_em);
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,84 @@
+-- Sincronização dos aplicativos (GET /api/sync): colunas versao (e
+-- atualizado_em em PRODUTOS), PRODUTOS_EXCLUIDOS e os gatilhos de createdb.sql.
+--
+-- As colunas novas entram com valor fixo (0 e o momento da migração), sem
+-- reescrever as tabelas; as linhas existentes contam como versão 0 e vêm na
+-- primeira sincronização de cada aplicativo. Em MOVIMENTO_ESTOQUE
+-- particionada, a coluna e o índice vão para todas as partições.
+
+ALTER TABLE public."PRODUTOS"
+  ADD COLUMN IF NOT EXISTS versao BIGINT NOT NULL DEFAULT 0,
+  ADD COLUMN IF NOT EXISTS atualizado_em TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now();
+
+ALTER TABLE public."MOVIMENTO_ESTOQUE"
+  ADD COLUMN IF NOT EXISTS versao BIGINT NOT NULL DEFAULT 0;
+
+CREATE TABLE IF NOT EXISTS public."PRODUTOS_EXCLUIDOS" (
+  id_produto BIGINT PRIMARY KEY,
+  versao BIGINT NOT NULL,
+  excluido_em TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS produtos_versao_idx ON public."PRODUTOS" (versao, id);
+CREATE INDEX IF NOT EXISTS movimento_estoque_versao_idx ON public."MOVIMENTO_ESTOQUE" (versao, id);
+CREATE INDEX IF NOT EXISTS produtos_excluidos_versao_idx
+  ON public."PRODUTOS_EXCLUIDOS" (versao, id_produto);
+
+-- Versões da sincronização (GET /api/sync). Cada produto gravado e cada
+-- movimento novo recebe em `versao` o id da transação que o gravou, e cada
+-- produto excluído deixa uma linha em PRODUTOS_EXCLUIDOS, em todos os
+-- caminhos de escrita (API, funções do banco, SQL direto). As transações não
+-- terminam na ordem dos ids: quem sincroniza guarda versao_sincronizacao()
+-- (lida antes dos dados) e na vez seguinte pede versao >= ela, que cobre
+-- as transações que ainda estavam em andamento.
+CREATE OR REPLACE FUNCTION public.marcar_versao()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.versao := pg_current_xact_id()::TEXT::BIGINT;
+  IF TG_TABLE_NAME = 'PRODUTOS' THEN
+    NEW.atualizado_em := now();
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.registrar_produto_excluido()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  INSERT INTO public."PRODUTOS_EXCLUIDOS" (id_produto, versao)
+  VALUES (OLD.id, pg_current_xact_id()::TEXT::BIGINT)
+  ON CONFLICT (id_produto) DO UPDATE SET versao = EXCLUDED.versao, excluido_em = now();
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS produtos_versao ON public."PRODUTOS";
+CREATE TRIGGER produtos_versao
+  BEFORE INSERT OR UPDATE ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.marcar_versao();
+
+DROP TRIGGER IF EXISTS produtos_exclusao_versao ON public."PRODUTOS";
+CREATE TRIGGER produtos_exclusao_versao
+  AFTER DELETE ON public."PRODUTOS"
+  FOR EACH ROW EXECUTE FUNCTION public.registrar_produto_excluido();
+
+DROP TRIGGER IF EXISTS movimento_estoque_versao ON public."MOVIMENTO_ESTOQUE";
+CREATE TRIGGER movimento_estoque_versao
+  BEFORE INSERT ON public."MOVIMENTO_ESTOQUE"
+  FOR EACH ROW EXECUTE FUNCTION public.marcar_versao();
+
+-- Menor versão que ainda pode aparecer: a da transação mais antiga em
+-- andamento (ou a próxima, se não há nenhuma)
+CREATE OR REPLACE FUNCTION public.versao_sincronizacao()
+RETURNS BIGINT
+LANGUAGE sql
+STABLE
+AS $$
+  SELECT pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT;
+$$;
+
+NOTIFY pgrst, 'reload schema';
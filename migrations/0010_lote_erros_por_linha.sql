@@ -0,0 +1,83 @@
+-- movimentar_estoque_lote: um erro do banco numa linha do lote (usuário ou
+-- produto inexistente, CHECK, valor fora da faixa) passa a recusar só
+-- aquela linha, com o SQLSTATE em "codigo", em vez de abortar o lote
+-- inteiro. Mesma função de createdb.sql.
+
+CREATE OR REPLACE FUNCTION public.movimentar_estoque_lote(
+  p_movimentos JSONB,
+  p_id_usuario BIGINT DEFAULT NULL,
+  p_tudo_ou_nada BOOLEAN DEFAULT FALSE
+) RETURNS JSON
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_linha RECORD;
+  v_produto JSON;
+  v_resultados JSONB := '[]'::JSONB;
+  v_falhas INTEGER := 0;
+BEGIN
+  PERFORM 1
+  FROM public."PRODUTOS"
+  WHERE id IN (
+    SELECT DISTINCT (m->>'id_produto')::BIGINT
+    FROM jsonb_array_elements(p_movimentos) AS m
+  )
+  ORDER BY id
+  FOR UPDATE;
+
+  BEGIN
+    FOR v_linha IN
+      SELECT m.valor, m.linha - 1 AS linha
+      FROM jsonb_array_elements(p_movimentos) WITH ORDINALITY AS m(valor, linha)
+    LOOP
+      BEGIN
+        v_produto := public.movimentar_estoque(
+          (v_linha.valor->>'id_produto')::BIGINT,
+          v_linha.valor->>'tipo_movimento',
+          (v_linha.valor->>'quantidade')::INTEGER,
+          p_id_usuario
+        );
+        v_resultados := v_resultados || jsonb_build_array(jsonb_build_object(
+          'linha', v_linha.linha,
+          'sucesso', TRUE,
+          'produto', v_produto::JSONB
+        ));
+      EXCEPTION WHEN OTHERS THEN
+        -- Regras de negócio (raise_exception) e erros do banco numa linha
+        -- (chave estrangeira, CHECK, valor fora da faixa) só recusam a linha
+        v_falhas := v_falhas + 1;
+        v_resultados := v_resultados || jsonb_build_array(jsonb_build_object(
+          'linha', v_linha.linha,
+          'sucesso', FALSE,
+          'erro', SQLERRM,
+          'codigo', SQLSTATE
+        ));
+      END;
+    END LOOP;
+
+    IF p_tudo_ou_nada AND v_falhas > 0 THEN
+      RAISE EXCEPTION 'Lote cancelado' USING ERRCODE = 'ES001';
+    END IF;
+  EXCEPTION WHEN SQLSTATE 'ES001' THEN
+    -- Tudo ou nada: as alterações do bloco foram desfeitas; as linhas que
+    -- tinham sido aplicadas passam a constar como não aplicadas.
+    SELECT jsonb_agg(
+      CASE WHEN (r->>'sucesso')::BOOLEAN
+        THEN jsonb_build_object(
+          'linha', r->'linha',
+          'sucesso', FALSE,
+          'erro', 'Lote cancelado: outra linha do lote falhou'
+        )
+        ELSE r
+      END
+      ORDER BY (r->>'linha')::INTEGER
+    )
+    INTO v_resultados
+    FROM jsonb_array_elements(v_resultados) AS r;
+  END;
+
+  RETURN v_resultados::JSON;
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
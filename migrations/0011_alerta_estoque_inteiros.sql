@@ -0,0 +1,47 @@
+-- registrar_alerta_estoque: a comparação com 120% do estoque_minimo e 80%
+-- do estoque_maximo passa a ser feita em inteiros (quantidade * 5 <=
+-- estoque_minimo * 6), como em db.perto_do_minimo/perto_do_maximo e no
+-- gatilho do SQLite, em BIGINT para não estourar com quantidades perto do
+-- máximo do INTEGER. O resultado é o mesmo da conta em numeric, então
+-- ALERTA_ESTOQUE não precisa ser recalculada. Mesma função de createdb.sql.
+
+CREATE OR REPLACE FUNCTION public.registrar_alerta_estoque()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_tipo VARCHAR(10);
+BEGIN
+  v_tipo := CASE
+    WHEN NEW.quantidade::BIGINT * 5 <= NEW.estoque_minimo::BIGINT * 6 THEN 'MINIMO'
+    WHEN NEW.quantidade::BIGINT * 5 >= NEW.estoque_maximo::BIGINT * 4 THEN 'MAXIMO'
+  END;
+
+  IF v_tipo IS NULL THEN
+    -- Só apaga se o produto estava em alerta (evita um DELETE por movimento)
+    IF TG_OP = 'UPDATE' AND (
+      OLD.quantidade::BIGINT * 5 <= OLD.estoque_minimo::BIGINT * 6
+      OR OLD.quantidade::BIGINT * 5 >= OLD.estoque_maximo::BIGINT * 4
+    ) THEN
+      DELETE FROM public."ALERTA_ESTOQUE" WHERE id_produto = NEW.id;
+    END IF;
+    RETURN NULL;
+  END IF;
+
+  INSERT INTO public."ALERTA_ESTOQUE" AS a (id_produto, tipo_alerta, quantidade, limite)
+  VALUES (
+    NEW.id,
+    v_tipo,
+    NEW.quantidade,
+    CASE v_tipo WHEN 'MINIMO' THEN NEW.estoque_minimo ELSE NEW.estoque_maximo END
+  )
+  ON CONFLICT (id_produto) DO UPDATE SET
+    tipo_alerta = EXCLUDED.tipo_alerta,
+    quantidade = EXCLUDED.quantidade,
+    limite = EXCLUDED.limite,
+    desde = CASE WHEN a.tipo_alerta = EXCLUDED.tipo_alerta THEN a.desde ELSE EXCLUDED.desde END;
+  RETURN NULL;
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,44 @@
+-- versao_tabela: ETag das listagens de produtos, alertas e movimentos lida
+-- do banco (maior versao gravada pelos gatilhos de sincronização de
+-- migrations/0009_sincronizacao.sql), em vez dos contadores que só a API
+-- incrementava. Assim, escritas de scripts, migrações e SQL direto também
+-- mudam a ETag. Mesma função de createdb.sql; requer a 0009.
+--
+-- Contrapartida: o snapshot não diz que tabela cada transação escreve, então
+-- entram no texto todas as transações em andamento com id menor, de qualquer
+-- tabela (ex.: TOKENS_REVOGADOS, RESUMO_ESTOQUE_PENDENTE). Quando uma delas
+-- termina, a ETag muda sem que a tabela tenha mudado, e o cliente recebe um
+-- 200 com a mesma lista em vez de um 304. É o preço de não perder a
+-- transação lenta da própria tabela: nunca um 304 errado, às vezes um 200 a
+-- mais.
+
+CREATE OR REPLACE FUNCTION public.versao_tabela(p_tabela TEXT)
+RETURNS TEXT
+LANGUAGE plpgsql
+STABLE
+AS $$
+DECLARE
+  v_maxima BIGINT;
+  v_em_andamento TEXT;
+BEGIN
+  IF p_tabela = 'PRODUTOS' THEN
+    v_maxima := greatest(
+      (SELECT max(versao) FROM public."PRODUTOS"),
+      (SELECT max(versao) FROM public."PRODUTOS_EXCLUIDOS")
+    );
+  ELSIF p_tabela = 'MOVIMENTO_ESTOQUE' THEN
+    v_maxima := (SELECT max(versao) FROM public."MOVIMENTO_ESTOQUE");
+  ELSE
+    RAISE EXCEPTION 'Tabela sem versão: %', p_tabela;
+  END IF;
+  v_maxima := coalesce(v_maxima, 0);
+
+  SELECT string_agg(x::TEXT, ',' ORDER BY x::TEXT::BIGINT) INTO v_em_andamento
+  FROM pg_snapshot_xip(pg_current_snapshot()) AS x
+  WHERE x::TEXT::BIGINT < v_maxima;
+
+  RETURN v_maxima::TEXT || coalesce(':' || v_em_andamento, '');
+END;
+$$;
+
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,20 @@
+-- AJUSTE_ESTOQUE: ajustes gravados por scripts/reconciliar_estoque.py
+-- --corrigir, que antes iam para MOVIMENTO_ESTOQUE como ENTRADA/SAIDA comuns
+-- e contavam como consumo (atualizar_consumo) e como movimento na
+-- quantidade num instante (db.quantidade_em).
+--
+-- Ajustes gravados antes desta migração continuam em MOVIMENTO_ESTOQUE:
+-- nada os distingue das entradas e saídas comuns.
+
+CREATE TABLE IF NOT EXISTS public."AJUSTE_ESTOQUE" (
+  id BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+  id_produto BIGINT NOT NULL REFERENCES public."PRODUTOS"(id) ON DELETE CASCADE,
+  id_usuario BIGINT NOT NULL REFERENCES public."USUARIOS"(id),
+  diferenca INTEGER NOT NULL CHECK (diferenca <> 0),
+  data_ajuste TIMESTAMP WITH TIME ZONE DEFAULT NOW() NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS ajuste_estoque_id_produto_idx
+  ON public."AJUSTE_ESTOQUE" (id_produto);
+
+NOTIFY pgrst, 'reload schema';
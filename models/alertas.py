@@ -0,0 +1,250 @@
+"""
+Entrega dos alertas de estoque (produto perto do mínimo ou do máximo).
+
+db.alertar_estoque põe o alerta numa fila em memória e volta na hora, sem
+atrasar o movimento; uma thread de fundo entrega cada alerta aos destinos
+configurados (db.configurar_alertas):
+
+- DestinoLog: log da aplicação (logger "estoque.alertas")
+- DestinoWebhook: POST com o alerta em JSON (ver scripts/receptor_alertas.py
+  para um receptor local de testes)
+- DestinoArquivoEmail: um e-mail (.eml) por alerta numa pasta, para um
+  processo de envio ou para inspeção
+
+O mesmo alerta (produto e tipo) não é reenviado antes de
+`intervalo_repeticao` segundos, por mais movimentos que o produto receba.
+Fila e intervalo são de cada processo: com vários workers, cada um avisa no
+máximo uma vez por intervalo.
+
+Com a fila durável configurada (db.configurar_tarefas), o alerta vira uma
+tarefa de models/tarefas.py, que chama FilaAlertas.entregar() e tenta de novo
+quando algum destino falha. Cada alerta tem um id_alerta: o webhook o recebe
+no cabeçalho Idempotency-Key e o .eml é gravado com ele no nome, então uma
+nova tentativa não duplica o e-mail e o receptor pode descartar o repetido.
+
+A lista dos produtos em alerta (GET /api/alertas) não depende desta fila:
+sai da tabela ALERTA_ESTOQUE, mantida pelo banco (ver createdb.sql).
+"""
+
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.message import EmailMessage
+from email.utils import format_datetime
+
+import httpx
+
+logger = logging.getLogger("estoque.alertas")
+
+
+def mensagem_alerta(alerta):
+    """Texto do alerta para log e e-mail."""
+    nome = alerta.get("nome_produto", "")
+    if alerta["tipo_alerta"] == "MAXIMO":
+        percentual = 100 * alerta["quantidade"] / alerta["limite"] if alerta["limite"] else 100.0
+        return (
+            f"Estoque de '{nome}' está em {percentual:.1f}% da capacidade máxima! "
+            f"Atual: {alerta['quantidade']}, Máximo: {alerta['limite']}"
+        )
+    return (
+        f"Estoque de '{nome}' está próximo do mínimo! "
+        f"Atual: {alerta['quantidade']}, Mínimo: {alerta['limite']}"
+    )
+
+
+# DESTINOS
+
+
+class Destino:
+    """
+    Interface dos destinos.
+
+    enviar() pode levantar exceção: a falha vai para o log e o alerta segue
+    para os demais destinos.
+    """
+
+    def enviar(self, alerta):
+        raise NotImplementedError
+
+
+class DestinoLog(Destino):
+    def enviar(self, alerta):
+        logger.warning("ATENÇÃO: %s", mensagem_alerta(alerta))
+
+
+class DestinoWebhook(Destino):
+    """
+    POST do alerta (JSON) em `url`, com o id_alerta no cabeçalho
+    Idempotency-Key; resposta fora de 2xx conta como falha.
+    """
+
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+        self._cliente = None
+        self._pid = None
+
+    def enviar(self, alerta):
+        # Só a thread da fila usa o cliente; recriado no processo filho após um fork
+        if self._cliente is None or self._pid != os.getpid():
+            self._cliente = httpx.Client(timeout=self.timeout)
+            self._pid = os.getpid()
+        cabecalhos = {"Idempotency-Key": alerta["id_alerta"]} if alerta.get("id_alerta") else None
+        self._cliente.post(self.url, json=alerta, headers=cabecalhos).raise_for_status()
+
+
+class DestinoArquivoEmail(Destino):
+    """
+    Grava cada alerta como um e-mail (.eml) em `pasta`.
+
+    O arquivo é escrito com outro nome e renomeado no fim: quem lê a pasta
+    nunca vê um e-mail pela metade. Com id_alerta, o nome do arquivo é fixo e
+    reenviar o mesmo alerta só regrava o mesmo e-mail.
+    """
+
+    def __init__(self, pasta, remetente="estoque@localhost", destinatarios=("compras@localhost",)):
+        self.pasta = pasta
+        self.remetente = remetente
+        self.destinatarios = tuple(destinatarios)
+        os.makedirs(pasta, exist_ok=True)
+
+    def enviar(self, alerta):
+        mensagem = EmailMessage()
+        mensagem["Subject"] = f"[Estoque] {alerta.get('nome_produto', '')}: alerta de estoque {alerta['tipo_alerta'].lower()}"
+        mensagem["From"] = self.remetente
+        mensagem["To"] = ", ".join(self.destinatarios)
+        mensagem["Date"] = format_datetime(datetime.now(timezone.utc))
+        mensagem.set_content(mensagem_alerta(alerta) + "\n")
+
+        nome = f"{alerta.get('id_alerta') or uuid.uuid4().hex}.eml"
+        caminho = os.path.join(self.pasta, nome)
+        with open(caminho + ".tmp", "wb") as saida:
+            saida.write(bytes(mensagem))
+        os.replace(caminho + ".tmp", caminho)
+
+
+# FILA
+
+
+class FilaAlertas:
+    """
+    Fila limitada de alertas com uma thread de entrega.
+
+    publicar() nunca bloqueia: com a fila cheia o alerta é descartado (e
+    contado). A thread é criada no primeiro alerta de cada processo, então
+    funciona também nos workers criados por fork.
+    """
+
+    def __init__(self, destinos=None, intervalo_repeticao=300, tamanho_maximo=1000):
+        self.destinos = list(destinos) if destinos else [DestinoLog()]
+        self.intervalo_repeticao = intervalo_repeticao
+        self.tamanho_maximo = tamanho_maximo
+        self._lock = threading.Lock()
+        self._fila = None
+        self._thread = None
+        self._pid = None
+        # (id_produto, tipo_alerta) -> instante (monotonic) do último envio;
+        # só as threads de entrega (desta fila ou da fila de tarefas) mexem nele
+        self._ultimo_envio = {}
+        self.publicados = 0
+        self.enviados = 0
+        self.repetidos = 0
+        self.descartados = 0
+        self.falhas = 0
+
+    def _iniciar(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                # Após um fork a fila herdada pode estar com a trava presa
+                self._fila = queue.Queue(self.tamanho_maximo)
+                self._ultimo_envio = {}
+                self._thread = threading.Thread(target=self._trabalhar, name="alertas", daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def publicar(self, alerta):
+        self._iniciar()
+        try:
+            self._fila.put_nowait(alerta)
+        except queue.Full:
+            with self._lock:
+                self.descartados += 1
+            logger.error("Fila de alertas cheia; alerta descartado: %s", mensagem_alerta(alerta))
+            return
+        with self._lock:
+            self.publicados += 1
+
+    def aguardar(self):
+        """Espera a entrega de tudo o que já foi publicado neste processo."""
+        if self._fila is not None and self._pid == os.getpid():
+            self._fila.join()
+
+    def _trabalhar(self):
+        fila = self._fila
+        while True:
+            alerta = fila.get()
+            try:
+                self._entregar(alerta)
+            except Exception:
+                logger.exception("Erro ao entregar alerta de estoque")
+            finally:
+                fila.task_done()
+
+    def _entregar(self, alerta):
+        self.entregar(alerta, levantar=False)
+
+    def entregar(self, alerta, verificar_repeticao=True, levantar=True):
+        """
+        Envia o alerta agora, na thread de quem chama, a todos os destinos.
+
+        Args:
+            verificar_repeticao: Se False, envia mesmo dentro do intervalo de
+                repetição (nova tentativa de um alerta que já passou por aqui)
+            levantar: Se True, levanta RuntimeError quando algum destino falha
+                (depois de tentar todos)
+        """
+        agora = time.monotonic()
+        chave = (alerta["id_produto"], alerta["tipo_alerta"])
+        ultimo = self._ultimo_envio.get(chave)
+        if verificar_repeticao and ultimo is not None and agora - ultimo < self.intervalo_repeticao:
+            with self._lock:
+                self.repetidos += 1
+            return
+
+        if len(self._ultimo_envio) >= 10 * self.tamanho_maximo:
+            self._ultimo_envio = {
+                c: t for c, t in self._ultimo_envio.items() if agora - t < self.intervalo_repeticao
+            }
+        self._ultimo_envio[chave] = agora
+
+        falhas = []
+        for destino in self.destinos:
+            try:
+                destino.enviar(alerta)
+            except Exception:
+                falhas.append(type(destino).__name__)
+                logger.exception("Falha ao enviar alerta para %s", type(destino).__name__)
+        with self._lock:
+            self.enviados += 1
+            self.falhas += len(falhas)
+        if falhas and levantar:
+            raise RuntimeError(f"Falha ao enviar alerta para {', '.join(falhas)}")
+
+    def estatisticas(self):
+        with self._lock:
+            return {
+                "destinos": [type(destino).__name__ for destino in self.destinos],
+                "intervalo_repeticao": self.intervalo_repeticao,
+                "na_fila": self._fila.qsize() if self._fila is not None and self._pid == os.getpid() else 0,
+                "publicados": self.publicados,
+                "enviados": self.enviados,
+                "repetidos": self.repetidos,
+                "descartados": self.descartados,
+                "falhas": self.falhas,
+            }
@@ -0,0 +1,275 @@
+"""
+Arquivo dos movimentos antigos (partições frias de MOVIMENTO_ESTOQUE).
+
+arquivar_particoes_frias() exporta cada mês antigo para um arquivo
+compactado na pasta do arquivo (CSV.gz, ou Parquet com o pacote pyarrow),
+registra o mês no manifesto da pasta e só então remove a partição do banco.
+ArquivoMovimentos lê esses arquivos de volta; db.historico_movimentos junta
+arquivo e banco numa só leitura, em ordem de data.
+
+Meses são sempre em UTC, como as partições (ver
+migrations/0003_movimento_particionado.sql).
+"""
+
+import csv
+import gzip
+import json
+import os
+import re
+from datetime import datetime, timezone
+
+NOME_MANIFESTO = "manifesto.json"
+
+COLUNAS_ARQUIVO = ("id", "id_produto", "id_usuario", "tipo_movimento", "quantidade", "data_movimento")
+COLUNAS_INTEIRAS = ("id", "id_produto", "id_usuario", "quantidade")
+
+FORMATOS = ("csv.gz", "parquet")
+
+PADRAO_PARTICAO = re.compile(r"^MOVIMENTO_ESTOQUE_(\d{4})_(\d{2})$")
+
+
+def inicio_do_mes(ano, mes):
+    """Primeiro instante do mês (UTC), no formato ISO usado em data_movimento."""
+    return datetime(ano, mes, 1, tzinfo=timezone.utc).isoformat(timespec="microseconds")
+
+
+def mes_seguinte(ano, mes):
+    return (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+
+class ArquivoMovimentos:
+    """
+    Pasta com os meses arquivados e o manifesto (manifesto.json) que diz
+    quais meses estão nela.
+
+    Os meses arquivados são sempre os mais antigos: tudo antes de corte()
+    está no arquivo, e o banco só é lido a partir dele.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = pasta
+        self._manifesto_cache = None
+        self._manifesto_mtime = None
+
+    def _caminho_manifesto(self):
+        return os.path.join(self.pasta, NOME_MANIFESTO)
+
+    def manifesto(self):
+        """{"AAAA-MM": {arquivo, formato, linhas, arquivado_em}} (relido se mudou)."""
+        caminho = self._caminho_manifesto()
+        try:
+            mtime = os.stat(caminho).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if mtime != self._manifesto_mtime:
+            with open(caminho, encoding="utf-8") as arquivo:
+                self._manifesto_cache = json.load(arquivo)["meses"]
+            self._manifesto_mtime = mtime
+        return self._manifesto_cache
+
+    def registrar(self, mes, arquivo, formato, linhas):
+        """Inclui o mês no manifesto (gravação atômica: temporário + rename)."""
+        meses = dict(self.manifesto())
+        meses[mes] = {
+            "arquivo": arquivo,
+            "formato": formato,
+            "linhas": linhas,
+            "arquivado_em": datetime.now(timezone.utc).isoformat(),
+        }
+        temporario = self._caminho_manifesto() + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as saida:
+            json.dump({"meses": dict(sorted(meses.items()))}, saida, indent=2)
+            saida.flush()
+            os.fsync(saida.fileno())
+        os.replace(temporario, self._caminho_manifesto())
+
+    def meses(self):
+        return sorted(self.manifesto())
+
+    def corte(self):
+        """Primeiro instante depois do último mês arquivado (None se não há arquivo)."""
+        meses = self.meses()
+        if not meses:
+            return None
+        ano, mes = map(int, meses[-1].split("-"))
+        return inicio_do_mes(*mes_seguinte(ano, mes))
+
+    def ler(self, id_produto=None, id_usuario=None, tipo_movimento=None,
+            inicio=None, fim=None, apos=None):
+        """
+        Movimentos arquivados em ordem de data, um mês por vez (gerador).
+
+        inicio/fim são instantes ISO em UTC (fim exclusivo) e `apos` é o
+        (data_movimento, id) da última linha já lida, como em
+        db.historico_movimentos.
+        """
+        if apos and (inicio is None or apos[0] > inicio):
+            inicio = apos[0]
+        for mes in self.meses():
+            ano, numero = map(int, mes.split("-"))
+            de, ate = inicio_do_mes(ano, numero), inicio_do_mes(*mes_seguinte(ano, numero))
+            if (inicio is not None and inicio >= ate) or (fim is not None and fim <= de):
+                continue
+
+            info = self.manifesto()[mes]
+            for movimento in self._linhas(os.path.join(self.pasta, info["arquivo"]), info["formato"]):
+                if id_produto is not None and movimento["id_produto"] != id_produto:
+                    continue
+                if id_usuario is not None and movimento["id_usuario"] != id_usuario:
+                    continue
+                if tipo_movimento is not None and movimento["tipo_movimento"] != tipo_movimento:
+                    continue
+                if apos and (movimento["data_movimento"], movimento["id"]) <= apos:
+                    continue
+                if inicio is not None and movimento["data_movimento"] < inicio:
+                    continue
+                if fim is not None and movimento["data_movimento"] >= fim:
+                    continue
+                # Mesmo formato que o banco devolve (sem frações zeradas)
+                movimento["data_movimento"] = datetime.fromisoformat(movimento["data_movimento"]).isoformat()
+                yield movimento
+
+    def _linhas(self, caminho, formato):
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+
+            for lote in pq.ParquetFile(caminho).iter_batches(batch_size=10000):
+                yield from lote.to_pylist()
+            return
+
+        with gzip.open(caminho, "rt", encoding="utf-8", newline="") as arquivo:
+            for linha in csv.DictReader(arquivo):
+                for coluna in COLUNAS_INTEIRAS:
+                    linha[coluna] = int(linha[coluna])
+                yield linha
+
+
+# JOB DE ARQUIVAMENTO (Postgres)
+
+# data_movimento sai em ISO/UTC sempre com microssegundos, para que a
+# comparação como texto em ArquivoMovimentos.ler seja exata
+SELECT_EXPORTACAO = (
+    "SELECT id, id_produto, id_usuario, tipo_movimento, quantidade, "
+    "to_char(data_movimento AT TIME ZONE 'UTC', 'YYYY-MM-DD\"T\"HH24:MI:SS.US\"+00:00\"') "
+    "AS data_movimento FROM public.{particao} ORDER BY data_movimento, id"
+)
+
+
+def _csv_para_parquet(origem, destino):
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    leitor = pacsv.open_csv(
+        origem,
+        convert_options=pacsv.ConvertOptions(
+            column_types={"tipo_movimento": "string", "data_movimento": "string"}
+        ),
+    )
+    with pq.ParquetWriter(destino, leitor.schema, compression="zstd") as escritor:
+        for lote in leitor:
+            escritor.write_batch(lote)
+
+
+def exportar_particao(conn, particao, caminho, formato="csv.gz"):
+    """
+    Grava a partição em `caminho` e devolve quantas linhas foram gravadas.
+
+    Escreve num temporário e só renomeia no fim: um arquivo com o nome final
+    está sempre completo.
+    """
+    from psycopg import sql
+
+    temporario = caminho + ".tmp"
+    csv_gz = temporario if formato == "csv.gz" else caminho + ".csv.gz.tmp"
+    consulta = SELECT_EXPORTACAO.format(particao=sql.Identifier(particao).as_string(conn))
+
+    with gzip.open(csv_gz, "wb") as saida:
+        with conn.cursor().copy(f"COPY ({consulta}) TO STDOUT WITH (FORMAT csv, HEADER true)") as copia:
+            for bloco in copia:
+                saida.write(bloco)
+
+    with gzip.open(csv_gz, "rt", encoding="utf-8", newline="") as entrada:
+        linhas = sum(1 for _ in csv.reader(entrada)) - 1
+
+    if formato == "parquet":
+        _csv_para_parquet(csv_gz, temporario)
+        os.remove(csv_gz)
+
+    with open(temporario, "rb") as arquivo:
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+    return linhas
+
+
+def particoes_frias(conn, meses_quentes=12):
+    """Partições mensais anteriores aos últimos `meses_quentes` meses, da mais antiga à mais nova."""
+    agora = datetime.now(timezone.utc)
+    limite = agora.year * 12 + agora.month - 1 - meses_quentes
+
+    nomes = [
+        linha[0] for linha in conn.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'public.\"MOVIMENTO_ESTOQUE\"'::regclass"
+        )
+    ]
+    frias = []
+    for nome in nomes:
+        achado = PADRAO_PARTICAO.match(nome)
+        if achado:
+            ano, mes = int(achado.group(1)), int(achado.group(2))
+            if ano * 12 + mes - 1 < limite:
+                frias.append((f"{ano:04d}-{mes:02d}", nome))
+    return sorted(frias)
+
+
+def arquivar_particoes_frias(url, pasta, meses_quentes=12, formato="csv.gz"):
+    """
+    Arquiva e remove do banco as partições com mais de `meses_quentes` meses.
+
+    Para cada mês: exporta a partição (travada contra escritas), confere o
+    número de linhas, registra no manifesto e só então faz DETACH + DROP na
+    mesma transação. Se o DROP falhar, o mês continua no banco mas a leitura
+    já usa o arquivo (ver ArquivoMovimentos.corte), sem duplicar linhas.
+
+    Returns:
+        Lista de (mês, linhas arquivadas).
+    """
+    import psycopg
+
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de arquivo inválido: {formato}. Use: {', '.join(FORMATOS)}")
+
+    os.makedirs(pasta, exist_ok=True)
+    arquivo = ArquivoMovimentos(pasta)
+    arquivados = []
+
+    with psycopg.connect(url) as conn:
+        # Movimentos antigos que caíram na partição padrão ganham partição
+        # própria antes, para serem arquivados junto com o mês deles
+        conn.execute(
+            "SELECT public.criar_particao_movimento(mes) FROM ("
+            " SELECT DISTINCT date_trunc('month', data_movimento AT TIME ZONE 'UTC')::DATE AS mes"
+            " FROM public.\"MOVIMENTO_ESTOQUE_padrao\""
+            " WHERE data_movimento < date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'"
+            "   - make_interval(months => %s)"
+            ") AS meses",
+            (meses_quentes,),
+        )
+        conn.commit()
+
+        for mes, particao in particoes_frias(conn, meses_quentes):
+            nome_arquivo = f"{particao}.{formato}"
+            with conn.transaction():
+                conn.execute(f'LOCK TABLE public."{particao}" IN SHARE MODE')
+                linhas = exportar_particao(conn, particao, os.path.join(pasta, nome_arquivo), formato)
+                (no_banco,) = conn.execute(f'SELECT count(*) FROM public."{particao}"').fetchone()
+                if linhas != no_banco:
+                    raise RuntimeError(
+                        f"{particao}: {no_banco} linhas no banco, {linhas} no arquivo; nada foi removido"
+                    )
+                arquivo.registrar(mes, nome_arquivo, formato, linhas)
+                conn.execute(f'ALTER TABLE public."MOVIMENTO_ESTOQUE" DETACH PARTITION public."{particao}"')
+                conn.execute(f'DROP TABLE public."{particao}"')
+            arquivados.append((mes, linhas))
+
+    return arquivados
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+# BACKENDS
+# Onde os valores ficam guardados. Com vários workers (Gunicorn), use um
+# backend compartilhado (SQLite ou Redis): uma invalidação feita num worker
+# passa a valer para todos. BackendMemoria só serve para um processo.
+
+
+class BackendCache:
+    """
+    Interface dos backends de cache.
+
+    Os valores precisam ser serializáveis em JSON (backends compartilhados
+    guardam texto). obter() devolve None quando a chave não existe ou expirou.
+    `bloqueante` indica que as chamadas esperam disco ou rede: no laço de
+    eventos (CacheTTL.obter_async) elas rodam numa thread.
+    """
+
+    bloqueante = True
+
+    def obter(self, chave):
+        raise NotImplementedError
+
+    def gravar(self, chave, valor, ttl):
+        raise NotImplementedError
+
+    def remover(self, chave):
+        raise NotImplementedError
+
+    def incrementar(self, chave):
+        """Soma 1 ao contador `chave` (criando com 1) e devolve o novo valor."""
+        raise NotImplementedError
+
+    def ler_contador(self, chave):
+        """Valor atual do contador `chave` (0 se nunca foi incrementado)."""
+        raise NotImplementedError
+
+
+class BackendMemoria(BackendCache):
+    """LRU em memória do próprio processo, limitado a max_itens chaves."""
+
+    bloqueante = False
+
+    def __init__(self, max_itens=1024):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._contadores = {}
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            if item[0] <= time.monotonic():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return item[1]
+
+    def gravar(self, chave, valor, ttl):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl, valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover(self, chave):
+        with self._lock:
+            self._itens.pop(chave, None)
+
+    def incrementar(self, chave):
+        with self._lock:
+            self._contadores[chave] = self._contadores.get(chave, 0) + 1
+            return self._contadores[chave]
+
+    def ler_contador(self, chave):
+        with self._lock:
+            return self._contadores.get(chave, 0)
+
+
+class BackendSQLite(BackendCache):
+    """
+    Cache compartilhado num arquivo SQLite local (modo WAL).
+
+    Todos os workers da mesma máquina abrem o mesmo arquivo. Cada thread (e
+    cada processo, após um fork) usa a sua própria conexão.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        with self._conexao() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " chave TEXT PRIMARY KEY,"
+                " valor TEXT NOT NULL,"
+                " expira REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS contadores ("
+                " chave TEXT PRIMARY KEY,"
+                " valor INTEGER NOT NULL)"
+            )
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def obter(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM cache WHERE chave = ? AND expira > ?",
+            (chave, time.time()),
+        ).fetchone()
+        return json.loads(linha[0]) if linha else None
+
+    def gravar(self, chave, valor, ttl):
+        agora = time.time()
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM cache WHERE expira <= ?", (agora,))
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)",
+                (chave, json.dumps(valor), agora + ttl),
+            )
+
+    def remover(self, chave):
+        with self._conexao() as conn:
+            conn.execute("DELETE FROM cache WHERE chave = ?", (chave,))
+
+    def incrementar(self, chave):
+        with self._conexao() as conn:
+            conn.execute(
+                "INSERT INTO contadores (chave, valor) VALUES (?, 1) "
+                "ON CONFLICT(chave) DO UPDATE SET valor = valor + 1",
+                (chave,),
+            )
+            return conn.execute(
+                "SELECT valor FROM contadores WHERE chave = ?", (chave,)
+            ).fetchone()[0]
+
+    def ler_contador(self, chave):
+        linha = self._conexao().execute(
+            "SELECT valor FROM contadores WHERE chave = ?", (chave,)
+        ).fetchone()
+        return linha[0] if linha else 0
+
+
+class BackendRedis(BackendCache):
+    """Cache compartilhado num servidor Redis (ou compatível). Requer o pacote redis."""
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+
+    def obter(self, chave):
+        valor = self._redis.get(chave)
+        return json.loads(valor) if valor is not None else None
+
+    def gravar(self, chave, valor, ttl):
+        self._redis.set(chave, json.dumps(valor), ex=max(1, int(ttl)))
+
+    def remover(self, chave):
+        self._redis.delete(chave)
+
+    def incrementar(self, chave):
+        return self._redis.incr(chave)
+
+    def ler_contador(self, chave):
+        valor = self._redis.get(chave)
+        return int(valor) if valor is not None else 0
+
+
+def criar_backend(url="memoria"):
+    """
+    Cria o backend a partir de uma URL:
+
+    - "memoria": LRU do próprio processo (padrão, só para um worker)
+    - "sqlite:////caminho/absoluto/cache.db": arquivo compartilhado entre os workers
+    - "redis://host:6379/0": servidor Redis compartilhado
+    """
+    if url == "memoria":
+        return BackendMemoria()
+    if url.startswith("sqlite:///"):
+        return BackendSQLite(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return BackendRedis(url)
+    raise ValueError(f"Backend de cache desconhecido: {url}")
+
+
+# CACHE
+
+
+class CacheTTL:
+    """
+    Cache com expiração (TTL) e invalidação explícita sobre um BackendCache.
+
+    As chaves levam o prefixo do cache e um número de geração guardado no
+    próprio backend. Invalidar incrementa a geração: as chaves antigas deixam
+    de ser lidas por todos os workers que usam o mesmo backend, e um
+    carregamento que começou antes da invalidação grava numa geração que
+    ninguém mais lê. Os contadores de acertos/falhas são do processo atual.
+    """
+
+    def __init__(self, ttl=300, backend=None, prefixo="cache"):
+        self.ttl = ttl
+        self.backend = backend or BackendMemoria()
+        self.prefixo = prefixo
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+
+    def _chave_geracao(self, chave):
+        return f"{self.prefixo}:geracao:{chave}"
+
+    def _chave_valor(self, chave, geracao):
+        return f"{self.prefixo}:{chave}:{geracao}"
+
+    def _ler(self, chave):
+        """(geração, valor em cache ou None)."""
+        geracao = self.backend.ler_contador(self._chave_geracao(chave))
+        return geracao, self.backend.obter(self._chave_valor(chave, geracao))
+
+    def obter(self, chave, carregar):
+        """Retorna o valor em cache ou chama carregar() e guarda o resultado."""
+        geracao, valor = self._ler(chave)
+        if valor is not None:
+            with self._lock:
+                self.acertos += 1
+            return valor
+
+        with self._lock:
+            self.falhas += 1
+        valor = carregar()
+        self.backend.gravar(self._chave_valor(chave, geracao), valor, self.ttl)
+        return valor
+
+    async def _no_backend(self, funcao, *args):
+        if self.backend.bloqueante:
+            return await asyncio.to_thread(funcao, *args)
+        return funcao(*args)
+
+    async def obter_async(self, chave, carregar):
+        """
+        Como obter(), mas carregar é uma função assíncrona (ver db_async).
+        As chamadas a um backend compartilhado rodam numa thread, sem
+        travar o laço de eventos enquanto esperam o SQLite ou o Redis.
+        """
+        geracao, valor = await self._no_backend(self._ler, chave)
+        if valor is not None:
+            with self._lock:
+                self.acertos += 1
+            return valor
+
+        with self._lock:
+            self.falhas += 1
+        valor = await carregar()
+        await self._no_backend(self.backend.gravar, self._chave_valor(chave, geracao), valor, self.ttl)
+        return valor
+
+    def invalidar(self, chave):
+        """Descarta a chave em todos os workers que compartilham o backend."""
+        geracao = self.backend.ler_contador(self._chave_geracao(chave))
+        self.backend.incrementar(self._chave_geracao(chave))
+        self.backend.remover(self._chave_valor(chave, geracao))
+        with self._lock:
+            self.invalidacoes += 1
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "backend": type(self.backend).__name__,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "invalidacoes": self.invalidacoes,
+                "taxa_acerto": round(self.acertos / total, 4) if total else 0.0,
+                "ttl": self.ttl,
+            }
@@ -0,0 +1,261 @@
+"""
+Camada de acesso a dados assíncrona (asyncio) para a API.
+
+Mesmas regras de models/db.py, mas sobre o cliente assíncrono do Supabase:
+enquanto uma chamada espera o PostgREST, o laço de eventos atende outras, e
+leituras independentes rodam ao mesmo tempo (asyncio.gather).
+
+Cada worker tem um único laço de eventos rodando numa thread própria, onde o
+cliente assíncrono mantém suas conexões. O código síncrono (views Flask) usa
+executar() / sincrono() para rodar corrotinas nesse laço.
+
+Como todas as views async do worker passam por esse laço, nada aqui pode
+bloquear a thread dele: o que espera disco ou rede sem ser pelo cliente
+assíncrono (repositório SQL, backend do cache, fila de tarefas) roda no pool
+de threads do laço (asyncio.to_thread), com max_threads threads.
+
+Com um repositório SQL (db.configurar_repositorio) não há cliente
+assíncrono: as funções daqui rodam as versões de models/db numa thread.
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from postgrest.exceptions import APIError
+from supabase import AsyncClient, acreate_client
+
+from models import db
+from models.repositorio import SELECT_PRODUTOS_COM_NOMES, erro_de_negocio, montar_consulta_produtos_paginada
+
+supabase: AsyncClient = None
+
+_loop = None
+_pid = None
+_config = None
+_lock = threading.Lock()
+
+
+# LAÇO DE EVENTOS DO WORKER
+
+def iniciar(url=None, key=None, max_threads=None):
+    """
+    Guarda a configuração do cliente; o laço sobe no primeiro uso em cada processo.
+
+    Sem url/key só o laço é criado (dados num repositório SQL).
+    max_threads: threads para as chamadas bloqueantes (padrão do Python:
+    núcleos + 4, até 32). Com um repositório SQL, use ao menos o número de
+    threads do servidor por worker, ou as requisições esperam na fila.
+    """
+    global _config
+    _config = (url, key, max_threads)
+    _garantir_loop()
+
+
+def _garantir_loop():
+    # Após um fork (servidores pre-fork) a thread do laço não existe no
+    # processo filho: sobe um laço e um cliente novos para este processo.
+    global _loop, _pid, supabase
+    if _loop is not None and _pid == os.getpid():
+        return _loop
+
+    with _lock:
+        if _loop is not None and _pid == os.getpid():
+            return _loop
+        if _config is None:
+            raise RuntimeError("db_async.iniciar() não foi chamado")
+
+        url, key, max_threads = _config
+        loop = asyncio.new_event_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_threads, thread_name_prefix="db-async"))
+        threading.Thread(target=loop.run_forever, name="db-async", daemon=True).start()
+        if url is not None:
+            supabase = asyncio.run_coroutine_threadsafe(acreate_client(url, key), loop).result()
+        _loop, _pid = loop, os.getpid()
+        return _loop
+
+
+def executar(coro, timeout=None):
+    """
+    Roda a corrotina no laço do worker e espera o resultado (código síncrono).
+
+    A corrotina herda o contexto da thread chamadora (contextvars), então
+    request, g e get_jwt() do Flask continuam funcionando dentro dela.
+    """
+    loop = _garantir_loop()
+    contexto = contextvars.copy_context()
+    futuro = Future()
+
+    def transferir(tarefa):
+        if tarefa.cancelled():
+            futuro.cancel()
+        elif tarefa.exception() is not None:
+            futuro.set_exception(tarefa.exception())
+        else:
+            futuro.set_result(tarefa.result())
+
+    def agendar():
+        tarefa = contexto.run(loop.create_task, coro)
+        tarefa.add_done_callback(transferir)
+
+    loop.call_soon_threadsafe(agendar)
+    return futuro.result(timeout)
+
+
+def sincrono(func):
+    """Versão síncrona de uma função async (usada por Flask.async_to_sync)."""
+    def wrapper(*args, **kwargs):
+        return executar(func(*args, **kwargs))
+
+    return wrapper
+
+
+def _ou_sincrono(func_db):
+    """
+    Sem cliente assíncrono do Supabase, roda func_db (a função equivalente
+    de models/db) numa thread, sem bloquear o laço.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if supabase is None:
+                return await asyncio.to_thread(func_db, *args, **kwargs)
+            return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorador
+
+
+# READ
+
+async def versao_tabelas(*tabelas):
+    """Ver db.versao_tabelas (consulta o banco, fora do laço)."""
+    return await asyncio.to_thread(db.versao_tabelas, *tabelas)
+
+
+async def _listar_referencia(tabela):
+    async def carregar():
+        resp = await supabase.table(tabela).select("*").execute()
+        return db._item_referencia(resp.data or [])
+
+    item = await db.cache_referencia.obter_async(tabela, carregar)
+    return db._resposta_referencia(item)
+
+
+@_ou_sincrono(db.listar_usuarios)
+async def listar_usuarios():
+    return await supabase.table("USUARIOS").select("*").execute()
+
+
+@_ou_sincrono(db.listar_locais_estoque)
+async def listar_locais_estoque():
+    return await _listar_referencia("LOCAL_ESTOQUE")
+
+
+@_ou_sincrono(db.listar_fornecedores)
+async def listar_fornecedores():
+    return await _listar_referencia("FORNECEDOR")
+
+
+@_ou_sincrono(db.listar_categorias)
+async def listar_categorias():
+    return await _listar_referencia("CATEGORIA")
+
+
+@_ou_sincrono(db.listar_produtos)
+async def listar_produtos():
+    return await supabase.table("PRODUTOS").select("*").execute()
+
+
+@_ou_sincrono(db.listar_produtos_com_nomes)
+async def listar_produtos_com_nomes():
+    return await supabase.table("PRODUTOS").select(SELECT_PRODUTOS_COM_NOMES).execute()
+
+
+@_ou_sincrono(db.listar_produtos_paginado)
+async def listar_produtos_paginado(**kwargs):
+    """Mesmos argumentos e retorno de db.listar_produtos_paginado."""
+    limite, consulta = db.preparar_pagina(**kwargs)
+    resp = await montar_consulta_produtos_paginada(supabase, **consulta).execute()
+    return db.fechar_pagina(resp.data or [], limite, consulta["ordenar_por"])
+
+
+@_ou_sincrono(db.obter_produto_por_id)
+async def obter_produto_por_id(id_produto):
+    return await supabase.table("PRODUTOS").select("*").eq("id", id_produto).limit(1).execute()
+
+
+@_ou_sincrono(db.obter_categoria_por_id)
+async def obter_categoria_por_id(id_categoria):
+    return await supabase.table("CATEGORIA").select("*").eq("id", id_categoria).limit(1).execute()
+
+
+@_ou_sincrono(db.obter_local_por_id)
+async def obter_local_por_id(id_local):
+    return await supabase.table("LOCAL_ESTOQUE").select("*").eq("id", id_local).limit(1).execute()
+
+
+@_ou_sincrono(db.obter_fornecedor_por_id)
+async def obter_fornecedor_por_id(id_fornecedor):
+    return await supabase.table("FORNECEDOR").select("*").eq("id", id_fornecedor).limit(1).execute()
+
+
+async def carregar_pagina_produtos():
+    """
+    Dados da tela /produtos: as quatro leituras rodam ao mesmo tempo.
+
+    Returns:
+        (produtos, locais, fornecedores, categorias)
+    """
+    respostas = await asyncio.gather(
+        listar_produtos_com_nomes(),
+        listar_locais_estoque(),
+        listar_fornecedores(),
+        listar_categorias(),
+    )
+    return tuple(resp.data or [] for resp in respostas)
+
+
+# UPDATE (estoque)
+
+@_ou_sincrono(db.movimentar_estoque)
+async def movimentar_estoque(id_produto, tipo_movimento, quantidade, id_usuario=None):
+    """Ver db.movimentar_estoque."""
+    if quantidade is not None and quantidade > db.MAXIMO_QUANTIDADE:
+        raise ValueError(f"Quantidade deve ser no máximo {db.MAXIMO_QUANTIDADE}")
+    try:
+        resp = await supabase.rpc("movimentar_estoque", {
+            "p_id_produto": id_produto,
+            "p_tipo_movimento": tipo_movimento,
+            "p_quantidade": quantidade,
+            "p_id_usuario": id_usuario,
+        }).execute()
+    except APIError as e:
+        raise erro_de_negocio(e)
+    return resp
+
+
+async def entrada_estoque(id_produto, quantidade, id_usuario=None):
+    """Ver db.entrada_estoque."""
+    if quantidade <= 0:
+        raise ValueError("Quantidade de entrada deve ser maior que zero")
+
+    resp = await movimentar_estoque(id_produto, "ENTRADA", quantidade, id_usuario)
+    # Grava na fila de tarefas (arquivo SQLite): fora do laço
+    await asyncio.to_thread(db.apos_movimento, "ENTRADA", resp.data)
+    return resp
+
+
+async def saida_estoque(id_produto, quantidade, id_usuario=None):
+    """Ver db.saida_estoque."""
+    if quantidade <= 0:
+        raise ValueError("Quantidade de saída deve ser maior que zero")
+
+    resp = await movimentar_estoque(id_produto, "SAIDA", quantidade, id_usuario)
+    # Grava na fila de tarefas (arquivo SQLite): fora do laço
+    await asyncio.to_thread(db.apos_movimento, "SAIDA", resp.data)
+    return resp
@@ -0,0 +1,107 @@
+"""
+Diretório de usuários em memória: nome -> {id, nome_usuario, tipo_usuario}.
+
+Atende a página de login e a checagem de nome repetido no cadastro sem ler
+a tabela USUARIOS a cada requisição, e sem guardar os hashes das senhas (o
+login busca o hash no banco, pelo índice do nome). Por poder estar
+atrasado, não decide nada sozinho: o índice único do nome barra o cadastro
+repetido e a conferência de administrador vai ao banco (ver models/db.py).
+
+Cadastrar ou excluir um usuário atualiza o índice do próprio processo e
+incrementa um contador de versão no backend do cache (ver models/cache.py):
+os outros workers que usam o mesmo backend veem a versão nova e recarregam
+o diretório (só id, nome e tipo). Com o backend em memória, cada processo só
+vê as próprias mudanças até o diretório expirar (`ttl`).
+"""
+
+import threading
+import time
+
+from models.cache import BackendMemoria
+
+
+class DiretorioUsuarios:
+    def __init__(self, carregar, backend=None, ttl=300, chave_versao="usuarios:versao"):
+        """
+        Args:
+            carregar: Função que devolve a lista de {id, nome_usuario, tipo_usuario}
+        """
+        self._carregar = carregar
+        self.backend = backend or BackendMemoria()
+        self.ttl = ttl
+        self.chave_versao = chave_versao
+        self._lock = threading.Lock()
+        self._por_nome = {}
+        self._por_id = {}
+        self._versao = None
+        self._carregado_em = 0.0
+        self.recargas = 0
+
+    @staticmethod
+    def _resumo(usuario):
+        return {
+            "id": usuario["id"],
+            "nome_usuario": usuario["nome_usuario"],
+            "tipo_usuario": usuario["tipo_usuario"],
+        }
+
+    def _atualizar(self):
+        versao = self.backend.ler_contador(self.chave_versao)
+        if versao == self._versao and time.monotonic() - self._carregado_em < self.ttl:
+            return
+        with self._lock:
+            if versao == self._versao and time.monotonic() - self._carregado_em < self.ttl:
+                return
+            # A versão é lida antes da carga: uma mudança feita durante ela
+            # deixa a versão guardada para trás e força outra recarga
+            usuarios = [self._resumo(u) for u in self._carregar()]
+            self._por_nome = {u["nome_usuario"]: u for u in usuarios}
+            self._por_id = {u["id"]: u for u in usuarios}
+            self._versao = versao
+            self._carregado_em = time.monotonic()
+            self.recargas += 1
+
+    def _mudou(self, aplicar):
+        """Incrementa a versão; aplica a mudança aqui se nenhum outro worker mudou antes."""
+        with self._lock:
+            versao = self.backend.incrementar(self.chave_versao)
+            if self._versao is not None and versao == self._versao + 1:
+                aplicar()
+                self._versao = versao
+            else:
+                self._versao = None
+
+    def buscar(self, nome_usuario):
+        self._atualizar()
+        return self._por_nome.get(nome_usuario)
+
+    def obter(self, id_usuario):
+        self._atualizar()
+        return self._por_id.get(id_usuario)
+
+    def listar(self):
+        """Usuários em ordem de nome."""
+        self._atualizar()
+        return sorted(self._por_nome.values(), key=lambda u: u["nome_usuario"])
+
+    def adicionar(self, usuario):
+        resumo = self._resumo(usuario)
+
+        def aplicar():
+            self._por_nome[resumo["nome_usuario"]] = resumo
+            self._por_id[resumo["id"]] = resumo
+
+        self._mudou(aplicar)
+
+    def remover(self, id_usuario):
+        def aplicar():
+            usuario = self._por_id.pop(id_usuario, None)
+            if usuario is not None:
+                self._por_nome.pop(usuario["nome_usuario"], None)
+
+        self._mudou(aplicar)
+
+    def invalidar(self):
+        """Recarrega na próxima consulta (ex.: trocou o banco)."""
+        with self._lock:
+            self._versao = None
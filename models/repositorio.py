@@ -0,0 +1,490 @@
+"""
+Repositórios: onde os dados do estoque ficam guardados.
+
+models/db.py mantém as regras de negócio e o cache e delega a leitura e a
+escrita a um Repositorio. Há duas implementações:
+
+- RepositorioSupabase: PostgREST do Supabase via HTTP (padrão)
+- RepositorioSQLite / RepositorioPostgres (models/repositorio_sql.py): SQL
+  direto num arquivo SQLite local (testes, desenvolvimento) ou num Postgres
+  com pool de conexões, sobre o esquema de createdb.sql
+
+Os métodos recebem e devolvem dicionários e listas simples; quem embrulha
+o resultado em respostas com .data é o models/db.py.
+"""
+
+import json
+import math
+from datetime import datetime, timezone
+
+from postgrest.exceptions import APIError
+
+
+# Colunas de cada tabela (ver createdb.sql). Os repositórios SQL só montam
+# comandos com nomes desta lista.
+COLUNAS = {
+    "USUARIOS": ("id", "nome_usuario", "tipo_usuario", "senha_usuario"),
+    "CATEGORIA": ("id", "nome_categoria"),
+    "LOCAL_ESTOQUE": ("id", "nome_local"),
+    "FORNECEDOR": ("id", "nome_fornecedor"),
+    "PRODUTOS": (
+        "id",
+        "nome_produto",
+        "custo_produto_Unit",
+        "valor_venda_Unit",
+        "id_local",
+        "id_categoria",
+        "id_fornecedor",
+        "quantidade",
+        "estoque_minimo",
+        "estoque_maximo",
+        "versao",
+        "atualizado_em",
+    ),
+    # Sem a coluna versao (só em GET /api/sync): as listagens e os meses
+    # arquivados (models/arquivo_movimentos.py) mantêm o mesmo formato
+    "MOVIMENTO_ESTOQUE": (
+        "id",
+        "id_produto",
+        "id_usuario",
+        "tipo_movimento",
+        "quantidade",
+        "data_movimento",
+    ),
+    "SALDO_DIARIO": ("id_produto", "dia", "quantidade"),
+    "RESUMO_ESTOQUE": (
+        "id_categoria",
+        "id_local",
+        "id_fornecedor",
+        "produtos",
+        "quantidade",
+        "valor_custo",
+        "valor_venda",
+        "abaixo_minimo",
+    ),
+    "ALERTA_ESTOQUE": ("id_produto", "tipo_alerta", "quantidade", "limite", "desde"),
+    "CONSUMO_PRODUTO": ("id_produto", "consumo_diario"),
+    "CONSUMO_MARCA": ("id", "calculado_ate"),
+    "TOKENS_REVOGADOS": ("jti", "expira_em", "revogado_em"),
+    "PRODUTOS_EXCLUIDOS": ("id_produto", "versao", "excluido_em"),
+}
+
+# Tabelas lidas pela sincronização (GET /api/sync) -> coluna que desempata
+# as linhas de mesma versão
+CHAVES_ALTERACOES = {
+    "PRODUTOS": "id",
+    "MOVIMENTO_ESTOQUE": "id",
+    "PRODUTOS_EXCLUIDOS": "id_produto",
+}
+
+COLUNAS_USUARIO_LOGIN = ("id", "nome_usuario", "tipo_usuario", "senha_usuario")
+
+# Diretório de usuários (models/diretorio.py): sem o hash da senha
+COLUNAS_USUARIO_DIRETORIO = ("id", "nome_usuario", "tipo_usuario")
+
+
+class ErroIntegridade(Exception):
+    """A operação violaria uma chave estrangeira (ex.: deletar categoria em uso)."""
+
+
+class ErroUnicidade(Exception):
+    """A operação repetiria um valor único (ex.: nome de usuário já cadastrado)."""
+
+
+class Repositorio:
+    """
+    Interface dos repositórios.
+
+    inserir/atualizar/deletar/obter devolvem a lista de linhas afetadas (vazia
+    se o id não existe), como o PostgREST. Regras de negócio violadas nos
+    movimentos de estoque levantam ValueError com a mensagem para o usuário.
+    """
+
+    def listar(self, tabela):
+        raise NotImplementedError
+
+    def obter(self, tabela, id_registro):
+        raise NotImplementedError
+
+    def inserir(self, tabela, dados):
+        """Levanta ErroUnicidade se repete um valor de um índice único."""
+        raise NotImplementedError
+
+    def atualizar(self, tabela, id_registro, dados):
+        raise NotImplementedError
+
+    def deletar(self, tabela, id_registro):
+        """Levanta ErroIntegridade se a linha ainda é referenciada."""
+        raise NotImplementedError
+
+    def buscar_usuario_por_nome(self, nome_usuario):
+        """Usuário (com o hash da senha) ou None."""
+        raise NotImplementedError
+
+    def listar_diretorio_usuarios(self):
+        """Todos os usuários, só com id, nome_usuario e tipo_usuario."""
+        raise NotImplementedError
+
+    def listar_produtos_com_nomes(self):
+        """Produtos com local_nome, fornecedor_nome e categoria_nome."""
+        raise NotImplementedError
+
+    def listar_produtos_pagina(self, limite, apos=None, ordenar_por="id", decrescente=False,
+                               id_categoria=None, id_local=None, id_fornecedor=None,
+                               abaixo_minimo=False):
+        """
+        Até `limite` produtos depois de `apos` = (valor de ordenar_por, id)
+        da última linha da página anterior.
+        """
+        raise NotImplementedError
+
+    def listar_movimentos(self, limite, apos=None, id_produto=None, id_usuario=None,
+                          tipo_movimento=None, inicio=None, fim=None):
+        """
+        Até `limite` movimentos em ordem de (data_movimento, id), depois de
+        `apos` = (data_movimento, id) da última linha da página anterior.
+        inicio/fim são instantes ISO em UTC (fim exclusivo).
+        """
+        raise NotImplementedError
+
+    def saldo_diario(self, id_produto, ate_dia):
+        """
+        Saldo do produto no fim do último dia registrado até `ate_dia`
+        ('AAAA-MM-DD', inclusive): {dia, quantidade} ou None.
+        """
+        raise NotImplementedError
+
+    def resumo_estoque(self, agrupar_por=None):
+        """
+        Somas de RESUMO_ESTOQUE no total (agrupar_por=None) ou por
+        'categoria', 'local' ou 'fornecedor': lista de {grupo, produtos,
+        quantidade, valor_custo, valor_venda, abaixo_minimo}, com grupo
+        None no total.
+        """
+        raise NotImplementedError
+
+    def consolidar_resumo_estoque(self):
+        """
+        Soma ao RESUMO_ESTOQUE as diferenças pendentes (Postgres). Devolve os
+        grupos atualizados, -1 se outra consolidação está em andamento e 0
+        onde o resumo já é atualizado direto (SQLite).
+        """
+        return 0
+
+    def reposicao(self, horizonte):
+        """
+        Atualiza CONSUMO_PRODUTO até ontem e devolve {calculado_ate,
+        produtos}: os produtos no estoque mínimo ou que chegam a ele em até
+        `horizonte` dias, com {id_produto, nome_produto, id_fornecedor,
+        quantidade, estoque_minimo, estoque_maximo, custo_produto_Unit,
+        consumo_diario}.
+        """
+        raise NotImplementedError
+
+    def listar_alertas(self, tipo_alerta=None):
+        """
+        Linhas de ALERTA_ESTOQUE (com nome_produto), em ordem de desde;
+        tipo_alerta 'MINIMO' ou 'MAXIMO' filtra.
+        """
+        raise NotImplementedError
+
+    def revogar_token(self, jti, expira_em):
+        """
+        Grava o jti em TOKENS_REVOGADOS (expira_em: instante ISO em UTC) e
+        apaga as revogações de tokens já expirados.
+        """
+        raise NotImplementedError
+
+    def listar_tokens_revogados(self, desde=None):
+        """
+        {jti, expira_em} dos tokens revogados ainda não expirados; com
+        `desde` (instante ISO em UTC), só os revogados a partir dele.
+        """
+        raise NotImplementedError
+
+    def versao_sincronizacao(self):
+        """
+        Menor versão que uma linha gravada depois desta leitura (ou numa
+        transação ainda em andamento) pode ter (ver createdb.sql).
+        """
+        raise NotImplementedError
+
+    def versao_tabela(self, tabela):
+        """
+        Texto que muda a cada escrita em PRODUTOS (inclusive exclusões) ou em
+        MOVIMENTO_ESTOQUE, por qualquer caminho: vem das versões gravadas
+        pelos gatilhos (ver versao_tabela em createdb.sql).
+        """
+        raise NotImplementedError
+
+    def listar_alteracoes(self, tabela, limite, desde=None, apos=None):
+        """
+        Até `limite` linhas de uma tabela de CHAVES_ALTERACOES com versao >=
+        `desde`, em ordem de (versao, chave), depois de `apos` = (versao,
+        chave) da última linha da página anterior.
+        """
+        raise NotImplementedError
+
+    def movimentar_estoque(self, id_produto, tipo_movimento, quantidade, id_usuario=None):
+        """Aplica o movimento e devolve o produto depois dele (ver createdb.sql)."""
+        raise NotImplementedError
+
+    def movimentar_estoque_lote(self, movimentos, id_usuario=None, tudo_ou_nada=False):
+        """Resultado de cada linha: {linha, sucesso, produto} ou {linha, sucesso, erro}."""
+        raise NotImplementedError
+
+    def metricas(self):
+        """Métricas de conexão próprias do repositório (vazio se não houver)."""
+        return {}
+
+
+# SUPABASE
+
+
+# O PostgREST faz o JOIN com LOCAL_ESTOQUE, FORNECEDOR e CATEGORIA (embedding
+# com spread) e devolve os nomes como colunas do próprio produto.
+SELECT_PRODUTOS_COM_NOMES = (
+    "*, "
+    "...LOCAL_ESTOQUE(local_nome:nome_local), "
+    "...FORNECEDOR(fornecedor_nome:nome_fornecedor), "
+    "...CATEGORIA(categoria_nome:nome_categoria)"
+)
+
+
+def erro_de_negocio(e):
+    """
+    Converte o erro de uma função do banco na exceção a ser levantada.
+
+    P0001 (RAISE EXCEPTION) é violação de regra de negócio e vira ValueError,
+    como nas validações feitas em Python; os demais erros seguem como estão.
+    """
+    if e.code == "P0001":
+        return ValueError(e.message)
+    return e
+
+
+def _valor_postgrest(valor):
+    """
+    Formata um valor para uso dentro de or=(...) do PostgREST: texto entre
+    aspas (vírgulas e parênteses não encerram o filtro) e números finitos.
+    Outros tipos levantam ValueError.
+    """
+    if isinstance(valor, str):
+        escapado = valor.replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escapado}"'
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool) and math.isfinite(valor):
+        return json.dumps(valor)
+    raise ValueError(f"Valor inválido no filtro: {valor!r}")
+
+
+def montar_consulta_produtos_paginada(cliente, limite, apos=None, ordenar_por="id",
+                                      decrescente=False, id_categoria=None, id_local=None,
+                                      id_fornecedor=None, abaixo_minimo=False):
+    """
+    Monta (sem executar) a consulta de uma página de produtos no PostgREST.
+
+    Serve tanto para o cliente síncrono quanto para o assíncrono (db_async).
+    """
+    consulta = cliente.table("PRODUTOS").select("*")
+
+    if id_categoria is not None:
+        consulta = consulta.eq("id_categoria", id_categoria)
+    if id_local is not None:
+        consulta = consulta.eq("id_local", id_local)
+    if id_fornecedor is not None:
+        consulta = consulta.eq("id_fornecedor", id_fornecedor)
+    if abaixo_minimo:
+        consulta = consulta.is_("abaixo_minimo", "true")
+
+    if apos:
+        valor, ultimo_id = apos
+        op = "lt" if decrescente else "gt"
+        if ordenar_por == "id":
+            consulta = consulta.filter("id", op, ultimo_id)
+        else:
+            # Desempate pelo id: (coluna, id) > (valor, ultimo_id)
+            v = _valor_postgrest(valor)
+            consulta = consulta.or_(
+                f"{ordenar_por}.{op}.{v},and({ordenar_por}.eq.{v},id.{op}.{ultimo_id})"
+            )
+
+    consulta = consulta.order(ordenar_por, desc=decrescente)
+    if ordenar_por != "id":
+        consulta = consulta.order("id", desc=decrescente)
+
+    return consulta.limit(limite)
+
+
+class RepositorioSupabase(Repositorio):
+    """Dados no Supabase, via PostgREST (cliente síncrono do supabase-py)."""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def listar(self, tabela):
+        return self.cliente.table(tabela).select("*").execute().data or []
+
+    def obter(self, tabela, id_registro):
+        return (
+            self.cliente.table(tabela).select("*").eq("id", id_registro).limit(1).execute().data
+            or []
+        )
+
+    def inserir(self, tabela, dados):
+        try:
+            return self.cliente.table(tabela).insert(dados).execute().data or []
+        except APIError as e:
+            if e.code == "23505":
+                raise ErroUnicidade(e.message)
+            raise
+
+    def atualizar(self, tabela, id_registro, dados):
+        return self.cliente.table(tabela).update(dados).eq("id", id_registro).execute().data or []
+
+    def deletar(self, tabela, id_registro):
+        try:
+            return self.cliente.table(tabela).delete().eq("id", id_registro).execute().data or []
+        except APIError as e:
+            if e.code == "23503":
+                raise ErroIntegridade(e.message)
+            raise
+
+    def buscar_usuario_por_nome(self, nome_usuario):
+        linhas = (
+            self.cliente.table("USUARIOS")
+            .select(", ".join(COLUNAS_USUARIO_LOGIN))
+            .eq("nome_usuario", nome_usuario)
+            .limit(1)
+            .execute()
+            .data
+        )
+        return linhas[0] if linhas else None
+
+    def listar_diretorio_usuarios(self):
+        return (
+            self.cliente.table("USUARIOS")
+            .select(", ".join(COLUNAS_USUARIO_DIRETORIO))
+            .order("id")
+            .execute()
+            .data
+            or []
+        )
+
+    def listar_produtos_com_nomes(self):
+        return self.cliente.table("PRODUTOS").select(SELECT_PRODUTOS_COM_NOMES).execute().data or []
+
+    def listar_produtos_pagina(self, limite, apos=None, ordenar_por="id", decrescente=False,
+                               id_categoria=None, id_local=None, id_fornecedor=None,
+                               abaixo_minimo=False):
+        consulta = montar_consulta_produtos_paginada(
+            self.cliente, limite, apos, ordenar_por, decrescente,
+            id_categoria, id_local, id_fornecedor, abaixo_minimo,
+        )
+        return consulta.execute().data or []
+
+    def listar_movimentos(self, limite, apos=None, id_produto=None, id_usuario=None,
+                          tipo_movimento=None, inicio=None, fim=None):
+        consulta = self.cliente.table("MOVIMENTO_ESTOQUE").select(", ".join(COLUNAS["MOVIMENTO_ESTOQUE"]))
+        if id_produto is not None:
+            consulta = consulta.eq("id_produto", id_produto)
+        if id_usuario is not None:
+            consulta = consulta.eq("id_usuario", id_usuario)
+        if tipo_movimento is not None:
+            consulta = consulta.eq("tipo_movimento", tipo_movimento)
+        if inicio is not None:
+            consulta = consulta.gte("data_movimento", inicio)
+        if fim is not None:
+            consulta = consulta.lt("data_movimento", fim)
+        if apos:
+            data, ultimo_id = apos
+            v = _valor_postgrest(data)
+            consulta = consulta.or_(
+                f"data_movimento.gt.{v},and(data_movimento.eq.{v},id.gt.{ultimo_id})"
+            )
+        consulta = consulta.order("data_movimento").order("id").limit(limite)
+        return consulta.execute().data or []
+
+    def saldo_diario(self, id_produto, ate_dia):
+        linhas = (
+            self.cliente.table("SALDO_DIARIO")
+            .select("dia, quantidade")
+            .eq("id_produto", id_produto)
+            .lte("dia", ate_dia)
+            .order("dia", desc=True)
+            .limit(1)
+            .execute()
+            .data
+        )
+        return linhas[0] if linhas else None
+
+    def listar_alertas(self, tipo_alerta=None):
+        consulta = self.cliente.table("ALERTA_ESTOQUE").select("*, ...PRODUTOS(nome_produto)")
+        if tipo_alerta is not None:
+            consulta = consulta.eq("tipo_alerta", tipo_alerta)
+        return consulta.order("desde").order("id_produto").execute().data or []
+
+    def revogar_token(self, jti, expira_em):
+        agora = datetime.now(timezone.utc).isoformat()
+        self.cliente.table("TOKENS_REVOGADOS").delete().lt("expira_em", agora).execute()
+        self.cliente.table("TOKENS_REVOGADOS").upsert(
+            {"jti": jti, "expira_em": expira_em}, on_conflict="jti", ignore_duplicates=True
+        ).execute()
+
+    def listar_tokens_revogados(self, desde=None):
+        agora = datetime.now(timezone.utc).isoformat()
+        consulta = self.cliente.table("TOKENS_REVOGADOS").select("jti, expira_em").gt("expira_em", agora)
+        if desde is not None:
+            consulta = consulta.gte("revogado_em", desde)
+        return consulta.execute().data or []
+
+    def versao_sincronizacao(self):
+        return self.cliente.rpc("versao_sincronizacao", {}).execute().data
+
+    def versao_tabela(self, tabela):
+        return self.cliente.rpc("versao_tabela", {"p_tabela": tabela}).execute().data
+
+    def listar_alteracoes(self, tabela, limite, desde=None, apos=None):
+        chave = CHAVES_ALTERACOES[tabela]
+        consulta = self.cliente.table(tabela).select("*")
+        if desde is not None:
+            consulta = consulta.gte("versao", desde)
+        if apos:
+            versao, ultima_chave = apos
+            consulta = consulta.or_(
+                f"versao.gt.{versao},and(versao.eq.{versao},{chave}.gt.{ultima_chave})"
+            )
+        consulta = consulta.order("versao").order(chave).limit(limite)
+        return consulta.execute().data or []
+
+    def resumo_estoque(self, agrupar_por=None):
+        try:
+            return self.cliente.rpc("resumo_estoque", {"p_agrupar_por": agrupar_por}).execute().data or []
+        except APIError as e:
+            raise erro_de_negocio(e)
+
+    def reposicao(self, horizonte):
+        try:
+            return self.cliente.rpc("reposicao", {"p_horizonte": horizonte}).execute().data
+        except APIError as e:
+            raise erro_de_negocio(e)
+
+    def consolidar_resumo_estoque(self):
+        return self.cliente.rpc("consolidar_resumo_estoque", {}).execute().data
+
+    def movimentar_estoque(self, id_produto, tipo_movimento, quantidade, id_usuario=None):
+        try:
+            return self.cliente.rpc("movimentar_estoque", {
+                "p_id_produto": id_produto,
+                "p_tipo_movimento": tipo_movimento,
+                "p_quantidade": quantidade,
+                "p_id_usuario": id_usuario,
+            }).execute().data
+        except APIError as e:
+            raise erro_de_negocio(e)
+
+    def movimentar_estoque_lote(self, movimentos, id_usuario=None, tudo_ou_nada=False):
+        return self.cliente.rpc("movimentar_estoque_lote", {
+            "p_movimentos": movimentos,
+            "p_id_usuario": id_usuario,
+            "p_tudo_ou_nada": tudo_ou_nada,
+        }).execute().data or []
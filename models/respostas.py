@@ -0,0 +1,119 @@
+"""
+Respostas JSON da API: serialização e compressão.
+
+- ProvedorJSON: provedor JSON do Flask (jsonify) que serializa com o
+  orjson, se instalado, direto para bytes; sem ele (ou com
+  codificador="padrao") usa o json da biblioteca padrão. A saída é a mesma
+  nos dois: chaves em ordem, sem espaços, UTF-8 sem escapes \\uXXXX e datas
+  no formato do Flask.
+- comprimir: gzip, ou brotli (requer o pacote brotli) quando o cliente
+  prefere, para corpos a partir de um tamanho mínimo. Abaixo dele os bytes
+  economizados não pagam a CPU gasta.
+"""
+
+import gzip
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CODIFICADORES = ("auto", "orjson", "padrao")
+
+# Em ordem de preferência do servidor, quando o cliente aceita as duas com
+# o mesmo peso
+CODIFICACOES = ("br", "gzip") if brotli is not None else ("gzip",)
+
+MINIMO_COMPRESSAO = 1024
+NIVEL_GZIP = 6
+# 4 comprime melhor que o gzip 6 em tempo parecido; 11 é para arquivos estáticos
+QUALIDADE_BROTLI = 4
+
+
+def _carregar_orjson(codificador):
+    if codificador not in CODIFICADORES:
+        raise ValueError(f"Codificador JSON inválido: {codificador}. Use: {', '.join(CODIFICADORES)}")
+    if codificador == "padrao":
+        return None
+    try:
+        import orjson
+    except ImportError:
+        if codificador == "orjson":
+            raise
+        return None
+    return orjson
+
+
+class ProvedorJSON(DefaultJSONProvider):
+    ensure_ascii = False
+
+    def __init__(self, app, codificador="auto"):
+        super().__init__(app)
+        self._orjson = _carregar_orjson(codificador)
+        self.codificador = "orjson" if self._orjson is not None else "padrao"
+        if self._orjson is not None:
+            # Datas vão para default(), como no json padrão do Flask
+            self._opcoes = (
+                self._orjson.OPT_SORT_KEYS
+                | self._orjson.OPT_NON_STR_KEYS
+                | self._orjson.OPT_PASSTHROUGH_DATETIME
+            )
+
+    def serializar(self, obj, indentar=False):
+        """obj em JSON (bytes UTF-8)."""
+        if self._orjson is None:
+            texto = json.dumps(
+                obj,
+                default=self.default,
+                ensure_ascii=False,
+                sort_keys=self.sort_keys,
+                indent=2 if indentar else None,
+                separators=None if indentar else (",", ":"),
+            )
+            return texto.encode("utf-8")
+        opcoes = self._opcoes | (self._orjson.OPT_INDENT_2 if indentar else 0)
+        return self._orjson.dumps(obj, default=self.default, option=opcoes)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.serializar(obj, indentar) + b"\n", mimetype=self.mimetype)
+
+
+def comprimir(resposta, aceitas, minimo=MINIMO_COMPRESSAO, nivel_gzip=NIVEL_GZIP,
+              qualidade_brotli=QUALIDADE_BROTLI):
+    """
+    Comprime o corpo da resposta (no próprio objeto) com a codificação de
+    CODIFICACOES que o cliente prefere (`aceitas`: request.accept_encodings).
+
+    Respostas em streaming, já codificadas, sem corpo ou com menos de
+    `minimo` bytes saem como estão.
+    """
+    if resposta.direct_passthrough or resposta.is_streamed or "Content-Encoding" in resposta.headers:
+        return resposta
+    # O corpo depende do Accept-Encoding, inclusive quando sai sem compressão
+    resposta.vary.add("Accept-Encoding")
+    if resposta.status_code < 200 or resposta.status_code in (204, 304):
+        return resposta
+
+    codificacao = aceitas.best_match(CODIFICACOES)
+    if codificacao is None or (resposta.content_length or 0) < minimo:
+        return resposta
+
+    corpo = resposta.get_data()
+    if codificacao == "br":
+        corpo = brotli.compress(corpo, quality=qualidade_brotli)
+    else:
+        corpo = gzip.compress(corpo, compresslevel=nivel_gzip, mtime=0)
+    resposta.set_data(corpo)
+    resposta.headers["Content-Encoding"] = codificacao
+
+    # Uma ETag forte vale só para os mesmos bytes; a fraca (listagens) vale
+    # para o corpo com ou sem compressão
+    etag, fraca = resposta.get_etag()
+    if etag and not fraca:
+        resposta.set_etag(etag, weak=True)
+    return resposta
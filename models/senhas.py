@@ -0,0 +1,125 @@
+"""
+Hash e verificação de senhas (bcrypt) fora da thread da requisição.
+
+O bcrypt é lento de propósito: cada verificação ocupa um núcleo por dezenas
+a centenas de milissegundos. Num pico de logins (início de turno), rodar
+todas ao mesmo tempo nas threads das requisições disputa a CPU com o resto
+do worker. Aqui as contas rodam num pool com no máximo `max_simultaneas`
+threads; quem espera na fila mais que `timeout_fila` segundos recebe
+SenhasOcupadas (a API responde 503) em vez de ficar preso.
+
+O custo (work factor) dos hashes novos é configurável. Um hash gravado com
+outro custo é refeito no login seguinte, em segundo plano, depois de a senha
+ser conferida (a senha em texto só existe na memória, nunca vai para a fila
+durável de models/tarefas.py).
+"""
+
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+
+logger = logging.getLogger("estoque.senhas")
+
+CUSTO_PADRAO = 12
+
+
+class SenhasOcupadas(Exception):
+    """Fila de verificação de senhas cheia por mais que o timeout."""
+
+
+def custo_do_hash(hash_senha):
+    """Custo gravado num hash bcrypt ($2b$12$...), ou None se não for bcrypt."""
+    partes = hash_senha.split("$")
+    if len(partes) < 4 or not partes[2].isdigit():
+        return None
+    return int(partes[2])
+
+
+class VerificadorSenhas:
+    """
+    Pool limitado para as contas do bcrypt.
+
+    O pool é criado na primeira conta de cada processo, então funciona
+    também nos workers criados por fork.
+    """
+
+    def __init__(self, custo=CUSTO_PADRAO, max_simultaneas=None, timeout_fila=5.0):
+        if not 4 <= custo <= 31:
+            raise ValueError("Custo do bcrypt deve estar entre 4 e 31")
+        self.custo = custo
+        self.max_simultaneas = max_simultaneas or os.cpu_count() or 2
+        self.timeout_fila = timeout_fila
+        self._lock = threading.Lock()
+        self._pool = None
+        self._pid = None
+        self.verificacoes = 0
+        self.recusadas = 0
+        self.rehashes = 0
+
+    def _executor(self):
+        if self._pool is None or self._pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(self.max_simultaneas, thread_name_prefix="bcrypt")
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _executar(self, funcao, *args):
+        futuro = self._executor().submit(funcao, *args)
+        try:
+            return futuro.result(timeout=self.timeout_fila)
+        except TimeoutError:
+            # Ainda na fila: desiste. Já rodando: falta pouco, espera terminar.
+            if futuro.cancel():
+                with self._lock:
+                    self.recusadas += 1
+                raise SenhasOcupadas("Muitos logins ao mesmo tempo. Tente novamente em instantes.")
+            return futuro.result()
+
+    def gerar_hash(self, senha):
+        """Hash bcrypt (texto) da senha, com o custo configurado."""
+        return self._executar(self._hash, senha)
+
+    def _hash(self, senha):
+        return bcrypt.hashpw(senha.encode("utf-8"), bcrypt.gensalt(rounds=self.custo)).decode("utf-8")
+
+    def verificar(self, senha, hash_senha, ao_refazer=None):
+        """
+        Confere a senha com o hash gravado.
+
+        Args:
+            ao_refazer: Função chamada com o hash novo quando a senha confere
+                mas o hash foi gravado com outro custo. Roda em segundo plano,
+                depois desta função voltar.
+        """
+        confere = self._executar(bcrypt.checkpw, senha.encode("utf-8"), hash_senha.encode("utf-8"))
+        with self._lock:
+            self.verificacoes += 1
+        if confere and ao_refazer is not None and custo_do_hash(hash_senha) != self.custo:
+            self._executor().submit(self._refazer, senha, ao_refazer)
+        return confere
+
+    def _refazer(self, senha, ao_refazer):
+        try:
+            ao_refazer(self._hash(senha))
+        except Exception:
+            logger.exception("Erro ao refazer o hash de uma senha")
+            return
+        with self._lock:
+            self.rehashes += 1
+
+    def estatisticas(self):
+        with self._lock:
+            fila = self._pool._work_queue.qsize() if self._pool is not None and self._pid == os.getpid() else 0
+            return {
+                "custo": self.custo,
+                "max_simultaneas": self.max_simultaneas,
+                "timeout_fila": self.timeout_fila,
+                "na_fila": fila,
+                "verificacoes": self.verificacoes,
+                "recusadas": self.recusadas,
+                "rehashes": self.rehashes,
+            }
@@ -0,0 +1,308 @@
+"""
+Fila durável de tarefas em segundo plano (efeitos colaterais dos movimentos).
+
+O movimento em si (PRODUTOS e MOVIMENTO_ESTOQUE) é gravado na mesma
+transação, no banco; o que pode esperar alguns segundos (entrega de alertas,
+consolidação do resumo dos relatórios) vira uma tarefa num arquivo SQLite
+local e a requisição volta sem esperar por ela.
+
+- Durável: a tarefa está no arquivo antes de enfileirar() voltar, e sobrevive
+  a um reinício do processo.
+- Pelo menos uma vez: uma tarefa só sai da fila quando o tratador termina sem
+  erro. A tarefa em execução fica reservada por `prazo_execucao` segundos; se
+  o processo morrer no meio, outra thread a pega de novo depois desse prazo.
+  Por isso os tratadores precisam tolerar repetição.
+- Novas tentativas: tratador com erro tenta de novo com espera exponencial
+  (com variação aleatória), até `max_tentativas`; depois a tarefa fica como
+  'falhou' até ser reprocessada (reprocessar_falhas).
+- Chave de idempotência: enfileirar() com uma chave que já está no arquivo
+  (pendente, em execução ou concluída há menos de `retencao` segundos) não
+  cria outra tarefa. A chave chega ao tratador, que pode repassá-la.
+
+Todos os workers da mesma máquina usam o mesmo arquivo; as threads de
+execução de cada processo são criadas na primeira tarefa enfileirada (ou em
+iniciar()), então funcionam também nos workers criados por fork.
+"""
+
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger("estoque.tarefas")
+
+ESTADOS = ("pendente", "executando", "concluida", "falhou")
+
+
+class FilaTarefas:
+    """
+    Fila de tarefas num arquivo SQLite (modo WAL).
+
+    Cada tipo de tarefa tem um tratador, registrado com registrar(); o
+    tratador recebe a tarefa ({id, tipo, chave, dados, tentativas}) e
+    termina normalmente ou levanta exceção para tentar de novo.
+    """
+
+    def __init__(self, caminho, trabalhadores=2, max_tentativas=8, espera_inicial=1.0,
+                 espera_maxima=300.0, prazo_execucao=60.0, retencao=86400):
+        self.caminho = caminho
+        self.trabalhadores = trabalhadores
+        self.max_tentativas = max_tentativas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.prazo_execucao = prazo_execucao
+        self.retencao = retencao
+        self._tratadores = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._threads = []
+        self._pid = None
+        self._ultima_limpeza = 0.0
+        self.enfileiradas = 0
+        self.repetidas = 0
+        self.executadas = 0
+        self.erros = 0
+        self.desistidas = 0
+
+        with self._conexao() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tarefas ("
+                " id INTEGER PRIMARY KEY,"
+                " tipo TEXT NOT NULL,"
+                " chave TEXT,"
+                " dados TEXT NOT NULL,"
+                " estado TEXT NOT NULL DEFAULT 'pendente',"
+                " tentativas INTEGER NOT NULL DEFAULT 0,"
+                " criada_em REAL NOT NULL,"
+                # Pendente: quando pode rodar; executando: fim da reserva
+                " executar_em REAL NOT NULL,"
+                " concluida_em REAL,"
+                " erro TEXT)"
+            )
+            conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS tarefas_chave ON tarefas (chave) WHERE chave IS NOT NULL")
+            conn.execute("CREATE INDEX IF NOT EXISTS tarefas_fila ON tarefas (estado, executar_em)")
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.caminho, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def registrar(self, tipo, tratador):
+        """Define a função que executa as tarefas do tipo `tipo`."""
+        self._tratadores[tipo] = tratador
+
+    def iniciar(self):
+        """Cria as threads de execução deste processo (se ainda não existem)."""
+        if self._threads and self._pid == os.getpid():
+            return
+        with self._lock:
+            if not self._threads or self._pid != os.getpid():
+                self._acordar = threading.Event()
+                self._threads = [
+                    threading.Thread(target=self._trabalhar, name=f"tarefas-{i}", daemon=True)
+                    for i in range(self.trabalhadores)
+                ]
+                for thread in self._threads:
+                    thread.start()
+                self._pid = os.getpid()
+
+    def enfileirar(self, tipo, dados, chave=None, atraso=0):
+        """
+        Grava a tarefa para execução em segundo plano.
+
+        Args:
+            dados: Serializável em JSON
+            chave: Chave de idempotência (None = sempre enfileira)
+            atraso: Segundos até a tarefa poder rodar
+
+        Returns:
+            False se já existia uma tarefa com a mesma chave.
+        """
+        self.iniciar()
+        agora = time.time()
+        with self._conexao() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO tarefas (tipo, chave, dados, criada_em, executar_em) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (tipo, chave, json.dumps(dados), agora, agora + atraso),
+            )
+        nova = cursor.rowcount == 1
+        with self._lock:
+            if nova:
+                self.enfileiradas += 1
+            else:
+                self.repetidas += 1
+        if nova and not atraso:
+            self._acordar.set()
+        return nova
+
+    def _reservar(self):
+        agora = time.time()
+        with self._conexao() as conn:
+            # Um só UPDATE: duas threads (ou processos) nunca pegam a mesma
+            # tarefa. Tarefa 'executando' com a reserva vencida volta a rodar.
+            linha = conn.execute(
+                "UPDATE tarefas SET estado = 'executando', tentativas = tentativas + 1,"
+                " executar_em = ? "
+                "WHERE id = ("
+                "  SELECT id FROM tarefas"
+                "  WHERE estado IN ('pendente', 'executando') AND executar_em <= ?"
+                "  ORDER BY executar_em, id LIMIT 1"
+                ") RETURNING id, tipo, chave, dados, tentativas",
+                (agora + self.prazo_execucao, agora),
+            ).fetchall()
+        if not linha:
+            return None
+        linha = linha[0]
+        return {
+            "id": linha[0],
+            "tipo": linha[1],
+            "chave": linha[2],
+            "dados": json.loads(linha[3]),
+            "tentativas": linha[4],
+        }
+
+    def _espera(self, tentativas):
+        """Espera exponencial até a próxima tentativa, entre 50% e 100% do valor cheio."""
+        espera = min(self.espera_maxima, self.espera_inicial * 2 ** (tentativas - 1))
+        return espera * random.uniform(0.5, 1.0)
+
+    def _executar(self, tarefa):
+        try:
+            tratador = self._tratadores.get(tarefa["tipo"])
+            if tratador is None:
+                raise LookupError(f"Tarefa sem tratador: {tarefa['tipo']}")
+            tratador(tarefa)
+        except Exception as e:
+            self._falhar(tarefa, e)
+            return
+
+        with self._conexao() as conn:
+            conn.execute(
+                "UPDATE tarefas SET estado = 'concluida', concluida_em = ?, erro = NULL WHERE id = ?",
+                (time.time(), tarefa["id"]),
+            )
+        with self._lock:
+            self.executadas += 1
+
+    def _falhar(self, tarefa, erro):
+        desistir = tarefa["tentativas"] >= self.max_tentativas
+        with self._conexao() as conn:
+            conn.execute(
+                "UPDATE tarefas SET estado = ?, executar_em = ?, erro = ? WHERE id = ?",
+                (
+                    "falhou" if desistir else "pendente",
+                    time.time() + (0 if desistir else self._espera(tarefa["tentativas"])),
+                    f"{type(erro).__name__}: {erro}",
+                    tarefa["id"],
+                ),
+            )
+        with self._lock:
+            self.erros += 1
+            if desistir:
+                self.desistidas += 1
+        if desistir:
+            logger.error(
+                "Tarefa %s (%s) falhou %d vezes; desistindo: %s",
+                tarefa["id"], tarefa["tipo"], tarefa["tentativas"], erro,
+            )
+        else:
+            logger.warning(
+                "Tarefa %s (%s) falhou na tentativa %d: %s",
+                tarefa["id"], tarefa["tipo"], tarefa["tentativas"], erro,
+            )
+
+    def _limpar(self):
+        """Apaga as concluídas há mais de `retencao` segundos (libera as chaves)."""
+        agora = time.time()
+        if agora - self._ultima_limpeza < 60:
+            return
+        self._ultima_limpeza = agora
+        with self._conexao() as conn:
+            conn.execute(
+                "DELETE FROM tarefas WHERE estado = 'concluida' AND concluida_em < ?",
+                (agora - self.retencao,),
+            )
+
+    def _trabalhar(self):
+        while True:
+            try:
+                tarefa = self._reservar()
+                if tarefa is None:
+                    self._limpar()
+                    # Tarefas de outros processos e novas tentativas chegam
+                    # sem aviso: confere o arquivo pelo menos a cada segundo
+                    self._acordar.wait(1.0)
+                    self._acordar.clear()
+                    continue
+                self._executar(tarefa)
+            except Exception:
+                logger.exception("Erro na fila de tarefas")
+                time.sleep(1.0)
+
+    def aguardar(self, timeout=30.0):
+        """
+        Espera até não haver tarefa pronta para rodar nem em execução
+        (as que aguardam nova tentativa não contam). Devolve False no timeout.
+        """
+        limite = time.monotonic() + timeout
+        while time.monotonic() < limite:
+            restantes = self._conexao().execute(
+                "SELECT COUNT(*) FROM tarefas "
+                "WHERE estado = 'executando' OR (estado = 'pendente' AND executar_em <= ?)",
+                (time.time(),),
+            ).fetchone()[0]
+            if not restantes:
+                return True
+            time.sleep(0.05)
+        return False
+
+    def reprocessar_falhas(self, tipo=None):
+        """Devolve à fila as tarefas que esgotaram as tentativas. Retorna quantas."""
+        with self._conexao() as conn:
+            cursor = conn.execute(
+                "UPDATE tarefas SET estado = 'pendente', tentativas = 0, executar_em = ? "
+                "WHERE estado = 'falhou' AND (? IS NULL OR tipo = ?)",
+                (time.time(), tipo, tipo),
+            )
+        self._acordar.set()
+        return cursor.rowcount
+
+    def estatisticas(self):
+        """
+        Profundidade da fila (por estado e por tipo), atraso da tarefa pronta
+        mais antiga e contadores deste processo.
+        """
+        agora = time.time()
+        conn = self._conexao()
+        por_estado = dict.fromkeys(ESTADOS, 0)
+        por_estado.update(conn.execute("SELECT estado, COUNT(*) FROM tarefas GROUP BY estado").fetchall())
+        pendentes_por_tipo = dict(conn.execute(
+            "SELECT tipo, COUNT(*) FROM tarefas WHERE estado IN ('pendente', 'executando') GROUP BY tipo"
+        ).fetchall())
+        mais_antiga = conn.execute(
+            "SELECT MIN(executar_em) FROM tarefas WHERE estado = 'pendente' AND executar_em <= ?",
+            (agora,),
+        ).fetchone()[0]
+
+        with self._lock:
+            return {
+                "trabalhadores": self.trabalhadores,
+                "por_estado": por_estado,
+                "pendentes_por_tipo": pendentes_por_tipo,
+                "atraso_segundos": round(agora - mais_antiga, 3) if mais_antiga is not None else 0.0,
+                "enfileiradas": self.enfileiradas,
+                "repetidas": self.repetidas,
+                "executadas": self.executadas,
+                "erros": self.erros,
+                "desistidas": self.desistidas,
+            }
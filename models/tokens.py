@@ -0,0 +1,176 @@
+"""
+Tokens JWT: cache dos tokens já verificados e lista de tokens revogados.
+
+- CacheTokens: LRU (limitado) do token (texto) para as claims já
+  verificadas. Uma requisição com um token visto há pouco não refaz a
+  verificação da assinatura nem o parse do JSON; a entrada só vale até o
+  `exp` do próprio token.
+- RevogacaoTokens: os jti revogados (logout) ainda não expirados, num dict
+  em memória: a conferência a cada requisição é uma busca O(1), sem ir ao
+  banco. A lista durável fica na tabela TOKENS_REVOGADOS; cada processo
+  relê dela só as revogações recentes, no máximo a cada `intervalo`
+  segundos, então um logout feito em outro worker vale aqui em até
+  `intervalo` segundos (no próprio worker, na hora).
+
+Os dois são do processo: nada aqui é compartilhado entre workers além da
+tabela.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+logger = logging.getLogger("estoque.tokens")
+
+
+def _epoch(valor):
+    """datetime (Postgres) ou texto ISO (SQLite/Supabase) -> segundos desde 1970."""
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    return valor.timestamp()
+
+
+class CacheTokens:
+    def __init__(self, max_itens=10000):
+        self.max_itens = max_itens
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, token):
+        """(claims, cabeçalho) do token, se verificado antes e ainda não expirado."""
+        agora = time.time()
+        with self._lock:
+            item = self._itens.get(token)
+            if item is None:
+                self.falhas += 1
+                return None
+            if item[0] <= agora:
+                del self._itens[token]
+                self.falhas += 1
+                return None
+            self._itens.move_to_end(token)
+            self.acertos += 1
+            return item[1]
+
+    def gravar(self, token, dados, cabecalho):
+        # Token sem exp: não guarda (teria de ser verificado para sempre)
+        if "exp" not in dados:
+            return
+        with self._lock:
+            self._itens[token] = (dados["exp"], (dados, cabecalho))
+            self._itens.move_to_end(token)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+
+    def remover_jti(self, jti):
+        """Descarta as entradas de um token revogado."""
+        with self._lock:
+            for token in [t for t, (_, (dados, _)) in self._itens.items() if dados.get("jti") == jti]:
+                del self._itens[token]
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                "itens": len(self._itens),
+                "max_itens": self.max_itens,
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / total, 4) if total else 0.0,
+            }
+
+
+class RevogacaoTokens:
+    """
+    jti revogados -> exp, sincronizado com TOKENS_REVOGADOS.
+
+    carregar(desde) devolve as linhas {jti, expira_em} ainda não expiradas,
+    revogadas a partir de `desde` (texto ISO em UTC; None = todas).
+    """
+
+    # Releitura com folga: uma revogação gravada numa transação que terminou
+    # depois da última leitura, mas com revogado_em anterior a ela, ainda é vista
+    FOLGA_SINCRONIZACAO = 60
+
+    def __init__(self, carregar, intervalo=2.0):
+        self._carregar = carregar
+        self.intervalo = intervalo
+        self._revogados = {}
+        self._lock = threading.Lock()
+        self._proxima = 0.0
+        self._ultima_leitura = None
+        self._agendada = False
+        self.sincronizacoes = 0
+
+    def _sincronizar(self):
+        # Uma thread sincroniza; as outras seguem com a lista atual
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() < self._proxima:
+                return
+            inicio = time.time()
+            desde = None
+            if self._ultima_leitura is not None:
+                desde = datetime.fromtimestamp(self._ultima_leitura - self.FOLGA_SINCRONIZACAO, timezone.utc)
+                desde = desde.isoformat(timespec="microseconds")
+            try:
+                linhas = self._carregar(desde)
+            except Exception:
+                logger.exception("Erro ao ler os tokens revogados")
+                self._proxima = time.monotonic() + self.intervalo
+                return
+
+            revogados = {j: exp for j, exp in self._revogados.items() if exp > inicio}
+            for linha in linhas:
+                revogados[linha["jti"]] = _epoch(linha["expira_em"])
+            self._revogados = revogados
+            self._ultima_leitura = inicio
+            self._proxima = time.monotonic() + self.intervalo
+            self.sincronizacoes += 1
+        finally:
+            self._lock.release()
+
+    def _sincronizar_em_segundo_plano(self):
+        try:
+            self._sincronizar()
+        finally:
+            self._agendada = False
+
+    def contem(self, jti):
+        if time.monotonic() >= self._proxima:
+            if self._ultima_leitura is None:
+                # Sem nenhuma leitura ainda, a lista vazia deixaria passar
+                # qualquer token revogado: a primeira espera o banco
+                self._sincronizar()
+            elif not self._agendada:
+                # As releituras seguintes não seguram a requisição: até
+                # terminarem, vale a lista atual
+                self._agendada = True
+                threading.Thread(target=self._sincronizar_em_segundo_plano, daemon=True).start()
+        return jti in self._revogados
+
+    def adicionar(self, jti, exp):
+        """Vale na hora neste processo (a gravação na tabela é de quem chama)."""
+        with self._lock:
+            revogados = dict(self._revogados)
+            revogados[jti] = exp
+            self._revogados = revogados
+
+    def invalidar(self):
+        """Relê a lista inteira na próxima conferência (ex.: trocou o banco)."""
+        with self._lock:
+            self._revogados = {}
+            self._ultima_leitura = None
+            self._proxima = 0.0
+
+    def estatisticas(self):
+        return {
+            "revogados": len(self._revogados),
+            "intervalo_sincronizacao": self.intervalo,
+            "sincronizacoes": self.sincronizacoes,
+        }
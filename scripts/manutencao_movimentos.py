@@ -0,0 +1,63 @@
+"""
+Manutenção diária de MOVIMENTO_ESTOQUE (tabela particionada por mês).
+
+Uso:
+    python scripts/manutencao_movimentos.py postgresql://... --pasta /dados/arquivo-movimentos
+    python scripts/manutencao_movimentos.py --so-particoes postgresql://...
+
+1. Cria as partições do mês atual e dos próximos (--meses-a-frente).
+2. Exporta os meses com mais de --meses-quentes meses para a pasta do arquivo
+   (CSV.gz ou, com --formato parquet e o pacote pyarrow, Parquet) e remove
+   essas partições do banco. A API lê esses meses de volta quando a variável
+   ARQUIVO_MOVIMENTOS aponta para a mesma pasta.
+
+Agende uma vez por dia (cron). Requer o pacote psycopg (3.x) e a migração
+migrations/0003_movimento_particionado.sql aplicada.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg  # noqa: E402
+
+from models.arquivo_movimentos import FORMATOS, arquivar_particoes_frias  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Partições e arquivo de MOVIMENTO_ESTOQUE.")
+    parser.add_argument("url", nargs="?", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--pasta", default=os.environ.get("ARQUIVO_MOVIMENTOS"),
+                        help="pasta do arquivo (padrão: $ARQUIVO_MOVIMENTOS)")
+    parser.add_argument("--meses-quentes", type=int, default=12,
+                        help="meses mantidos no banco, além do atual (padrão: 12)")
+    parser.add_argument("--meses-a-frente", type=int, default=3,
+                        help="partições futuras criadas com antecedência (padrão: 3)")
+    parser.add_argument("--formato", choices=FORMATOS, default="csv.gz")
+    parser.add_argument("--so-particoes", action="store_true", help="não arquiva nada")
+    args = parser.parse_args()
+
+    if not args.url:
+        parser.error("informe a URL do banco ou defina DATABASE_URL")
+
+    with psycopg.connect(args.url) as conn:
+        conn.execute("SELECT public.garantir_particoes_movimento(%s)", (args.meses_a_frente,))
+    print(f"Partições garantidas até {args.meses_a_frente} meses à frente.")
+
+    if args.so_particoes:
+        return 0
+    if not args.pasta:
+        parser.error("informe --pasta ou defina ARQUIVO_MOVIMENTOS (ou use --so-particoes)")
+
+    arquivados = arquivar_particoes_frias(args.url, args.pasta, args.meses_quentes, args.formato)
+    for mes, linhas in arquivados:
+        print(f"arquivado: {mes} ({linhas} movimentos)")
+    if not arquivados:
+        print("Nenhum mês para arquivar.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
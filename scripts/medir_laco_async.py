@@ -0,0 +1,145 @@
+"""
+Mede quanto as views async de um worker esperam umas pelas outras no laço
+de eventos do db_async quando o cache é compartilhado (SQLite ou Redis).
+
+Uso:
+    python scripts/medir_laco_async.py
+    python scripts/medir_laco_async.py --threads 16 --latencia-backend 1
+
+Cada requisição simulada faz o que GET /api/categorias faz com o Supabase:
+lê a lista pelo cache de referência, cujo carregamento espera o PostgREST
+(--latencia-banco, com asyncio.sleep), e pega a ETag guardada com ela.
+--threads threads, como as do servidor, mandam as requisições para o laço.
+O backend é um SQLite temporário com --latencia-backend ms de espera por
+chamada, no lugar da ida e volta até o Redis.
+
+Dois modos:
+- no laço: as chamadas ao backend feitas direto na corrotina, que trava o
+  laço enquanto espera (como era antes);
+- em thread: CacheTTL.obter_async (atual).
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import db, db_async  # noqa: E402
+from models.cache import BackendSQLite, CacheTTL  # noqa: E402
+
+TABELA = "CATEGORIA"
+LISTA = [{"id": i, "nome_categoria": f"Categoria {i}"} for i in range(50)]
+
+
+class BackendComLatencia(BackendSQLite):
+    """BackendSQLite que espera `latencia` segundos a cada chamada."""
+
+    def __init__(self, caminho, latencia):
+        super().__init__(caminho)
+        self.latencia = latencia
+
+    def _esperar(self, funcao, *args):
+        time.sleep(self.latencia)
+        return funcao(*args)
+
+    def obter(self, chave):
+        return self._esperar(super().obter, chave)
+
+    def gravar(self, chave, valor, ttl):
+        return self._esperar(super().gravar, chave, valor, ttl)
+
+    def remover(self, chave):
+        return self._esperar(super().remover, chave)
+
+    def incrementar(self, chave):
+        return self._esperar(super().incrementar, chave)
+
+    def ler_contador(self, chave):
+        return self._esperar(super().ler_contador, chave)
+
+
+async def _obter_no_laco(cache, chave, carregar):
+    """CacheTTL.obter_async com o backend chamado direto na corrotina."""
+    geracao = cache.backend.ler_contador(cache._chave_geracao(chave))
+    valor = cache.backend.obter(cache._chave_valor(chave, geracao))
+    if valor is None:
+        valor = await carregar()
+        cache.backend.gravar(cache._chave_valor(chave, geracao), valor, cache.ttl)
+    return valor
+
+
+def requisicao(modo, latencia_banco):
+    async def carregar():
+        await asyncio.sleep(latencia_banco)
+        return db._item_referencia(LISTA)
+
+    async def no_laco():
+        item = await _obter_no_laco(db.cache_referencia, TABELA, carregar)
+        return item["versao"], item["dados"]
+
+    async def em_thread():
+        item = await db.cache_referencia.obter_async(TABELA, carregar)
+        return item["versao"], item["dados"]
+
+    return no_laco() if modo == "no laço" else em_thread()
+
+
+def medir(modo, threads, por_thread, latencia_banco):
+    tempos = []
+    trava = threading.Lock()
+    largada = threading.Barrier(threads + 1)
+
+    def cliente():
+        largada.wait()
+        for _ in range(por_thread):
+            inicio = time.perf_counter()
+            db_async.executar(requisicao(modo, latencia_banco))
+            with trava:
+                tempos.append((time.perf_counter() - inicio) * 1000)
+
+    lista = [threading.Thread(target=cliente) for _ in range(threads)]
+    for thread in lista:
+        thread.start()
+    largada.wait()
+    inicio = time.perf_counter()
+    for thread in lista:
+        thread.join()
+    total = time.perf_counter() - inicio
+
+    tempos.sort()
+    return len(tempos) / total, statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Laço do db_async com cache compartilhado.")
+    parser.add_argument("--threads", type=int, default=8, help="threads do servidor (padrão: 8)")
+    parser.add_argument("--requisicoes", type=int, default=200, help="requisições por thread (padrão: 200)")
+    parser.add_argument("--latencia-backend", type=float, default=0.5,
+                        help="ms de espera por chamada ao backend do cache (padrão: 0.5)")
+    parser.add_argument("--latencia-banco", type=float, default=5,
+                        help="ms do carregamento assíncrono da lista (padrão: 5)")
+    args = parser.parse_args()
+
+    db_async.iniciar(max_threads=args.threads)
+    with tempfile.TemporaryDirectory() as pasta:
+        backend = BackendComLatencia(os.path.join(pasta, "cache.db"), args.latencia_backend / 1000)
+        db.cache_referencia = CacheTTL(backend=backend, prefixo="referencia")
+
+        print(f"{args.threads} threads x {args.requisicoes} requisições, "
+              f"backend {args.latencia_backend} ms por chamada\n")
+        print(f"{'modo':<12}{'req/s':>10}{'mediana (ms)':>15}{'p95 (ms)':>11}")
+        for modo in ("no laço", "em thread"):
+            db.cache_referencia.invalidar(TABELA)
+            vazao, mediana, p95 = medir(modo, args.threads, args.requisicoes, args.latencia_banco / 1000)
+            print(f"{modo:<12}{vazao:>10.0f}{mediana:>15.2f}{p95:>11.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Mede um pico de logins num worker: o bcrypt rodando direto nas threads das
+requisições (como antes) contra o pool limitado de models/senhas.py.
+
+Uso:
+    python scripts/medir_senhas.py
+    python scripts/medir_senhas.py --logins 400 --custo 12 --threads 64 --max-simultaneas 4
+
+--threads threads (as do servidor) fazem --logins verificações de senha ao
+mesmo tempo. Enquanto isso, uma requisição leve (serializar uma lista de
+produtos em JSON) roda a cada 10 ms, no papel do resto do worker. Para cada
+modo imprime a duração do pico, a latência dos logins (mediana e p99), os
+recusados com 503 (SenhasOcupadas) e a latência da requisição leve.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+
+from models.senhas import SenhasOcupadas, VerificadorSenhas  # noqa: E402
+
+SENHA = "senha-do-turno"
+PRODUTOS = [{"id": i, "nome_produto": f"Produto {i}", "quantidade": i % 100} for i in range(2000)]
+
+
+def percentil(valores, p):
+    valores = sorted(valores)
+    return valores[max(0, int(len(valores) * p) - 1)] if valores else 0.0
+
+
+def requisicoes_leves(parar, tempos):
+    while not parar.is_set():
+        inicio = time.perf_counter()
+        json.dumps(PRODUTOS)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        time.sleep(0.01)
+
+
+def medir(verificar, logins, threads):
+    """(segundos do pico, latências dos logins em ms, recusados, latências da requisição leve)."""
+    latencias, recusados, leves = [], [0], []
+    trava = threading.Lock()
+
+    def login(_):
+        inicio = time.perf_counter()
+        try:
+            verificar()
+        except SenhasOcupadas:
+            with trava:
+                recusados[0] += 1
+            return
+        with trava:
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    parar = threading.Event()
+    sonda = threading.Thread(target=requisicoes_leves, args=(parar, leves))
+    sonda.start()
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(threads) as servidor:
+        list(servidor.map(login, range(logins)))
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    sonda.join()
+    return duracao, latencias, recusados[0], leves
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de logins: bcrypt direto x pool limitado.")
+    parser.add_argument("--logins", type=int, default=200, help="verificações no pico (padrão: 200)")
+    parser.add_argument("--custo", type=int, default=10, help="custo do bcrypt (padrão: 10)")
+    parser.add_argument("--threads", type=int, default=64, help="threads do servidor (padrão: 64)")
+    parser.add_argument("--max-simultaneas", type=int, default=None,
+                        help="limite do pool (padrão: núcleos da máquina)")
+    parser.add_argument("--timeout-fila", type=float, default=5.0, help="espera máxima na fila (padrão: 5)")
+    args = parser.parse_args()
+
+    hash_senha = bcrypt.hashpw(SENHA.encode(), bcrypt.gensalt(rounds=args.custo))
+    # Linha de base da requisição leve, sem pico
+    base = []
+    parar = threading.Event()
+    threading.Timer(1.0, parar.set).start()
+    requisicoes_leves(parar, base)
+
+    verificador = VerificadorSenhas(args.custo, args.max_simultaneas, args.timeout_fila)
+    modos = {
+        "direto": lambda: bcrypt.checkpw(SENHA.encode(), hash_senha),
+        "pool": lambda: verificador.verificar(SENHA, hash_senha.decode()),
+    }
+
+    print(f"{args.logins} logins, custo {args.custo}, {args.threads} threads, "
+          f"pool de {verificador.max_simultaneas}, fila até {args.timeout_fila} s, {os.cpu_count()} núcleos")
+    print(f"requisição leve sem pico: mediana {statistics.median(base):.2f} ms\n")
+    print(f"{'modo':<8}{'pico (s)':>9}{'login med (ms)':>16}{'login p99 (ms)':>16}"
+          f"{'503':>6}{'leve med (ms)':>15}{'leve p99 (ms)':>15}")
+    for modo, verificar in modos.items():
+        duracao, latencias, recusados, leves = medir(verificar, args.logins, args.threads)
+        print(
+            f"{modo:<8}{duracao:>9.2f}"
+            f"{statistics.median(latencias) if latencias else 0:>16.0f}{percentil(latencias, 0.99):>16.0f}"
+            f"{recusados:>6}{statistics.median(leves):>15.2f}{percentil(leves, 0.99):>15.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
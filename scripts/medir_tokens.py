@@ -0,0 +1,97 @@
+"""
+Mede a conferência do token JWT de uma requisição: o @jwt_required() do
+flask_jwt_extended (assinatura e JSON a cada requisição, como antes) contra
+o token_obrigatorio() da API (claims em cache e revogados em memória).
+
+Uso:
+    python scripts/medir_tokens.py
+    python scripts/medir_tokens.py --tokens 1000 --requisicoes 50000 --revogados 10000
+
+Sem servidor nem rede: cada caminho roda dentro de um contexto de
+requisição do Flask com o cabeçalho Authorization, sobre um SQLite
+temporário (a tabela TOKENS_REVOGADOS, com --revogados jti revogados).
+--tokens tokens diferentes se revezam, como usuários diferentes.
+
+Caminhos:
+- jwt_required: o decorador do flask_jwt_extended, sem lista de revogados;
+- sem cache: token_obrigatorio com o cache de tokens desligado (verifica a
+  assinatura e confere os revogados a cada requisição);
+- com cache: token_obrigatorio, o token já visto (atual);
+- só conferência: como "com cache", numa view que não chama get_jwt_identity()
+  (o custo do decorador sozinho).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity, jwt_required  # noqa: E402
+
+from controllers.api_controller import token_obrigatorio  # noqa: E402
+from models import db  # noqa: E402
+
+
+def cronometrar(app, funcao, tokens, requisicoes):
+    tempos = []
+    for i in range(requisicoes):
+        cabecalho = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+        with app.test_request_context(headers=cabecalho):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1e6)
+    tempos.sort()
+    return statistics.median(tempos), tempos[max(0, int(len(tempos) * 0.95) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Conferência do JWT: jwt_required x token_obrigatorio.")
+    parser.add_argument("--tokens", type=int, default=100, help="tokens diferentes (padrão: 100)")
+    parser.add_argument("--requisicoes", type=int, default=20000, help="requisições por caminho (padrão: 20000)")
+    parser.add_argument("--revogados", type=int, default=1000, help="jti revogados na tabela (padrão: 1000)")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config["JWT_SECRET_KEY"] = "chave-da-medicao-com-32-bytes-ou-mais"
+    JWTManager(app)
+
+    def view():
+        return get_jwt_identity()
+
+    caminhos = {
+        "jwt_required": jwt_required()(view),
+        "sem cache": token_obrigatorio()(view),
+        "com cache": token_obrigatorio()(view),
+        "só conferência": token_obrigatorio()(lambda: None),
+    }
+
+    with tempfile.TemporaryDirectory() as pasta:
+        db.configurar_repositorio(f"sqlite:///{os.path.join(pasta, 'estoque.db')}")
+        expira = time.time() + 3600
+        for _ in range(args.revogados):
+            db.revogar_token(uuid.uuid4().hex, expira)
+
+        with app.app_context():
+            tokens = [create_access_token(identity=str(i)) for i in range(args.tokens)]
+
+        print(f"{args.tokens} tokens, {args.requisicoes} requisições por caminho, {args.revogados} revogados\n")
+        print(f"{'caminho':<16}{'mediana (us)':>14}{'p95 (us)':>11}")
+        for caminho, funcao in caminhos.items():
+            # Sem cache: nenhum token fica guardado; com cache: todos já vistos
+            db.configurar_tokens(max_itens=0 if caminho == "sem cache" else 10000)
+            if caminho != "sem cache":
+                cronometrar(app, funcao, tokens, len(tokens))
+            mediana, p95 = cronometrar(app, funcao, tokens, args.requisicoes)
+            print(f"{caminho:<16}{mediana:>14.1f}{p95:>11.1f}")
+        print(f"\ncache: {db.estatisticas_tokens()['cache']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Receptor local de alertas de estoque (webhook de testes).
+
+Uso:
+    python scripts/receptor_alertas.py                # escuta em 127.0.0.1:8099
+    python scripts/receptor_alertas.py --porta 9000 --saida alertas.ndjson
+
+Com a API rodando com ALERTAS_WEBHOOK_URL=http://127.0.0.1:8099/alertas,
+cada alerta chega aqui como um POST JSON; o receptor mostra o alerta na tela
+e, com --saida, acrescenta uma linha JSON no arquivo. Responde 204 a todo
+POST. Só para desenvolvimento: não há autenticação.
+"""
+
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def criar_receptor(saida=None):
+    class Receptor(BaseHTTPRequestHandler):
+        def do_POST(self):
+            corpo = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                alerta = json.loads(corpo)
+            except ValueError:
+                self.send_error(400, "JSON inválido")
+                return
+
+            print(
+                f"{alerta.get('data_alerta', '')} {alerta.get('tipo_alerta', '?'):>6} "
+                f"produto {alerta.get('id_produto')} ({alerta.get('nome_produto', '')}): "
+                f"{alerta.get('quantidade')} (limite {alerta.get('limite')})",
+                flush=True,
+            )
+            if saida:
+                with open(saida, "a", encoding="utf-8") as arquivo:
+                    arquivo.write(json.dumps(alerta, ensure_ascii=False) + "\n")
+
+            self.send_response(204)
+            self.end_headers()
+
+        def log_message(self, formato, *args):
+            pass
+
+    return Receptor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recebe os alertas de estoque enviados por webhook.")
+    parser.add_argument("--endereco", default="127.0.0.1")
+    parser.add_argument("--porta", type=int, default=8099)
+    parser.add_argument("--saida", metavar="NDJSON", help="acrescenta cada alerta neste arquivo")
+    args = parser.parse_args()
+
+    servidor = ThreadingHTTPServer((args.endereco, args.porta), criar_receptor(args.saida))
+    print(f"Recebendo alertas em http://{args.endereco}:{args.porta}/alertas", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -88,6 +88,18 @@ API completa para gestão de estoque com autenticação JWT.
             "name": "Fornecedores",
             "description": "Gestão de fornecedores (Requer Admin)"
         },
+        {
+            "name": "Sincronização",
+            "description": "O que mudou desde a última sincronização dos aplicativos"
+        },
+        {
+            "name": "Relatórios",
+            "description": "Valor do estoque e margem potencial (Requer Admin)"
+        },
+        {
+            "name": "Monitoramento",
+            "description": "Métricas internas da aplicação (Requer Admin)"
+        },
     ],
     "definitions": {
         "Usuario": {
@@ -115,6 +127,22 @@ API completa para gestão de estoque com autenticação JWT.
                 "quantidade": {"type": "integer", "example": 100, "description": "Quantidade atual em estoque"},
                 "estoque_minimo": {"type": "integer", "example": 10, "description": "Quantidade mínima permitida (não pode ficar abaixo)"},
                 "estoque_maximo": {"type": "integer", "example": 500, "description": "Quantidade máxima permitida (não pode ultrapassar)"},
+                "versao": {"type": "integer", "example": 48213, "description": "Versão da última gravação (GET /api/sync)"},
+                "atualizado_em": {"type": "string", "format": "date-time", "example": "2024-03-05T14:30:00.000000+00:00"},
+            },
+        },
+        "ProdutoPagina": {
+            "type": "object",
+            "properties": {
+                "itens": {
+                    "type": "array",
+                    "items": {"$ref": "#/definitions/Produto"},
+                },
+                "proximo_cursor": {
+                    "type": "string",
+                    "example": "WyJDYWl4YSBJc29wb3IiLDFd",
+                    "description": "Enviar em ?cursor= para obter a próxima página (null na última página)"
+                },
             },
         },
         "ProdutoInput": {
@@ -175,6 +203,36 @@ API completa para gestão de estoque com autenticação JWT.
                     "type": "string",
                     "example": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9..."
                 },
+                "refresh_token": {
+                    "type": "string",
+                    "example": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
+                    "description": "Usado só em POST /api/token/renovar para obter outro access_token"
+                },
+            },
+        },
+        "RenovarTokenResponse": {
+            "type": "object",
+            "properties": {
+                "access_token": {
+                    "type": "string",
+                    "example": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9..."
+                },
+            },
+        },
+        "LogoutRequest": {
+            "type": "object",
+            "properties": {
+                "refresh_token": {
+                    "type": "string",
+                    "example": "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9...",
+                    "description": "Refresh token do mesmo login, revogado junto"
+                },
+            },
+        },
+        "LogoutResponse": {
+            "type": "object",
+            "properties": {
+                "mensagem": {"type": "string", "example": "Sessão encerrada"},
             },
         },
         "MovimentacaoEstoque": {
@@ -196,6 +254,294 @@ API completa para gestão de estoque com autenticação JWT.
                 "quantidade": {"type": "integer", "example": 10},
             },
         },
+        "MovimentacaoLote": {
+            "type": "object",
+            "required": ["movimentos"],
+            "properties": {
+                "movimentos": {
+                    "type": "array",
+                    "description": "Movimentos na ordem em que foram registrados (máximo 1000)",
+                    "items": {
+                        "type": "object",
+                        "required": ["id_produto", "tipo_movimento", "quantidade"],
+                        "properties": {
+                            "id_produto": {"type": "integer", "example": 1},
+                            "tipo_movimento": {"type": "string", "enum": ["ENTRADA", "SAIDA"], "example": "SAIDA"},
+                            "quantidade": {"type": "integer", "example": 2, "minimum": 1},
+                        },
+                    },
+                },
+                "tudo_ou_nada": {
+                    "type": "boolean",
+                    "default": False,
+                    "description": "Se true, qualquer linha com erro cancela o lote inteiro"
+                },
+            },
+        },
+        "MovimentacaoLoteResponse": {
+            "type": "object",
+            "properties": {
+                "aplicados": {"type": "integer", "example": 2},
+                "falhas": {"type": "integer", "example": 1},
+                "resultados": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "linha": {"type": "integer", "example": 0},
+                            "sucesso": {"type": "boolean", "example": True},
+                            "produto": {"$ref": "#/definitions/Produto"},
+                            "erro": {"type": "string", "example": "Estoque insuficiente! Produto 'Caixa Isopor' tem apenas 1 unidades. Tentativa de saída: 2."},
+                            "codigo": {"type": "string", "example": "23503", "description": "SQLSTATE, quando o banco recusou a linha"},
+                        },
+                    },
+                },
+                "erro": {"type": "string", "example": "Lote cancelado: nenhum movimento foi aplicado"},
+            },
+        },
+        "Movimento": {
+            "type": "object",
+            "properties": {
+                "id": {"type": "integer", "example": 1520},
+                "id_produto": {"type": "integer", "example": 1},
+                "id_usuario": {"type": "integer", "example": 2},
+                "tipo_movimento": {"type": "string", "enum": ["ENTRADA", "SAIDA"], "example": "SAIDA"},
+                "quantidade": {"type": "integer", "example": 2},
+                "data_movimento": {"type": "string", "format": "date-time", "example": "2024-03-05T14:30:00+00:00"},
+            },
+        },
+        "MovimentoPagina": {
+            "type": "object",
+            "properties": {
+                "itens": {
+                    "type": "array",
+                    "items": {"$ref": "#/definitions/Movimento"},
+                },
+                "proximo_cursor": {
+                    "type": "string",
+                    "example": "WyIyMDI0LTAzLTA1VDE0OjMwOjAwKzAwOjAwIiwxNTIwXQ==",
+                    "description": "Enviar em ?cursor= para obter a próxima página (null na última página)"
+                },
+            },
+        },
+        "Sincronizacao": {
+            "type": "object",
+            "properties": {
+                "produtos": {
+                    "type": "array",
+                    "description": "Produtos criados ou alterados (substituem a cópia local)",
+                    "items": {"$ref": "#/definitions/Produto"},
+                },
+                "movimentos": {
+                    "type": "array",
+                    "description": "Movimentos novos (com a coluna versao)",
+                    "items": {"$ref": "#/definitions/Movimento"},
+                },
+                "produtos_excluidos": {
+                    "type": "array",
+                    "description": "Ids dos produtos excluídos (vazio na sincronização completa)",
+                    "items": {"type": "integer"},
+                    "example": [7, 12],
+                },
+                "desde": {
+                    "type": "string",
+                    "example": "eyJkIjo0ODIxM30=",
+                    "description": "Enviar em ?desde= na próxima chamada"
+                },
+                "completo": {
+                    "type": "boolean",
+                    "example": True,
+                    "description": "false: há mais alterações, chame de novo já com o desde devolvido"
+                },
+            },
+        },
+        "QuantidadeEmData": {
+            "type": "object",
+            "properties": {
+                "id_produto": {"type": "integer", "example": 1},
+                "quando": {"type": "string", "example": "2024-03-05T14:00:00.000000+00:00"},
+                "quantidade": {"type": "integer", "example": 42},
+                "saldo_base": {
+                    "type": "object",
+                    "description": "Saldo no fim do dia usado como ponto de partida (null se não havia saldo registrado)",
+                    "properties": {
+                        "dia": {"type": "string", "format": "date", "example": "2024-03-04"},
+                        "quantidade": {"type": "integer", "example": 40},
+                    },
+                },
+                "movimentos": {"type": "integer", "example": 2, "description": "Movimentos do próprio dia somados ao saldo_base"},
+            },
+        },
+        "RelatorioEstoque": {
+            "type": "object",
+            "properties": {
+                "produtos": {"type": "integer", "example": 120},
+                "quantidade": {"type": "integer", "example": 4310},
+                "valor_estoque": {"type": "number", "format": "float", "example": 18250.4, "description": "Soma de quantidade * custo_produto_Unit"},
+                "valor_venda": {"type": "number", "format": "float", "example": 31020.0, "description": "Soma de quantidade * valor_venda_Unit"},
+                "margem_potencial": {"type": "number", "format": "float", "example": 12769.6, "description": "valor_venda - valor_estoque"},
+                "margem_percentual": {"type": "number", "format": "float", "example": 41.17, "description": "margem_potencial em % do valor_venda (null sem estoque)"},
+                "abaixo_minimo": {"type": "integer", "example": 7, "description": "Produtos com quantidade abaixo do estoque_minimo"},
+            },
+        },
+        "RelatorioEstoqueAgrupado": {
+            "type": "object",
+            "properties": {
+                "agrupar_por": {"type": "string", "enum": ["categoria", "local", "fornecedor"], "example": "categoria"},
+                "itens": {
+                    "type": "array",
+                    "items": {
+                        "allOf": [
+                            {
+                                "type": "object",
+                                "properties": {
+                                    "id": {"type": "integer", "example": 1},
+                                    "nome": {"type": "string", "example": "Descartáveis"},
+                                },
+                            },
+                            {"$ref": "#/definitions/RelatorioEstoque"},
+                        ]
+                    },
+                },
+                "total": {"$ref": "#/definitions/RelatorioEstoque"},
+            },
+        },
+        "ItemReposicao": {
+            "type": "object",
+            "properties": {
+                "id_produto": {"type": "integer", "example": 7},
+                "nome_produto": {"type": "string", "example": "Copo 300ml"},
+                "quantidade": {"type": "integer", "example": 40},
+                "estoque_minimo": {"type": "integer", "example": 20},
+                "estoque_maximo": {"type": "integer", "example": 500},
+                "consumo_diario": {"type": "number", "format": "float", "example": 3.5, "description": "Média móvel exponencial das saídas por dia"},
+                "dias_ate_minimo": {"type": "number", "format": "float", "example": 5.7, "description": "0 se já está no mínimo"},
+                "quantidade_sugerida": {"type": "integer", "example": 85},
+                "valor_estimado": {"type": "number", "format": "float", "example": 21.25, "description": "quantidade_sugerida * custo_produto_Unit"},
+            },
+        },
+        "Reposicao": {
+            "type": "object",
+            "properties": {
+                "calculado_ate": {"type": "string", "format": "date", "example": "2024-03-04", "description": "Último dia (UTC) somado no consumo"},
+                "horizonte": {"type": "integer", "example": 14},
+                "cobertura": {"type": "integer", "example": 30},
+                "fornecedores": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id_fornecedor": {"type": "integer", "example": 1},
+                            "nome_fornecedor": {"type": "string", "example": "Distribuidora Sul"},
+                            "produtos": {"type": "integer", "example": 1},
+                            "quantidade_sugerida": {"type": "integer", "example": 85},
+                            "valor_estimado": {"type": "number", "format": "float", "example": 21.25},
+                            "itens": {"type": "array", "items": {"$ref": "#/definitions/ItemReposicao"}},
+                        },
+                    },
+                },
+            },
+        },
+        "AlertaEstoque": {
+            "type": "object",
+            "properties": {
+                "id_produto": {"type": "integer", "example": 7},
+                "nome_produto": {"type": "string", "example": "Copo 300ml"},
+                "tipo_alerta": {"type": "string", "enum": ["MINIMO", "MAXIMO"], "example": "MINIMO"},
+                "quantidade": {"type": "integer", "example": 11},
+                "limite": {"type": "integer", "example": 10, "description": "estoque_minimo (MINIMO) ou estoque_maximo (MAXIMO)"},
+                "desde": {"type": "string", "format": "date-time", "example": "2024-03-05T14:30:00+00:00"},
+            },
+        },
+        "EstatisticasAlertas": {
+            "type": "object",
+            "properties": {
+                "destinos": {"type": "array", "items": {"type": "string"}, "example": ["DestinoLog", "DestinoWebhook"]},
+                "intervalo_repeticao": {"type": "integer", "example": 300, "description": "Segundos até o mesmo alerta poder ser enviado de novo"},
+                "na_fila": {"type": "integer", "example": 0},
+                "publicados": {"type": "integer", "example": 52},
+                "enviados": {"type": "integer", "example": 9},
+                "repetidos": {"type": "integer", "example": 43, "description": "Suprimidos por terem sido enviados há pouco"},
+                "descartados": {"type": "integer", "example": 0, "description": "Perdidos com a fila cheia"},
+                "falhas": {"type": "integer", "example": 0, "description": "Envios que falharam em algum destino"},
+            },
+        },
+        "EstatisticasTarefas": {
+            "type": "object",
+            "properties": {
+                "trabalhadores": {"type": "integer", "example": 2, "description": "Threads de execução por worker"},
+                "por_estado": {
+                    "type": "object",
+                    "example": {"pendente": 3, "executando": 1, "concluida": 1520, "falhou": 0},
+                },
+                "pendentes_por_tipo": {"type": "object", "example": {"alerta_estoque": 3, "consolidar_resumo": 1}},
+                "atraso_segundos": {"type": "number", "format": "float", "example": 0.42, "description": "Há quanto tempo a tarefa pronta mais antiga espera"},
+                "enfileiradas": {"type": "integer", "example": 410},
+                "repetidas": {"type": "integer", "example": 12, "description": "Ignoradas por já existir tarefa com a mesma chave"},
+                "executadas": {"type": "integer", "example": 405},
+                "erros": {"type": "integer", "example": 2, "description": "Tentativas que falharam"},
+                "desistidas": {"type": "integer", "example": 0, "description": "Tarefas que esgotaram as tentativas"},
+            },
+        },
+        "EstatisticasSenhas": {
+            "type": "object",
+            "properties": {
+                "custo": {"type": "integer", "example": 12, "description": "Work factor do bcrypt nos hashes novos"},
+                "max_simultaneas": {"type": "integer", "example": 4, "description": "Contas de bcrypt ao mesmo tempo por worker"},
+                "timeout_fila": {"type": "number", "format": "float", "example": 5.0},
+                "na_fila": {"type": "integer", "example": 0},
+                "verificacoes": {"type": "integer", "example": 310},
+                "recusadas": {"type": "integer", "example": 0, "description": "Logins que esperaram mais que timeout_fila (503)"},
+                "rehashes": {"type": "integer", "example": 12, "description": "Hashes refeitos com o custo atual"},
+            },
+        },
+        "EstatisticasTokens": {
+            "type": "object",
+            "properties": {
+                "cache": {
+                    "type": "object",
+                    "properties": {
+                        "itens": {"type": "integer", "example": 120, "description": "Tokens já verificados guardados"},
+                        "max_itens": {"type": "integer", "example": 10000},
+                        "acertos": {"type": "integer", "example": 15100},
+                        "falhas": {"type": "integer", "example": 130, "description": "Tokens verificados por completo (assinatura e validade)"},
+                        "taxa_acerto": {"type": "number", "format": "float", "example": 0.9915},
+                    },
+                },
+                "revogacao": {
+                    "type": "object",
+                    "properties": {
+                        "revogados": {"type": "integer", "example": 4, "description": "Tokens revogados ainda não expirados"},
+                        "intervalo_sincronizacao": {"type": "number", "format": "float", "example": 2.0, "description": "Segundos entre as releituras de TOKENS_REVOGADOS"},
+                        "sincronizacoes": {"type": "integer", "example": 310},
+                    },
+                },
+            },
+        },
+        "EstatisticasCache": {
+            "type": "object",
+            "properties": {
+                "backend": {"type": "string", "example": "BackendSQLite"},
+                "acertos": {"type": "integer", "example": 980},
+                "falhas": {"type": "integer", "example": 20},
+                "invalidacoes": {"type": "integer", "example": 3},
+                "taxa_acerto": {"type": "number", "format": "float", "example": 0.98},
+                "ttl": {"type": "integer", "example": 300, "description": "Segundos até um item expirar"},
+            },
+        },
+        "EstatisticasPool": {
+            "type": "object",
+            "properties": {
+                "max_conexoes": {"type": "integer", "example": 20},
+                "em_uso": {"type": "integer", "example": 3},
+                "ociosas": {"type": "integer", "example": 5},
+                "abertas": {"type": "integer", "example": 8},
+                "requisicoes": {"type": "integer", "example": 15230},
+                "esperas_esgotadas": {"type": "integer", "example": 0, "description": "Requisições que desistiram por falta de conexão livre"},
+                "espera_media_ms": {"type": "number", "format": "float", "example": 0.012},
+                "espera_maxima_ms": {"type": "number", "format": "float", "example": 4.7},
+            },
+        },
         "Erro": {
             "type": "object",
             "properties": {
@@ -0,0 +1,105 @@
+"""
+Ambiente dos testes: um banco SQLite novo por teste (arquivo em tmp_path)
+e, com TEST_POSTGRES_URL definido, os mesmos testes também num Postgres
+(ex.: TEST_POSTGRES_URL=postgresql://postgres@localhost/estoque_teste; o
+esquema de createdb.sql é aplicado no início). Os dados de cada teste
+usam nomes únicos, então o Postgres pode ser reaproveitado entre execuções.
+"""
+
+import os
+import uuid
+
+import pytest
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from controllers.api_controller import api_bp
+from models import db, db_async
+from models.respostas import ProvedorJSON
+
+TEST_POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+# bcrypt barato: os testes não medem a senha
+db.configurar_senhas(custo=4)
+
+
+def nome_unico(prefixo):
+    return f"{prefixo} {uuid.uuid4().hex[:12]}"
+
+
+@pytest.fixture(scope="session")
+def esquema_postgres():
+    if not TEST_POSTGRES_URL:
+        pytest.skip("TEST_POSTGRES_URL não definido")
+    repo = db.configurar_repositorio(TEST_POSTGRES_URL)
+    repo.criar_esquema()
+    return TEST_POSTGRES_URL
+
+
+@pytest.fixture
+def banco_sqlite(tmp_path):
+    """URL de um banco SQLite novo, já em uso por models.db."""
+    url = f"sqlite:///{tmp_path / 'estoque.db'}"
+    db.configurar_cache("memoria")
+    db.configurar_repositorio(url)
+    return url
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def banco(request, tmp_path):
+    """URL do banco em uso por models.db: SQLite e, se configurado, Postgres."""
+    db.configurar_cache("memoria")
+    if request.param == "postgres":
+        url = request.getfixturevalue("esquema_postgres")
+    else:
+        url = f"sqlite:///{tmp_path / 'estoque.db'}"
+    db.configurar_repositorio(url)
+    return url
+
+
+@pytest.fixture
+def cadastro(banco):
+    """Usuário administrador, local, categoria e fornecedor para os produtos do teste."""
+    return {
+        "id_usuario": db.inserir_usuario(nome_unico("usuario"), 2, "senha").data[0]["id"],
+        "id_local": db.inserir_local_estoque(nome_unico("Local")).data[0]["id"],
+        "id_categoria": db.inserir_categoria(nome_unico("Categoria")).data[0]["id"],
+        "id_fornecedor": db.inserir_fornecedor(nome_unico("Fornecedor")).data[0]["id"],
+    }
+
+
+@pytest.fixture
+def criar_produto(cadastro):
+    """criar_produto(quantidade, estoque_minimo, estoque_maximo) -> id do produto."""
+    def criar(quantidade=0, estoque_minimo=0, estoque_maximo=999999, custo=1.0, venda=2.0):
+        return db.inserir_produto(
+            nome_unico("Produto"), custo, venda,
+            cadastro["id_local"], cadastro["id_categoria"], cadastro["id_fornecedor"],
+            quantidade=quantidade, estoque_minimo=estoque_minimo, estoque_maximo=estoque_maximo,
+            id_usuario=cadastro["id_usuario"],
+        ).data[0]["id"]
+    return criar
+
+
+class FlaskAPI(Flask):
+    # Como em app_api.py: as views async rodam no laço do db_async
+    def async_to_sync(self, func):
+        return db_async.sincrono(func)
+
+
+@pytest.fixture
+def api(cadastro):
+    """Cliente de teste da API (/api), com o token do administrador do cadastro."""
+    db_async.iniciar()
+    app = FlaskAPI(__name__)
+    app.config["JWT_SECRET_KEY"] = "chave-dos-testes-com-32-bytes-ou-mais"
+    app.json = ProvedorJSON(app)
+    JWTManager(app)
+    app.register_blueprint(api_bp, url_prefix="/api")
+    with app.app_context():
+        token = create_access_token(
+            identity=str(cadastro["id_usuario"]), additional_claims={"tipo_usuario": 2}
+        )
+    cliente = app.test_client()
+    cliente.environ_base["HTTP_AUTHORIZATION"] = f"Bearer {token}"
+    return cliente
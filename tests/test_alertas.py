@@ -0,0 +1,37 @@
+"""
+Lista de alertas (ALERTA_ESTOQUE) mantida pelos gatilhos do banco: mesma
+regra, nos limites exatos, que db.perto_do_minimo/perto_do_maximo.
+"""
+
+import pytest
+
+from models import db
+
+
+def alerta(id_produto):
+    tipos = {a["id_produto"]: a["tipo_alerta"] for a in db.listar_alertas().data}
+    return tipos.get(id_produto)
+
+
+@pytest.mark.parametrize("quantidade, estoque_minimo, estoque_maximo, esperado", [
+    (6, 5, 100, "MINIMO"),      # 120% do mínimo, exato
+    (7, 5, 100, None),
+    (80, 0, 100, "MAXIMO"),     # 80% do máximo, exato
+    (79, 0, 100, None),
+    (12, 10, 999999, "MINIMO"),
+    (13, 10, 999999, None),
+    (2**31 - 2, 0, 2**31 - 1, "MAXIMO"),  # quantidade * 5 passa do INTEGER
+])
+def test_alerta_no_limite(criar_produto, quantidade, estoque_minimo, estoque_maximo, esperado):
+    id_produto = criar_produto(quantidade=quantidade, estoque_minimo=estoque_minimo, estoque_maximo=estoque_maximo)
+    assert alerta(id_produto) == esperado
+    assert db.perto_do_minimo(quantidade, estoque_minimo) == (esperado == "MINIMO")
+    if esperado != "MINIMO":
+        assert db.perto_do_maximo(quantidade, estoque_maximo) == (esperado == "MAXIMO")
+
+
+def test_alerta_sai_quando_a_quantidade_volta_ao_normal(cadastro, criar_produto):
+    id_produto = criar_produto(quantidade=6, estoque_minimo=5, estoque_maximo=100)
+    assert alerta(id_produto) == "MINIMO"
+    db.entrada_estoque(id_produto, 1, cadastro["id_usuario"])
+    assert alerta(id_produto) is None
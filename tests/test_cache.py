@@ -0,0 +1,124 @@
+"""
+Cache compartilhado entre processos (workers do Gunicorn): com o backend
+SQLite ou Redis, uma gravação ou invalidação feita num processo tem de
+valer para os outros. Cada operação "do outro worker" roda num processo
+novo (spawn), com a sua própria conexão ao backend. E, no laço de eventos,
+obter_async não pode ficar parado esperando o backend.
+
+O Redis só é testado com TEST_REDIS_URL definido (ex.:
+TEST_REDIS_URL=redis://localhost:6379/15) e o pacote redis instalado.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+
+import pytest
+
+from models.cache import BackendSQLite, CacheTTL, criar_backend
+
+TEST_REDIS_URL = os.environ.get("TEST_REDIS_URL")
+
+
+@pytest.fixture(params=["sqlite", "redis"])
+def url_cache(request, tmp_path):
+    if request.param == "redis":
+        if not TEST_REDIS_URL:
+            pytest.skip("TEST_REDIS_URL não definido")
+        pytest.importorskip("redis")
+        return TEST_REDIS_URL
+    return f"sqlite:///{tmp_path / 'cache.db'}"
+
+
+@pytest.fixture
+def prefixo():
+    # Chaves próprias do teste: o Redis é reaproveitado entre execuções
+    return f"teste-{uuid.uuid4().hex[:12]}"
+
+
+def em_outros_processos(funcao, *chamadas):
+    """Roda funcao(*args) para cada tupla de args, cada uma num processo novo."""
+    contexto = multiprocessing.get_context("spawn")
+    with contexto.Pool(len(chamadas)) as pool:
+        return pool.starmap(funcao, chamadas, chunksize=1)
+
+
+# Executadas nos processos filhos
+
+
+def obter(url, prefixo, chave, carregado):
+    return CacheTTL(backend=criar_backend(url), prefixo=prefixo).obter(chave, lambda: carregado)
+
+
+def invalidar(url, prefixo, chave):
+    CacheTTL(backend=criar_backend(url), prefixo=prefixo).invalidar(chave)
+
+
+def incrementar(url, chave, vezes):
+    backend = criar_backend(url)
+    for _ in range(vezes):
+        backend.incrementar(chave)
+
+
+def test_valor_gravado_num_processo_e_lido_no_outro(url_cache, prefixo):
+    cache = CacheTTL(backend=criar_backend(url_cache), prefixo=prefixo)
+    assert cache.obter("categorias", lambda: ["Bebidas"]) == ["Bebidas"]
+
+    # O outro processo acha o valor e não carrega de novo
+    assert em_outros_processos(obter, (url_cache, prefixo, "categorias", ["outro"])) == [["Bebidas"]]
+
+
+def test_invalidacao_em_outro_processo_muda_a_geracao(url_cache, prefixo):
+    backend = criar_backend(url_cache)
+    cache = CacheTTL(backend=backend, prefixo=prefixo)
+    chave_geracao = cache._chave_geracao("categorias")
+    cache.obter("categorias", lambda: ["Bebidas"])
+    geracao = backend.ler_contador(chave_geracao)
+
+    em_outros_processos(invalidar, (url_cache, prefixo, "categorias"))
+
+    assert backend.ler_contador(chave_geracao) == geracao + 1
+    assert cache.obter("categorias", lambda: ["Bebidas", "Limpeza"]) == ["Bebidas", "Limpeza"]
+    assert cache.falhas == 2
+
+
+def test_invalidacao_local_vale_para_o_outro_processo(url_cache, prefixo):
+    cache = CacheTTL(backend=criar_backend(url_cache), prefixo=prefixo)
+    cache.obter("locais", lambda: ["Depósito"])
+    cache.invalidar("locais")
+
+    assert em_outros_processos(obter, (url_cache, prefixo, "locais", ["Loja"])) == [["Loja"]]
+
+
+def test_incrementos_concorrentes_nao_se_perdem(url_cache, prefixo):
+    processos, vezes = 4, 50
+    chave = f"{prefixo}:contador"
+
+    em_outros_processos(incrementar, *[(url_cache, chave, vezes)] * processos)
+
+    assert criar_backend(url_cache).ler_contador(chave) == processos * vezes
+
+
+class BackendLento(BackendSQLite):
+    """Cada leitura espera 50 ms, como um Redis distante."""
+
+    def obter(self, chave):
+        time.sleep(0.05)
+        return super().obter(chave)
+
+
+def test_obter_async_nao_trava_o_laco(tmp_path):
+    cache = CacheTTL(backend=BackendLento(str(tmp_path / "cache.db")))
+
+    async def carregar():
+        return ["Bebidas"]
+
+    async def cinco_leituras():
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cache.obter_async(f"lista-{i}", carregar) for i in range(5)))
+        return time.perf_counter() - inicio
+
+    # Em série, no laço, seriam 5 x 50 ms
+    assert asyncio.run(cinco_leituras()) < 0.2
@@ -0,0 +1,89 @@
+"""
+ETags das listagens: a versão de PRODUTOS e MOVIMENTO_ESTOQUE vem do banco,
+então muda também com escritas que não passam por models/db.py (scripts,
+migrações, SQL direto), inclusive quando as transações terminam fora da
+ordem dos seus ids no Postgres.
+"""
+
+import pytest
+
+from models import db
+
+
+def test_escrita_fora_do_db_muda_a_versao(cadastro, criar_produto):
+    id_produto = criar_produto(quantidade=10)
+    versoes = [db.versao_tabelas("PRODUTOS"), db.versao_tabelas("MOVIMENTO_ESTOQUE")]
+
+    # Como um script: direto no repositório, sem passar por models/db.py
+    db.repositorio.atualizar("PRODUTOS", id_produto, {"estoque_minimo": 3})
+    assert db.versao_tabelas("PRODUTOS") != versoes[0]
+    assert db.versao_tabelas("MOVIMENTO_ESTOQUE") == versoes[1]
+
+    versoes = [db.versao_tabelas("PRODUTOS"), db.versao_tabelas("MOVIMENTO_ESTOQUE")]
+    db.repositorio.movimentar_estoque(id_produto, "ENTRADA", 1, cadastro["id_usuario"])
+    assert db.versao_tabelas("PRODUTOS") != versoes[0]
+    assert db.versao_tabelas("MOVIMENTO_ESTOQUE") != versoes[1]
+
+
+def test_exclusao_muda_a_versao(criar_produto):
+    id_produto = criar_produto()
+    versao = db.versao_tabelas("PRODUTOS")
+    db.repositorio.deletar("PRODUTOS", id_produto)
+    assert db.versao_tabelas("PRODUTOS") != versao
+
+
+def test_versao_sem_escrita_nao_muda(criar_produto):
+    criar_produto()
+    assert db.versao_tabelas("PRODUTOS", "MOVIMENTO_ESTOQUE") == db.versao_tabelas("PRODUTOS", "MOVIMENTO_ESTOQUE")
+
+
+def test_transacao_mais_antiga_terminando_depois_muda_a_versao(banco, criar_produto):
+    if not banco.startswith("postgresql"):
+        pytest.skip("só o Postgres tem transações de escrita simultâneas")
+    psycopg = pytest.importorskip("psycopg")
+    antigo, novo = criar_produto(), criar_produto()
+
+    with psycopg.connect(banco) as lenta, psycopg.connect(banco, autocommit=True) as rapida:
+        # A transação lenta pega o id menor e termina por último
+        lenta.execute('UPDATE "PRODUTOS" SET estoque_minimo = 1 WHERE id = %s', (antigo,))
+        rapida.execute('UPDATE "PRODUTOS" SET estoque_minimo = 2 WHERE id = %s', (novo,))
+        versao = db.versao_tabelas("PRODUTOS")
+        lenta.commit()
+
+    # O máximo não mudou, mas a transação que estava em andamento terminou
+    assert db.versao_tabelas("PRODUTOS") != versao
+
+
+def test_api_304_ate_o_banco_mudar(api, criar_produto):
+    id_produto = criar_produto()
+    etag = api.get("/api/produtos").headers["ETag"]
+
+    assert api.get("/api/produtos", headers={"If-None-Match": etag}).status_code == 304
+
+    db.repositorio.atualizar("PRODUTOS", id_produto, {"estoque_minimo": 4})
+    resposta = api.get("/api/produtos", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert resposta.headers["ETag"] != etag
+
+
+def test_api_categorias_etag_acompanha_a_lista(api):
+    etag = api.get("/api/categorias").headers["ETag"]
+    assert api.get("/api/categorias", headers={"If-None-Match": etag}).status_code == 304
+
+    db.inserir_categoria("Categoria nova da ETag")
+    resposta = api.get("/api/categorias", headers={"If-None-Match": etag})
+    assert resposta.status_code == 200
+    assert any(c["nome_categoria"] == "Categoria nova da ETag" for c in resposta.get_json())
+
+
+def test_api_categorias_resumo_calculado_so_ao_carregar(api, monkeypatch):
+    db.invalidar_cache_referencia("CATEGORIA")
+    etag = api.get("/api/categorias").headers["ETag"]
+
+    # Com a lista no cache, a ETag vem guardada com ela, sem serializar de novo
+    def nao_chamar(dados):
+        raise AssertionError("versao_conteudo chamado num acerto do cache")
+
+    monkeypatch.setattr(db, "versao_conteudo", nao_chamar)
+    assert api.get("/api/categorias").headers["ETag"] == etag
+    assert api.get("/api/categorias", headers={"If-None-Match": etag}).status_code == 304
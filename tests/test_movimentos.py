@@ -0,0 +1,224 @@
+"""
+Movimentos de estoque concorrentes: a quantidade final e o livro de
+movimentos (MOVIMENTO_ESTOQUE) precisam fechar, sem atualização perdida nem
+saldo negativo, com várias threads movimentando o mesmo produto.
+"""
+
+import random
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+from models import db
+
+THREADS = 8
+MOVIMENTOS_POR_THREAD = 40
+
+
+def quantidade(id_produto):
+    return db.obter_produto_por_id(id_produto).data[0]["quantidade"]
+
+
+def saldo_do_livro(id_produto):
+    """(soma das entradas - saídas, número de movimentos) em MOVIMENTO_ESTOQUE."""
+    saldo = total = 0
+    for movimento in db.historico_movimentos(id_produto):
+        saldo += movimento["quantidade"] if movimento["tipo_movimento"] == "ENTRADA" else -movimento["quantidade"]
+        total += 1
+    return saldo, total
+
+
+def em_paralelo(tarefa, threads=THREADS):
+    """Roda tarefa(indice) em várias threads, liberadas ao mesmo tempo."""
+    largada = threading.Barrier(threads)
+    erros = []
+
+    def rodar(indice):
+        largada.wait()
+        try:
+            tarefa(indice)
+        except Exception as e:  # falha inesperada: o teste acusa no fim
+            erros.append(e)
+
+    lista = [threading.Thread(target=rodar, args=(i,)) for i in range(threads)]
+    for thread in lista:
+        thread.start()
+    for thread in lista:
+        thread.join()
+    assert not erros, erros
+
+
+def test_entradas_e_saidas_concorrentes_fecham_com_o_livro(cadastro, criar_produto):
+    inicial = 200
+    id_produto = criar_produto(quantidade=inicial, estoque_minimo=0, estoque_maximo=100000)
+    aplicados = [[] for _ in range(THREADS)]
+
+    def movimentar(indice):
+        sorteio = random.Random(indice)
+        for _ in range(MOVIMENTOS_POR_THREAD):
+            tipo = sorteio.choice(("ENTRADA", "SAIDA"))
+            qtd = sorteio.randint(1, 20)
+            try:
+                if tipo == "ENTRADA":
+                    db.entrada_estoque(id_produto, qtd, cadastro["id_usuario"])
+                else:
+                    db.saida_estoque(id_produto, qtd, cadastro["id_usuario"])
+            except ValueError:
+                continue  # saída maior que o saldo do momento: recusada, sem efeito
+            aplicados[indice].append(qtd if tipo == "ENTRADA" else -qtd)
+
+    em_paralelo(movimentar)
+
+    esperado = inicial + sum(sum(lista) for lista in aplicados)
+    assert quantidade(id_produto) == esperado
+    saldo, total = saldo_do_livro(id_produto)
+    assert saldo == esperado
+    # o movimento inicial do cadastro mais os aplicados
+    assert total == 1 + sum(len(lista) for lista in aplicados)
+
+
+def test_saidas_concorrentes_nao_deixam_saldo_negativo(cadastro, criar_produto):
+    id_produto = criar_produto(quantidade=100, estoque_minimo=0, estoque_maximo=1000)
+    aceitas = []
+
+    def sacar(_):
+        for _ in range(5):
+            try:
+                db.saida_estoque(id_produto, 10, cadastro["id_usuario"])
+            except ValueError:
+                return
+            aceitas.append(10)
+
+    em_paralelo(sacar)
+
+    assert sum(aceitas) == 100
+    assert quantidade(id_produto) == 0
+    assert saldo_do_livro(id_produto)[0] == 0
+
+
+def test_entradas_concorrentes_respeitam_o_maximo(cadastro, criar_produto):
+    id_produto = criar_produto(quantidade=0, estoque_minimo=0, estoque_maximo=50)
+
+    def repor(_):
+        for _ in range(5):
+            try:
+                db.entrada_estoque(id_produto, 5, cadastro["id_usuario"])
+            except ValueError:
+                return
+
+    em_paralelo(repor)
+
+    assert quantidade(id_produto) == 50
+    assert saldo_do_livro(id_produto)[0] == 50
+
+
+def test_lotes_concorrentes_fecham_com_o_livro(cadastro, criar_produto):
+    produtos = [criar_produto(quantidade=100, estoque_minimo=0, estoque_maximo=100000) for _ in range(3)]
+    aplicados = {id_produto: 0 for id_produto in produtos}
+    trava = threading.Lock()
+
+    def enviar_lote(indice):
+        sorteio = random.Random(1000 + indice)
+        lote = [
+            {
+                "id_produto": sorteio.choice(produtos),
+                "tipo_movimento": sorteio.choice(("ENTRADA", "SAIDA")),
+                "quantidade": sorteio.randint(1, 30),
+            }
+            for _ in range(20)
+        ]
+        resultados = db.movimentar_estoque_lote(lote, cadastro["id_usuario"])
+        with trava:
+            for movimento, resultado in zip(lote, resultados):
+                if resultado["sucesso"]:
+                    sinal = 1 if movimento["tipo_movimento"] == "ENTRADA" else -1
+                    aplicados[movimento["id_produto"]] += sinal * movimento["quantidade"]
+
+    em_paralelo(enviar_lote)
+
+    for id_produto in produtos:
+        assert quantidade(id_produto) == 100 + aplicados[id_produto]
+        assert saldo_do_livro(id_produto)[0] == 100 + aplicados[id_produto]
+
+
+@pytest.mark.parametrize("tipo", ["ENTRADA", "SAIDA"])
+def test_movimento_recusado_nao_altera_nada(cadastro, criar_produto, tipo):
+    id_produto = criar_produto(quantidade=10, estoque_minimo=5, estoque_maximo=20)
+    with pytest.raises(ValueError):
+        db.movimentar_estoque(id_produto, tipo, 50, cadastro["id_usuario"])
+    assert quantidade(id_produto) == 10
+    assert saldo_do_livro(id_produto) == (10, 1)
+
+
+def test_lote_recusa_so_a_linha_com_erro_do_banco(cadastro, criar_produto):
+    id_produto = criar_produto(quantidade=10, estoque_minimo=0, estoque_maximo=100)
+    lote = [
+        {"id_produto": id_produto, "tipo_movimento": "ENTRADA", "quantidade": 5},
+        {"id_produto": id_produto, "tipo_movimento": "SAIDA", "quantidade": 3},
+    ]
+    # Usuário inexistente: a chave estrangeira do movimento recusa cada linha
+    resultados = db.movimentar_estoque_lote(lote, id_usuario=10**12)
+    assert [r["sucesso"] for r in resultados] == [False, False]
+    assert all(r["codigo"] == "23503" for r in resultados)
+    assert quantidade(id_produto) == 10
+
+    resultados = db.movimentar_estoque_lote(
+        [*lote, {"id_produto": 10**12, "tipo_movimento": "ENTRADA", "quantidade": 1}],
+        id_usuario=cadastro["id_usuario"],
+    )
+    assert [r["sucesso"] for r in resultados] == [True, True, False]
+    assert quantidade(id_produto) == 12
+
+
+@pytest.mark.parametrize("movimento, erro", [
+    ({"tipo_movimento": "ENTRADA", "quantidade": 2**31}, "Quantidade deve ser no máximo"),
+    ({"tipo_movimento": "SAIDA", "quantidade": 10**30}, "Quantidade deve ser no máximo"),
+])
+def test_lote_recusa_quantidade_fora_da_faixa(cadastro, criar_produto, movimento, erro):
+    id_produto = criar_produto(quantidade=10)
+    resultados = db.movimentar_estoque_lote(
+        [{"id_produto": id_produto, **movimento}], cadastro["id_usuario"]
+    )
+    assert not resultados[0]["sucesso"]
+    assert resultados[0]["erro"].startswith(erro)
+    with pytest.raises(ValueError):
+        db.entrada_estoque(id_produto, 2**31, cadastro["id_usuario"])
+
+
+def test_quantidade_em_data_hora_ignora_edicao_direta_do_mesmo_dia(cadastro, criar_produto):
+    # Limitação documentada em db.quantidade_em: a edição direta entra no
+    # saldo diário, mas não no livro de movimentos
+    id_produto = criar_produto(quantidade=10)
+    db.atualizar_produto(id_produto, {"quantidade": 50})
+    db.entrada_estoque(id_produto, 5, cadastro["id_usuario"])
+    agora = datetime.now(timezone.utc)
+
+    assert db.quantidade_em(id_produto, agora.date().isoformat())["quantidade"] == 55
+    no_instante = db.quantidade_em(id_produto, agora.isoformat())
+    assert (no_instante["quantidade"], no_instante["movimentos"]) == (15, 2)
+    assert saldo_do_livro(id_produto)[0] == 15
+
+
+def test_quantidade_em_data_hora_ignora_movimento_sem_usuario(cadastro, criar_produto):
+    # Também documentado em db.quantidade_em: sem id_usuario não há movimento no livro
+    id_produto = criar_produto(quantidade=10)
+    db.entrada_estoque(id_produto, 7)
+    agora = datetime.now(timezone.utc)
+
+    assert db.quantidade_em(id_produto, agora.date().isoformat())["quantidade"] == 17
+    no_instante = db.quantidade_em(id_produto, agora.isoformat())
+    assert (no_instante["quantidade"], no_instante["movimentos"]) == (10, 1)
+
+
+@pytest.mark.parametrize("tudo_ou_nada", ["false", "0", 1, None])
+def test_api_lote_recusa_tudo_ou_nada_que_nao_e_booleano(api, criar_produto, tudo_ou_nada):
+    # "false" como texto não pode virar True e cancelar (ou não) o lote
+    id_produto = criar_produto(quantidade=10)
+    resposta = api.post("/api/movimentos/lote", json={
+        "movimentos": [{"id_produto": id_produto, "tipo_movimento": "ENTRADA", "quantidade": 1}],
+        "tudo_ou_nada": tudo_ou_nada,
+    })
+    assert resposta.status_code == 400
+    assert resposta.get_json()["erro"] == "tudo_ou_nada deve ser true ou false"
+    assert quantidade(id_produto) == 10
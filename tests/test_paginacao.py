@@ -0,0 +1,102 @@
+"""
+Paginação por cursor de GET /api/produtos e GET /api/movimentos: o cursor
+vem do cliente e só é aceito com o tipo da coluna de ordenação; sem limite
+nem cursor, GET /api/produtos devolve a primeira página, e só com todos=true
+a lista simples de antes.
+"""
+
+import base64
+import json
+
+import pytest
+
+from models import db
+from models.repositorio import _valor_postgrest
+
+
+def cursor(valor, id_registro):
+    return base64.urlsafe_b64encode(json.dumps([valor, id_registro]).encode()).decode()
+
+
+def test_paginas_cobrem_todos_os_produtos(criar_produto):
+    criados = {criar_produto(quantidade=i % 4) for i in range(7)}
+    vistos, proximo = [], None
+    while True:
+        pagina, proximo = db.listar_produtos_paginado(limite=3, cursor=proximo, ordenar_por="quantidade")
+        vistos.extend(p["id"] for p in pagina)
+        if proximo is None:
+            break
+    assert len(vistos) == len(set(vistos))
+    assert criados <= set(vistos)
+
+
+@pytest.mark.parametrize("ordenar_por, valor", [
+    ("id", "1"),
+    ("quantidade", "5),id.gt.0"),
+    ("quantidade", 1.5),
+    ("quantidade", True),
+    ("nome_produto", 3),
+    ("nome_produto", {"a": "b"}),
+    ("custo_produto_Unit", [1, 2]),
+    ("custo_produto_Unit", float("inf")),
+    ("id", 2**63),
+])
+def test_cursor_de_outro_tipo_e_recusado(banco, ordenar_por, valor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        db.listar_produtos_paginado(cursor=cursor(valor, 1), ordenar_por=ordenar_por)
+
+
+@pytest.mark.parametrize("texto", [
+    cursor("Caixa", "1"),
+    cursor("Caixa", None),
+    "nao-e-base64!",
+    base64.urlsafe_b64encode(b'{"a": 1}').decode(),
+])
+def test_cursor_malformado_e_recusado(banco, texto):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        db.listar_produtos_paginado(cursor=texto, ordenar_por="nome_produto")
+
+
+@pytest.mark.parametrize("valor", ["ontem", 17, None, "2024-01-01T00:00:00),id.gt.0"])
+def test_cursor_de_movimentos_exige_data(banco, valor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        db.listar_movimentos_paginado(cursor=cursor(valor, 1))
+
+
+def test_valor_postgrest_so_aceita_texto_e_numero():
+    assert _valor_postgrest('a,b)"c') == '"a,b)\\"c"'
+    assert _valor_postgrest(10) == "10"
+    for valor in ([1, 2], {"a": 1}, None, True, float("nan")):
+        with pytest.raises(ValueError):
+            _valor_postgrest(valor)
+
+
+def test_api_sem_limite_nem_cursor_devolve_a_primeira_pagina(api, criar_produto, monkeypatch):
+    monkeypatch.setattr(db, "LIMITE_PADRAO_PAGINA", 2)
+    for _ in range(3):
+        criar_produto()
+
+    resp = api.get("/api/produtos")
+    assert resp.status_code == 200
+    assert set(resp.json) == {"itens", "proximo_cursor"}
+    assert len(resp.json["itens"]) == 2
+    assert resp.json["proximo_cursor"] is not None
+
+
+def test_api_todos_devolve_a_lista(api, criar_produto):
+    criados = {criar_produto() for _ in range(5)}
+
+    resp = api.get("/api/produtos?todos=true")
+    assert resp.status_code == 200
+    assert isinstance(resp.json, list)
+    assert criados <= {p["id"] for p in resp.json}
+
+    assert api.get("/api/produtos?todos=true&limite=2").status_code == 400
+    assert api.get("/api/produtos?todos=true&ordenar_por=quantidade").status_code == 400
+
+
+def test_api_recusa_cursor_invalido(api):
+    resp = api.get("/api/produtos", query_string={"cursor": cursor("x", 1), "ordenar_por": "quantidade"})
+    assert resp.status_code == 400
+    resp = api.get("/api/movimentos", query_string={"cursor": cursor({"a": 1}, 1)})
+    assert resp.status_code == 400
@@ -0,0 +1,38 @@
+"""
+scripts/reconciliar_estoque.py no Postgres: a correção grava a diferença em
+AJUSTE_ESTOQUE, fora do livro de movimentos, e a reconciliação seguinte a
+soma ao razão.
+"""
+
+import pytest
+
+from models import db
+
+pytest.importorskip("numpy")
+pytest.importorskip("psycopg")
+
+from scripts.reconciliar_estoque import corrigir, reconciliar  # noqa: E402
+
+
+def so_do_produto(resultado, id_produto):
+    filtro = resultado["id_produto"] == id_produto
+    return {chave: valor[filtro] if hasattr(valor, "shape") else valor for chave, valor in resultado.items()}
+
+
+@pytest.mark.parametrize("quantidade_editada, diferenca", [(25, 15), (4, -6)])
+def test_corrigir_grava_ajuste_fora_dos_movimentos(esquema_postgres, cadastro, criar_produto,
+                                                  quantidade_editada, diferenca):
+    if not db.repositorio.__class__.__name__.endswith("Postgres"):
+        pytest.skip("a reconciliação roda só no Postgres")
+    id_produto = criar_produto(quantidade=10)
+    db.atualizar_produto(id_produto, {"quantidade": quantidade_editada})
+
+    resultado = so_do_produto(reconciliar(esquema_postgres), id_produto)
+    assert resultado["diferenca"].tolist() == [diferenca]
+
+    assert corrigir(esquema_postgres, resultado, cadastro["id_usuario"]) == 1
+
+    assert so_do_produto(reconciliar(esquema_postgres), id_produto)["id_produto"].tolist() == []
+    # O livro continua só com a entrada inicial: nada de consumo nem de
+    # movimento extra na quantidade num instante
+    assert [m["tipo_movimento"] for m in db.historico_movimentos(id_produto)] == ["ENTRADA"]
@@ -0,0 +1,74 @@
+"""
+Diretório de usuários atrasado (cadastro ou mudança feitos por outro worker,
+por um script ou direto no banco): o cadastro repetido vira "Usuário já
+existe" e a conferência de administrador não confia no diretório.
+"""
+
+import uuid
+
+import pytest
+from flask import Flask
+
+from controllers.auth_controller import auth_bp
+from models import db
+
+
+def nome_unico(prefixo):
+    return f"{prefixo} {uuid.uuid4().hex[:12]}"
+
+
+def inserir_sem_o_diretorio(nome, tipo=1):
+    """Como outro worker: grava no banco sem passar pelo diretório deste processo."""
+    return db.repositorio.inserir(
+        "USUARIOS", {"nome_usuario": nome, "tipo_usuario": tipo, "senha_usuario": "x"}
+    )[0]["id"]
+
+
+def test_cadastro_repetido_com_diretorio_atrasado(banco):
+    nome = nome_unico("usuario")
+    db.listar_usuarios_diretorio()  # diretório carregado antes do outro cadastro
+    inserir_sem_o_diretorio(nome)
+    assert not db.usuario_existe(nome)
+
+    with pytest.raises(ValueError, match="Usuário já existe"):
+        db.inserir_usuario(nome, 1, "senha")
+
+    # O diretório foi descartado e recarregado com o nome
+    assert db.usuario_existe(nome)
+
+
+def test_register_repetido_nao_da_erro_500(banco):
+    nome = nome_unico("usuario")
+    db.listar_usuarios_diretorio()
+    inserir_sem_o_diretorio(nome)
+
+    app = Flask(__name__)
+    app.secret_key = "teste"
+    app.register_blueprint(auth_bp)
+    app.add_url_rule("/", "produtos_bp.index", lambda: "")
+    cliente = app.test_client()
+
+    resposta = cliente.post("/register", data={"nome_usuario": nome, "senha": "senha", "tipo_usuario": "1"})
+
+    assert resposta.status_code == 302
+    assert resposta.headers["Location"].endswith("/register")
+    with cliente.session_transaction() as sessao:
+        assert ("warning", "Usuário já existe") in sessao["_flashes"]
+
+
+def test_admin_rebaixado_direto_no_banco_perde_o_acesso(banco):
+    id_usuario = db.inserir_usuario(nome_unico("admin"), 2, "senha").data[0]["id"]
+    assert db.usuario_e_admin(id_usuario)
+    db.listar_usuarios_diretorio()
+
+    db.repositorio.atualizar("USUARIOS", id_usuario, {"tipo_usuario": 1})
+
+    assert db.usuario_do_diretorio(id_usuario)["tipo_usuario"] == 2  # diretório atrasado
+    assert not db.usuario_e_admin(id_usuario)
+
+
+def test_admin_criado_por_outro_worker(banco):
+    db.listar_usuarios_diretorio()
+    id_usuario = inserir_sem_o_diretorio(nome_unico("admin"), tipo=2)
+    assert db.usuario_e_admin(id_usuario)
+    assert not db.usuario_e_admin(id_usuario + 1000000)